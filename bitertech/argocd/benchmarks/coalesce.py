@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# A play of N hosts delegating the same project, role and policy tasks to
+# localhost, with and without the coalescing of the action plugins. Reports
+# the API requests sent by the play and its wall time. Needs ansible-playbook.
+#
+#   python benchmarks/coalesce.py                 # 12 hosts, 12 forks
+#   python benchmarks/coalesce.py --hosts 50 --forks 10
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+NAMESPACE_DIR = os.path.dirname(os.path.dirname(BENCHMARKS_DIR))
+
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from mock_server import MockArgoCD  # noqa: E402
+
+PLAYBOOK = """
+- hosts: all
+  gather_facts: false
+  tasks:
+    - name: Read the project
+      bitertech.argocd.project_info:
+        api_url: "{{ api_url }}"
+        token: token
+        name: project
+      delegate_to: localhost
+
+    - name: Same role for every host
+      bitertech.argocd.role:
+        api_url: "{{ api_url }}"
+        token: token
+        project_name: project
+        role_name: role
+        role_description: role
+      delegate_to: localhost
+
+    - name: A policy per host and a shared one
+      bitertech.argocd.policy:
+        api_url: "{{ api_url }}"
+        token: token
+        project_name: project
+        role_name: role
+        policies:
+          - "p, proj:project:role, applications, get, project/{{ inventory_hostname }}, allow"
+          - "p, proj:project:role, applications, get, project/common, allow"
+      delegate_to: localhost
+
+    - name: A group per host
+      bitertech.argocd.group:
+        api_url: "{{ api_url }}"
+        token: token
+        project_name: project
+        role_name: role
+        groups:
+          - "{{ inventory_hostname }}"
+      delegate_to: localhost
+"""
+
+
+def run_play(root, hosts, forks, coalesce):
+    with tempfile.TemporaryDirectory(prefix="argocd-coalesce-") as workdir, MockArgoCD() as server:
+        server.seed_project("project", roles=[{"name": "role"}])
+        with open(os.path.join(workdir, "play.yml"), "w", encoding="utf-8") as playbook:
+            playbook.write(PLAYBOOK)
+        with open(os.path.join(workdir, "inventory"), "w", encoding="utf-8") as inventory:
+            inventory.write("[all]\n")
+            for index in range(hosts):
+                inventory.write(f"host-{index} ansible_connection=local ansible_python_interpreter={sys.executable}\n")
+
+        env = dict(os.environ, ANSIBLE_COLLECTIONS_PATH=root, ANSIBLE_FORKS=str(forks))
+        started = time.perf_counter()
+        play = subprocess.run(["ansible-playbook", "-i", os.path.join(workdir, "inventory"),
+                               os.path.join(workdir, "play.yml"),
+                               "-e", f"api_url={server.api_url}", "-e", f"argocd_coalesce={coalesce}"],
+                              env=env, capture_output=True, text=True, check=False)
+        elapsed = time.perf_counter() - started
+        if play.returncode:
+            raise RuntimeError(play.stdout[-2000:] + play.stderr[-2000:])
+        return server.stats(), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hosts", type=int, default=12)
+    parser.add_argument("--forks", type=int, default=12)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="argocd-coalesce-") as root:
+        os.makedirs(os.path.join(root, "ansible_collections"))
+        os.symlink(NAMESPACE_DIR, os.path.join(root, "ansible_collections", "bitertech"))
+
+        print(f"{'coalesce':10} {'requests':>9} {'GET':>6} {'PUT':>6} {'seconds':>8}")
+        print("-" * 43)
+        for coalesce in (False, True):
+            stats, elapsed = run_play(root, options.hosts, options.forks, coalesce)
+            routes = stats["by_route"]
+            print(f"{str(coalesce):10} {stats['requests']:>9} {routes.get('GET /api/v1/projects/{name}', 0):>6} "
+                  f"{routes.get('PUT /api/v1/projects/{name}', 0):>6} {elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
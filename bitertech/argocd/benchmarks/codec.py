@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# Wire format of large project documents: CPU of each JSON codec, and the
+# bytes and client CPU of a role edit (GET then PUT of the whole AppProject)
+# with and without gzip on responses and requests.
+#
+#   python benchmarks/codec.py                    # a role with 10k policies
+#   python benchmarks/codec.py --policies 50000 --runs 10
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+NAMESPACE_DIR = os.path.dirname(os.path.dirname(BENCHMARKS_DIR))
+
+
+def _setup_import_path():
+    # Removed when the process exits
+    root = _IMPORT_ROOT.name
+    os.makedirs(os.path.join(root, "ansible_collections"))
+    os.symlink(NAMESPACE_DIR, os.path.join(root, "ansible_collections", "bitertech"))
+    sys.path.insert(0, root)
+    sys.path.insert(0, BENCHMARKS_DIR)
+
+
+_IMPORT_ROOT = tempfile.TemporaryDirectory(prefix="argocd-codec-")
+_setup_import_path()
+
+from mock_server import MockArgoCD  # noqa: E402
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient  # noqa: E402
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_json import HAS_ORJSON, JsonCodec, make_codec  # noqa: E402
+
+
+def policy(index):
+    return f"p, proj:project:role, applications, get, project/app-{index}, allow"
+
+
+def project_document(policies):
+    return {
+        "metadata": {"name": "project", "resourceVersion": "1"},
+        "spec": {"roles": [{"name": "role", "policies": [policy(index) for index in range(policies)]}]},
+    }
+
+
+class _DefaultJson:
+    # json.dumps with its default separators, as the client used to send
+    name = "json (default separators)"
+
+    @staticmethod
+    def dumps(document):
+        return json.dumps(document).encode("utf-8")
+
+    loads = staticmethod(json.loads)
+
+
+def cpu_ms(func, runs):
+    started = time.thread_time()
+    for _ in range(runs):
+        func()
+    return (time.thread_time() - started) * 1000 / runs
+
+
+def codec_table(document, runs):
+    codecs = [_DefaultJson(), JsonCodec()]
+    if HAS_ORJSON:
+        codecs.append(make_codec("orjson"))
+
+    print(f"{'codec':28} {'bytes':>10} {'encode ms':>10} {'decode ms':>10}")
+    print("-" * 61)
+    for codec in codecs:
+        encoded = codec.dumps(document)
+        print(f"{codec.name:28} {len(encoded):>10} {cpu_ms(lambda: codec.dumps(document), runs):>10.2f} "
+              f"{cpu_ms(lambda: codec.loads(encoded), runs):>10.2f}")
+
+
+def wire_table(policies, runs):
+    configurations = [
+        ("json, no gzip", {"json_codec": "json"}, False),
+        ("json, gzip responses", {"json_codec": "json"}, True),
+        ("json, gzip both ways", {"json_codec": "json", "compress_requests": True}, True),
+    ]
+    if HAS_ORJSON:
+        configurations.append(("orjson, gzip both ways", {"json_codec": "orjson", "compress_requests": True}, True))
+
+    print(f"{'role edit':28} {'sent B':>10} {'received B':>10} {'client CPU ms':>14}")
+    print("-" * 65)
+    for name, options, gzip_responses in configurations:
+        with MockArgoCD(gzip_responses=gzip_responses) as server:
+            server.seed_project("project", roles=[{"name": "role",
+                                                   "policies": [policy(index) for index in range(policies)]}])
+            cpu = 0.0
+            for index in range(runs):
+                # A new client per edit, like a module task
+                client = ArgoCDClient(server.api_url, "token", **options)
+                started = time.thread_time()
+                client.add_remove_policies_to_role("project", "role", [policy(policies + index)], "present")
+                cpu += time.thread_time() - started
+                client.close()
+            stats = server.stats()
+        print(f"{name:28} {stats['bytes_in'] // runs:>10} {stats['bytes_out'] // runs:>10} "
+              f"{cpu * 1000 / runs:>14.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--policies", type=int, default=10000, help="policies of the role")
+    parser.add_argument("--runs", type=int, default=20)
+    options = parser.parse_args()
+
+    codec_table(project_document(options.policies), options.runs)
+    print()
+    wire_table(options.policies, options.runs)
+
+
+if __name__ == "__main__":
+    main()
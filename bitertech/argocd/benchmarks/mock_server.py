@@ -0,0 +1,475 @@
+# -*- coding: utf-8 -*-
+# Local mock of the ArgoCD REST API used by the benchmarks. It keeps
+# projects, applications, repositories, repository credentials and clusters in
+# memory, honours resourceVersion conflicts, applies merge patches to
+# applications, streams application events and records every request it
+# serves. Sync operations succeed after a short delay.
+# Transient failures can be queued to exercise retries. Like the ArgoCD server,
+# it accepts gzip encoded request bodies and compresses its responses for
+# clients that accept it.
+import gzip
+import json
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+def project_fields(document, paths):
+    # Apply an ArgoCD "fields" projection such as items.metadata.name
+    if not paths:
+        return document
+
+    projected = {}
+    for path in paths:
+        keys = path.split(".")
+        if keys[0] == "items":
+            items = projected.setdefault("items", [{} for _ in document.get("items", [])])
+            for source, target in zip(document.get("items", []), items):
+                _copy_path(source, target, keys[1:])
+        else:
+            _copy_path(document, projected, keys)
+    return projected
+
+
+def _copy_path(source, target, keys):
+    for key in keys[:-1]:
+        if not isinstance(source, dict) or key not in source:
+            return
+        source = source[key]
+        target = target.setdefault(key, {})
+    if isinstance(source, dict) and keys[-1] in source:
+        target[keys[-1]] = source[keys[-1]]
+
+
+class MockArgoCD:
+
+    def __init__(self, latency=0.0, project_padding=0, gzip_responses=True, sync_delay=0.05, watch_noise=None):
+        # latency: seconds added to every request
+        # project_padding: bytes of filler added to every project document
+        # gzip_responses: compress the responses of clients accepting gzip
+        # sync_delay: seconds a sync operation runs before it succeeds
+        # watch_noise: seconds between the events of an unrelated
+        #   application sent on every watch stream, as on a busy instance
+        self.latency = latency
+        self.project_padding = project_padding
+        self.gzip_responses = gzip_responses
+        self.sync_delay = sync_delay
+        self.watch_noise = watch_noise
+        self.projects = {}
+        self.applications = {}
+        self.repositories = {}
+        self.repository_credentials = {}
+        self.clusters = [{"server": "https://kubernetes.default.svc", "name": "in-cluster", "labels": {}}]
+        self.requests = []
+        # (status, Retry-After) answered to the next requests, before routing
+        self.faults = []
+        self._lock = threading.RLock()
+        # Notified on every application event, (sequence, application)
+        self._changed = threading.Condition(self._lock)
+        self._events = []
+        self._version = 0
+        self._server = None
+        self._stopped = False
+
+    # Server lifecycle
+
+    def start(self):
+        handler = type("Handler", (_Handler,), {"mock": self})
+        self._server = _Server(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        with self._changed:
+            self._stopped = True
+            self._changed.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def api_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/api/v1"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # Statistics
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = []
+
+    def stats(self):
+        with self._lock:
+            requests = list(self.requests)
+        return {
+            "requests": len(requests),
+            "bytes_in": sum(request["bytes_in"] for request in requests),
+            "bytes_out": sum(request["bytes_out"] for request in requests),
+            "by_route": _count_routes(requests),
+        }
+
+    def record(self, method, path, bytes_in, bytes_out, status):
+        with self._lock:
+            self.requests.append({"method": method,
+                                  "path": path,
+                                  "bytes_in": bytes_in,
+                                  "bytes_out": bytes_out,
+                                  "status": status})
+
+    def fail_next(self, status, count=1, retry_after=None):
+        with self._lock:
+            self.faults.extend([(status, retry_after)] * count)
+
+    # Application events, sent on the watch streams
+
+    def application_changed(self, name):
+        with self._changed:
+            self._events.append((len(self._events), json.loads(json.dumps(self.applications[name]))))
+            self._changed.notify_all()
+
+    def start_operation(self, name):
+        # A sync operation, it succeeds after sync_delay seconds
+        def complete():
+            with self._lock:
+                application = self.applications.get(name)
+                if application is None:
+                    return
+                status = application.setdefault("status", {})
+                status["operationState"] = {"phase": "Succeeded", "message": "successfully synced",
+                                            "startedAt": f"operation-{self.next_version()}"}
+                status["sync"] = {"status": "Synced"}
+                status["health"] = {"status": "Healthy"}
+                self.application_changed(name)
+
+        timer = threading.Timer(self.sync_delay, complete)
+        timer.daemon = True
+        timer.start()
+
+    def next_version(self):
+        with self._lock:
+            self._version += 1
+            return str(self._version)
+
+    # Seeding
+
+    def seed_project(self, name, roles=None):
+        document = {
+            "metadata": {"name": name, "resourceVersion": self.next_version()},
+            "spec": {"roles": roles or []},
+        }
+        if self.project_padding:
+            document["metadata"]["annotations"] = {"padding": "x" * self.project_padding}
+        self.projects[name] = document
+        return document
+
+    def seed_cluster(self, name, server, labels=None):
+        document = {"name": name, "server": server, "labels": labels or {}}
+        self.clusters.append(document)
+        return document
+
+    def seed_application(self, name, project="default", namespace="default", server=None):
+        self.applications[name] = {
+            "metadata": {"name": name, "resourceVersion": self.next_version(), "labels": {}},
+            "spec": {
+                "project": project,
+                "source": {"repoURL": "https://example.com/repo.git", "path": name, "targetRevision": "main"},
+                "destination": {"server": server or "https://kubernetes.default.svc", "namespace": namespace},
+            },
+            "status": {"sync": {"status": "Synced"}, "health": {"status": "Healthy"}},
+        }
+        return self.applications[name]
+
+
+def _count_routes(requests):
+    routes = {}
+    for request in requests:
+        # Collapse object names so routes can be compared between runs
+        route = request["method"] + " " + re.sub(r"/(projects|applications|repositories|repocreds|clusters)/[^/?]+",
+                                                 r"/\1/{name}", request["path"].split("?")[0])
+        routes[route] = routes.get(route, 0) + 1
+    return routes
+
+
+class _Server(ThreadingHTTPServer):
+    # Clients without a connection pool open a connection per request, the
+    # default backlog of 5 resets them under concurrency
+    request_queue_size = 128
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    mock = None
+
+    def setup(self):
+        super().setup()
+        # Like the Go HTTP server of ArgoCD, do not delay small writes
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, *args):
+        pass
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        self._bytes_in = len(raw)
+        if raw and self.headers.get("Content-Encoding", "").lower() == "gzip":
+            raw = gzip.decompress(raw)
+        return json.loads(raw) if raw else None
+
+    def _send(self, status, document, headers=None):
+        payload = json.dumps(document).encode("utf-8")
+        compress = (self.mock.gzip_responses and len(payload) >= 1024
+                    and "gzip" in self.headers.get("Accept-Encoding", ""))
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        if compress:
+            # Sent chunked like the gzip handler of the Go HTTP server
+            payload = gzip.compress(payload, compresslevel=6)
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for start in range(0, len(payload), 16384):
+                chunk = payload[start:start + 16384]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        self.mock.record(self.command, self.path, self._bytes_in, len(payload), status)
+
+    def _not_found(self, kind):
+        self._send(404, {"error": f"{kind} not found", "code": 5, "message": f"{kind} not found"})
+
+    def _route(self):
+        # The handler serves every request of a keep-alive connection
+        self._bytes_in = 0
+        if self.mock.latency:
+            time.sleep(self.mock.latency)
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        path = url.path[len("/api/v1"):] if url.path.startswith("/api/v1") else url.path
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        return parts, query
+
+    def _fault(self):
+        # Answer with the next queued failure, if any
+        with self.mock._lock:
+            if not self.mock.faults:
+                return False
+            status, retry_after = self.mock.faults.pop(0)
+        headers = {"Retry-After": str(retry_after)} if retry_after is not None else None
+        self._send(status, {"error": "unavailable", "code": 14}, headers)
+        return True
+
+    def do_GET(self):
+        parts, query = self._route()
+        if self._fault():
+            return
+        mock = self.mock
+        if parts == ["stream", "applications"]:
+            return self._watch(query)
+        fields = query.get("fields", [""])[0].split(",") if query.get("fields") else None
+
+        with mock._lock:
+            if parts == ["projects"]:
+                return self._send(200, project_fields({"items": list(mock.projects.values())}, fields))
+            if parts[0] == "projects" and len(parts) == 2:
+                if parts[1] not in mock.projects:
+                    return self._not_found("project")
+                return self._send(200, mock.projects[parts[1]])
+            if parts == ["applications"]:
+                items = [application for application in mock.applications.values()
+                         if (not query.get("projects") or application["spec"]["project"] in query["projects"])
+                         and (not query.get("name") or application["metadata"]["name"] in query["name"])]
+                return self._send(200, project_fields({"items": items}, fields))
+            if parts[0] == "applications" and len(parts) == 2:
+                if parts[1] not in mock.applications:
+                    return self._send(403, {"error": "permission denied", "code": 7})
+                return self._send(200, mock.applications[parts[1]])
+            if parts == ["repositories"]:
+                items = [dict(repository, password=None) for repository in mock.repositories.values()]
+                return self._send(200, {"items": items})
+            if parts[0] == "repositories" and len(parts) == 2:
+                matches = [repository for (repo, _), repository in mock.repositories.items() if repo == parts[1]]
+                if not matches:
+                    return self._not_found("repository")
+                return self._send(200, dict(matches[0], password=None))
+            if parts == ["repocreds"]:
+                items = [dict(credentials, password=None) for credentials in mock.repository_credentials.values()
+                         if not query.get("url") or credentials["url"] in query["url"]]
+                return self._send(200, {"items": items})
+            if parts == ["clusters"]:
+                return self._send(200, {"items": mock.clusters})
+        self._not_found("route")
+
+    def _watch(self, query):
+        # Newline delimited events, the current state of the applications
+        # first, then their changes until the client goes away
+        mock = self.mock
+        names = query.get("name")
+        projects = query.get("projects")
+
+        def selected(application):
+            return ((not names or application["metadata"]["name"] in names)
+                    and (not projects or application.get("spec", {}).get("project") in projects))
+
+        def event(application, kind="MODIFIED"):
+            line = json.dumps({"result": {"type": kind, "application": application}}).encode("utf-8") + b"\n"
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+            self.wfile.flush()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        mock.record(self.command, self.path, self._bytes_in, 0, 200)
+
+        with mock._lock:
+            current = [json.loads(json.dumps(application)) for application in mock.applications.values()
+                       if selected(application)]
+            seen = len(mock._events)
+        noise = {"metadata": {"name": "noise"}, "spec": {"project": "noise"}, "status": {}}
+        next_noise = time.monotonic() + mock.watch_noise if mock.watch_noise else None
+        try:
+            for application in current:
+                event(application, "ADDED")
+            while True:
+                with mock._changed:
+                    if not mock._stopped and len(mock._events) == seen:
+                        mock._changed.wait(0.05)
+                    if mock._stopped:
+                        return
+                    events = mock._events[seen:]
+                    seen = len(mock._events)
+                for _, application in events:
+                    if selected(application):
+                        event(application)
+                if next_noise is not None and time.monotonic() >= next_noise:
+                    event(noise)
+                    next_noise = time.monotonic() + mock.watch_noise
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.close_connection = True
+
+    def do_POST(self):
+        parts, query = self._route()
+        body = self._read_body()
+        if self._fault():
+            return
+        mock = self.mock
+        upsert = query.get("upsert", ["false"])[0] == "true"
+
+        with mock._lock:
+            if parts == ["projects"]:
+                project = body["project"]
+                name = project["metadata"]["name"]
+                if name in mock.projects and not upsert:
+                    return self._send(400, {"error": "project already exists", "code": 6})
+                project["metadata"]["resourceVersion"] = mock.next_version()
+                mock.projects[name] = project
+                return self._send(200, project)
+            if parts == ["applications"]:
+                name = body["metadata"]["name"]
+                if name in mock.applications and not upsert:
+                    return self._send(400, {"error": "existing application spec is different, use upsert flag",
+                                            "code": 3})
+                body["metadata"]["resourceVersion"] = mock.next_version()
+                body.setdefault("status", {"sync": {"status": "Synced"}, "health": {"status": "Healthy"}})
+                mock.applications[name] = body
+                return self._send(200, body)
+            if parts[0] == "applications" and len(parts) == 3 and parts[2] == "sync":
+                if parts[1] not in mock.applications:
+                    return self._send(403, {"error": "permission denied", "code": 7})
+                # Answered before the operation starts, like the ArgoCD API
+                response = json.loads(json.dumps(mock.applications[parts[1]]))
+                mock.start_operation(parts[1])
+                return self._send(200, response)
+            if parts == ["repositories"]:
+                # Project scoped repositories are unique per URL and project
+                key = (body["repo"], body.get("project") or None)
+                if key in mock.repositories and not upsert:
+                    return self._send(400, {"error": "repository already exists", "code": 6})
+                mock.repositories[key] = body
+                return self._send(200, dict(body, password=None))
+            if parts == ["repocreds"]:
+                if body["url"] in mock.repository_credentials and not upsert:
+                    return self._send(400, {"error": "repository credentials already exist", "code": 6})
+                mock.repository_credentials[body["url"]] = body
+                return self._send(200, dict(body, password=None))
+        self._not_found("route")
+
+    def do_PUT(self):
+        parts, query = self._route()
+        body = self._read_body()
+        if self._fault():
+            return
+        mock = self.mock
+
+        with mock._lock:
+            if parts[0] == "projects" and len(parts) == 2:
+                current = mock.projects.get(parts[1])
+                if current is None:
+                    return self._not_found("project")
+                project = body["project"]
+                if project["metadata"].get("resourceVersion") != current["metadata"]["resourceVersion"]:
+                    return self._send(409, {"error": "the object has been modified; please apply your changes "
+                                                     "to the latest version and try again", "code": 10})
+                project["metadata"]["resourceVersion"] = mock.next_version()
+                mock.projects[parts[1]] = project
+                return self._send(200, project)
+        self._not_found("route")
+
+    def do_PATCH(self):
+        parts, query = self._route()
+        body = self._read_body()
+        if self._fault():
+            return
+        mock = self.mock
+
+        with mock._lock:
+            if parts[0] == "applications" and len(parts) == 2:
+                current = mock.applications.get(parts[1])
+                if current is None:
+                    return self._send(403, {"error": "permission denied", "code": 7})
+                if body.get("patchType") != "merge":
+                    return self._send(400, {"error": "unsupported patch type", "code": 3})
+                application = _merge(current, json.loads(body["patch"]))
+                application["metadata"]["resourceVersion"] = mock.next_version()
+                mock.applications[parts[1]] = application
+                return self._send(200, application)
+        self._not_found("route")
+
+
+def _merge(document, patch):
+    # JSON merge patch (RFC 7386), as applied by the server
+    if not isinstance(patch, dict):
+        return patch
+    merged = dict(document) if isinstance(document, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            merged.pop(key, None)
+        else:
+            merged[key] = _merge(merged.get(key), value)
+    return merged
+
+
+if __name__ == "__main__":
+    with MockArgoCD() as server:
+        print(f"Mock ArgoCD API listening on {server.api_url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,693 @@
+# -*- coding: utf-8 -*-
+# Benchmarks of ArgoCDClient and the modules against the local mock server.
+#
+#   python benchmarks/run.py                      # small scale, report only
+#   python benchmarks/run.py --scale large        # 1k apps, 10k policies per role, 32 forks
+#   python benchmarks/run.py --check              # fail when API round trips regress
+#   python benchmarks/run.py --update-baseline    # record the current round trips
+import argparse
+import contextlib
+import io
+import json
+import os
+import runpy
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+COLLECTION_DIR = os.path.dirname(BENCHMARKS_DIR)
+NAMESPACE_DIR = os.path.dirname(COLLECTION_DIR)
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, "baseline.json")
+
+# HTTP backend of the clients and modules, set from --http-backend
+HTTP_BACKEND = "auto"
+
+SCALES = {
+    "small": {"applications": 100, "policies": 1000, "roles": 40, "forks": 8, "operations": 20},
+    "large": {"applications": 1000, "policies": 10000, "roles": 40, "forks": 32, "operations": 100},
+}
+
+
+def _setup_import_path():
+    # The collection is imported as ansible_collections.bitertech.argocd, link
+    # the source tree under a temporary ansible_collections directory, removed
+    # when the process exits
+    root = _IMPORT_ROOT.name
+    os.makedirs(os.path.join(root, "ansible_collections"))
+    os.symlink(NAMESPACE_DIR, os.path.join(root, "ansible_collections", "bitertech"))
+    sys.path.insert(0, root)
+    sys.path.insert(0, BENCHMARKS_DIR)
+
+
+_IMPORT_ROOT = tempfile.TemporaryDirectory(prefix="argocd-bench-")
+_setup_import_path()
+
+from mock_server import MockArgoCD  # noqa: E402
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient  # noqa: E402
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_async import run_fan_out  # noqa: E402
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_http import ArgoCDHTTPError  # noqa: E402
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def policy(project, role, index):
+    return f"p, proj:{project}:{role}, applications, get, {project}/app-{index}, allow"
+
+
+_module_lock = threading.Lock()
+
+
+def run_module(name, args):
+    # Run a module in-process the way AnsiballZ does and return its result
+    from ansible.module_utils import basic
+
+    with _module_lock:
+        basic._ANSIBLE_ARGS = json.dumps({"ANSIBLE_MODULE_ARGS": args}).encode("utf-8")
+        basic._ANSIBLE_PROFILE = "legacy"
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            try:
+                runpy.run_module(f"ansible_collections.bitertech.argocd.plugins.modules.{name}", run_name="__main__")
+            except SystemExit:
+                pass
+    result = json.loads(output.getvalue())
+    if result.get("failed"):
+        raise RuntimeError(f"module {name} failed: {result.get('msg')}")
+    return result
+
+
+class Scenario:
+    # A named list of operations run against a freshly seeded mock server
+
+    # Extra options of the mock server, such as watch_noise
+    server_options = {}
+
+    # Directory of the current run, removed once the scenario ends
+    workdir = None
+
+    def __init__(self, name, workers=1, strict=True):
+        self.name = name
+        self.workers = workers
+        # Non strict scenarios (racing writers) have a variable number of
+        # round trips and are not compared with the baseline
+        self.strict = strict
+
+    def setup(self, server, scale):
+        pass
+
+    def operations(self, server, scale):
+        raise NotImplementedError
+
+    def tempdir(self, prefix):
+        return tempfile.mkdtemp(prefix=prefix, dir=self.workdir)
+
+
+def scenario(name, workers=1, strict=True):
+    def decorator(cls):
+        cls.instance = cls(name, workers=workers, strict=strict)
+        SCENARIOS.append(cls.instance)
+        return cls
+    return decorator
+
+
+SCENARIOS = []
+
+
+def client(server, **options):
+    # A new client per operation, like a module task
+    options.setdefault("http_backend", HTTP_BACKEND)
+    return ArgoCDClient(server.api_url, "token", **options)
+
+
+@scenario("project_create")
+class ProjectCreate(Scenario):
+    def operations(self, server, scale):
+        return [lambda index=index: client(server).create_project(f"project-{index}", "description")
+                for index in range(scale["operations"])]
+
+
+@scenario("project_create_noop")
+class ProjectCreateNoop(Scenario):
+    def setup(self, server, scale):
+        server.seed_project("project")
+
+    def operations(self, server, scale):
+        return [lambda: client(server).create_project("project", "description")] * scale["operations"]
+
+
+@scenario("project_get_retry")
+class ProjectGetRetry(Scenario):
+    # The server is overloaded once per operation, the client retries
+    def setup(self, server, scale):
+        server.seed_project("project")
+
+    def operations(self, server, scale):
+        def operation():
+            server.fail_next(503, retry_after=0)
+            client(server).get_project("project")
+        return [operation for _ in range(scale["operations"])]
+
+
+@scenario("project_create_gateway_error")
+class ProjectCreateGatewayError(Scenario):
+    # A gateway error on a POST is not retried, the project may have been
+    # created behind the gateway
+    def operations(self, server, scale):
+        def operation(index):
+            server.fail_next(502)
+            try:
+                client(server).create_project(f"project-{index}", "description", live=None)
+            except ArgoCDHTTPError as errh:
+                if errh.response.status_code != 502:
+                    raise
+            else:
+                raise RuntimeError("the POST was retried after a 502")
+        return [lambda index=index: operation(index) for index in range(scale["operations"])]
+
+
+@scenario("project_update")
+class ProjectUpdate(Scenario):
+    def setup(self, server, scale):
+        server.seed_project("project")
+
+    def operations(self, server, scale):
+        return [lambda index=index: client(server).update_project("project", f"description {index}")
+                for index in range(scale["operations"])]
+
+
+@scenario("role_add")
+class RoleAdd(Scenario):
+    def setup(self, server, scale):
+        server.seed_project("project")
+
+    def operations(self, server, scale):
+        return [lambda index=index: client(server).add_role_to_project("project", f"role-{index}", "role")
+                for index in range(scale["operations"])]
+
+
+@scenario("policy_add")
+class PolicyAdd(Scenario):
+    def setup(self, server, scale):
+        server.seed_project("project", roles=[{"name": "role"}])
+
+    def operations(self, server, scale):
+        def operation(index):
+            return client(server).add_remove_policies_to_role("project", "role", [policy("project", "role", index)],
+                                                              "present")
+
+        return [lambda index=index: operation(index) for index in range(scale["operations"])]
+
+
+@scenario("policy_add_noop")
+class PolicyAddNoop(Scenario):
+    def setup(self, server, scale):
+        server.seed_project("project", roles=[{"name": "role", "policies": [policy("project", "role", 0)]}])
+
+    def operations(self, server, scale):
+        def operation():
+            return client(server).add_remove_policies_to_role("project", "role", [policy("project", "role", 0)],
+                                                              "present")
+
+        return [operation] * scale["operations"]
+
+
+@scenario("group_add")
+class GroupAdd(Scenario):
+    def setup(self, server, scale):
+        server.seed_project("project", roles=[{"name": "role"}])
+
+    def operations(self, server, scale):
+        def operation(index):
+            return client(server).add_remove_groups_to_role("project", "role", [f"group-{index}"], "present")
+
+        return [lambda index=index: operation(index) for index in range(scale["operations"])]
+
+
+@scenario("project_roles_bulk")
+class ProjectRolesBulk(Scenario):
+    # The whole role set of a project in one operation
+    def setup(self, server, scale):
+        server.seed_project("project")
+
+    def operations(self, server, scale):
+        roles = [{"name": f"role-{role}",
+                  "description": "role",
+                  "policies": [policy("project", f"role-{role}", index) for index in range(5)],
+                  "groups": [f"group-{role}-a", f"group-{role}-b"]}
+                 for role in range(scale["roles"])]
+        return [lambda: client(server).apply_project_roles("project", roles, "present")]
+
+
+@scenario("large_role_policies")
+class LargeRolePolicies(Scenario):
+    # Thousands of generated policies added to a role that already has as many
+    def setup(self, server, scale):
+        existing = [policy("project", "role", index) for index in range(scale["policies"])]
+        server.seed_project("project", roles=[{"name": "role", "policies": existing}])
+
+    def operations(self, server, scale):
+        new = [policy("project", "role", index) for index in range(scale["policies"] // 2, scale["policies"] * 3 // 2)]
+        return [lambda: client(server).add_remove_policies_to_role("project", "role", new, "present")]
+
+
+@scenario("large_role_policies_compressed")
+class LargeRolePoliciesCompressed(LargeRolePolicies):
+    # Same edit with the PUT of the whole project sent gzip compressed
+    def operations(self, server, scale):
+        new = [policy("project", "role", index) for index in range(scale["policies"] // 2, scale["policies"] * 3 // 2)]
+        return [lambda: client(server, compress_requests=True).add_remove_policies_to_role(
+            "project", "role", new, "present")]
+
+
+@scenario("concurrent_forks", workers=8, strict=False)
+class ConcurrentForks(Scenario):
+    # Many forks adding policies to the same project at once
+    def setup(self, server, scale):
+        self.workers = scale["forks"]
+        server.seed_project("project", roles=[{"name": "role"}])
+
+    def operations(self, server, scale):
+        def operation(index):
+            return client(server, conflict_retries=50).add_remove_policies_to_role(
+                "project", "role", [policy("project", "role", index)], "present")
+
+        return [lambda index=index: operation(index) for index in range(scale["forks"] * 2)]
+
+
+@scenario("applications_bulk", workers=20)
+class ApplicationsBulk(Scenario):
+    # Applications created concurrently through one shared client, as the
+    # applications module does
+    def operations(self, server, scale):
+        shared = client(server, pool_size=self.workers)
+        return [lambda index=index: shared.create_application(f"app-{index}", "https://example.com/repo.git", "path",
+                                                              "main", namespace="default", project="default",
+                                                              upsert=True)
+                for index in range(scale["applications"])]
+
+
+@scenario("application_create_noop")
+class ApplicationCreateNoop(Scenario):
+    def setup(self, server, scale):
+        shared = client(server)
+        shared.create_application("app", "https://example.com/repo.git", "path", "main",
+                                  namespace="default", project="default")
+
+    def operations(self, server, scale):
+        return [lambda: client(server).create_application("app", "https://example.com/repo.git", "path", "main",
+                                                          namespace="default", project="default")] * scale["operations"]
+
+
+@scenario("application_update_revision", workers=20)
+class ApplicationUpdateRevision(Scenario):
+    # A release bumping targetRevision on every application: a GET, then a
+    # merge patch of the changed field
+    def setup(self, server, scale):
+        shared = client(server)
+        for index in range(scale["applications"]):
+            shared.create_application(f"app-{index}", "https://example.com/repo.git", "path", "v1",
+                                      values_files=["values.yaml", f"values-{index}.yaml"],
+                                      namespace="default", project="default")
+
+    def operations(self, server, scale):
+        shared = client(server, pool_size=self.workers)
+        return [lambda index=index: shared.create_application(f"app-{index}", "https://example.com/repo.git", "path",
+                                                              "v2", values_files=["values.yaml", f"values-{index}.yaml"],
+                                                              namespace="default", project="default", upsert=True)
+                for index in range(scale["applications"])]
+
+
+@scenario("list_applications_projection")
+class ListApplications(Scenario):
+    def setup(self, server, scale):
+        for index in range(scale["applications"]):
+            server.seed_application(f"app-{index}", project=f"project-{index % 10}")
+
+    def operations(self, server, scale):
+        return [lambda: client(server).list_applications(fields=["items.metadata.name", "items.spec.project"])]
+
+
+@scenario("repository_create")
+class RepositoryCreate(Scenario):
+    def operations(self, server, scale):
+        def operation(index):
+            return client(server).create_repository("git", f"https://example.com/repo-{index}.git", "user", "password",
+                                                    "default", None)
+
+        return [lambda index=index: operation(index) for index in range(scale["operations"])]
+
+
+@scenario("repository_create_noop")
+class RepositoryCreateNoop(Scenario):
+    def setup(self, server, scale):
+        client(server).create_repository("git", "https://example.com/repo.git", "user", "password", "default", None)
+
+    def operations(self, server, scale):
+        return [lambda: client(server).create_repository(
+            "git", "https://example.com/repo.git", "user", "password", "default", None,
+            update_password="on_create")] * scale["operations"]
+
+
+def repository_list(server, scale):
+    # Arguments of a repository task registering many repositories that share
+    # a credential template
+    return {"api_url": server.api_url, "token": "token", "http_backend": HTTP_BACKEND,
+            "max_workers": 20,
+            "credentials": [{"url": "https://example.com/", "type": "git", "username": "user", "password": "password"}],
+            "repositories": [{"type": "git", "repository_url": f"https://example.com/repo-{index}.git"}
+                             for index in range(scale["applications"])]}
+
+
+@scenario("repository_list")
+class RepositoryList(Scenario):
+    def operations(self, server, scale):
+        return [lambda: run_module("repository", repository_list(server, scale))]
+
+
+@scenario("repository_list_noop")
+class RepositoryListNoop(Scenario):
+    def setup(self, server, scale):
+        run_module("repository", repository_list(server, scale))
+
+    def operations(self, server, scale):
+        return [lambda: run_module("repository", repository_list(server, scale))] * scale["operations"]
+
+
+@scenario("fan_out_instances")
+class FanOutInstances(Scenario):
+    # The same projects created on this server, a second instance and one
+    # failing every request, through the asyncio client. Only the requests
+    # of this server are counted.
+    def operations(self, server, scale):
+        projects = [{"project_name": f"project-{index}", "description": "description"}
+                    for index in range(scale["operations"])]
+
+        def operation():
+            with MockArgoCD() as other, MockArgoCD() as broken:
+                broken.fail_next(500, count=len(projects) * 10)
+                outcomes = run_fan_out([(server.api_url, "token"), (other.api_url, "token"), (broken.api_url, "token")],
+                                       "create_project", projects, concurrency=10, http_backend=HTTP_BACKEND)
+                by_instance = {}
+                for outcome in outcomes:
+                    by_instance.setdefault(outcome["instance"], []).append(outcome["failed"])
+                expected = {server.api_url: [False] * len(projects), other.api_url: [False] * len(projects),
+                            broken.api_url: [True] * len(projects)}
+                if by_instance != expected or len(other.projects) != len(projects):
+                    raise RuntimeError(f"unexpected fan-out outcomes {by_instance}")
+        return [operation]
+
+
+@scenario("sync_wait")
+class SyncWait(Scenario):
+    # Sync then wait on the watch stream for the operation to succeed
+    def setup(self, server, scale):
+        server.seed_application("app")
+
+    def operations(self, server, scale):
+        args = {"api_url": server.api_url, "token": "token", "http_backend": HTTP_BACKEND,
+                "names": ["app"], "wait": True, "timeout": 30}
+        return [lambda: run_module("sync", args)] * scale["operations"]
+
+
+@scenario("watch_timeout_busy")
+class WatchTimeoutBusy(Scenario):
+    # Waiting for a state that never comes while other applications keep
+    # the stream busy must still end at the timeout
+    server_options = {"watch_noise": 0.05}
+    timeout = 0.5
+
+    def setup(self, server, scale):
+        server.seed_application("app")
+
+    def operations(self, server, scale):
+        def operation():
+            started = time.monotonic()
+            _, pending, _ = client(server).wait_for_applications(["app"], sync_status="OutOfSync",
+                                                                 timeout=self.timeout)
+            if not pending or time.monotonic() - started > self.timeout + 1:
+                raise RuntimeError(f"the wait ended after {time.monotonic() - started:.1f}s, "
+                                   f"timeout {self.timeout}s")
+        return [operation] * 4
+
+
+def seed_instance(server, scale):
+    for index in range(scale["roles"]):
+        server.seed_project(f"project-{index}")
+    for index in range(scale["applications"]):
+        server.seed_application(f"app-{index}", project=f"project-{index % scale['roles']}")
+
+
+def export_args(server, dest):
+    return {"api_url": server.api_url, "token": "token", "http_backend": HTTP_BACKEND, "dest": dest, "compress": True}
+
+
+@scenario("export")
+class Export(Scenario):
+    def setup(self, server, scale):
+        seed_instance(server, scale)
+
+    def operations(self, server, scale):
+        return [lambda: run_module("export", export_args(server, self.tempdir("export-")))]
+
+
+@scenario("export_incremental")
+class ExportIncremental(Scenario):
+    # Every run after the first one only fetches the application changed
+    # since the previous run
+    def setup(self, server, scale):
+        seed_instance(server, scale)
+        self.dest = self.tempdir("export-")
+        run_module("export", export_args(server, self.dest))
+
+    def operations(self, server, scale):
+        def operation(index):
+            server.seed_application(f"app-{index}", project="project-0")
+            run_module("export", export_args(server, self.dest))
+        return [lambda index=index: operation(index) for index in range(scale["operations"])]
+
+
+def restore_args(server, src):
+    return {"api_url": server.api_url, "token": "token", "http_backend": HTTP_BACKEND, "src": src}
+
+
+@scenario("restore")
+class Restore(Scenario):
+    # Every operation restores an export of the instance into an empty one
+    def setup(self, server, scale):
+        seed_instance(server, scale)
+        self.src = self.tempdir("restore-")
+        run_module("export", export_args(server, self.src))
+
+    def operations(self, server, scale):
+        def operation():
+            server.projects.clear()
+            server.applications.clear()
+            run_module("restore", restore_args(server, self.src))
+        return [operation for _ in range(scale["operations"])]
+
+
+@scenario("restore_noop")
+class RestoreNoop(Restore):
+    # Restoring an export into the instance it was taken from
+    def operations(self, server, scale):
+        return [lambda: run_module("restore", restore_args(server, self.src)) for _ in range(scale["operations"])]
+
+
+def fanout_args(server, target_revision):
+    return {"api_url": server.api_url, "token": "token", "http_backend": HTTP_BACKEND, "name": "app",
+            "repository_url": "https://example.com/repo.git", "path": "chart", "target_revision": target_revision,
+            "namespace": "app", "values_files": ["values.yaml", "values-{cluster}.yaml"],
+            "cluster_selector": {"env": "production"}, "max_workers": 20}
+
+
+@scenario("application_fanout")
+class ApplicationFanout(Scenario):
+    # The same chart on 60 clusters selected by label, every operation
+    # releases a new revision to all of them
+    def setup(self, server, scale):
+        for index in range(60):
+            server.seed_cluster(f"cluster-{index}", f"https://cluster-{index}.example.com", {"env": "production"})
+        run_module("application_fanout", fanout_args(server, "v0"))
+
+    def operations(self, server, scale):
+        return [lambda index=index: run_module("application_fanout", fanout_args(server, f"v{index + 1}"))
+                for index in range(scale["operations"])]
+
+
+@scenario("application_fanout_noop")
+class ApplicationFanoutNoop(ApplicationFanout):
+    def operations(self, server, scale):
+        return [lambda: run_module("application_fanout", fanout_args(server, "v0"))] * scale["operations"]
+
+
+MODULE_TASKS = [
+    ("project", {"name": "project", "description": "description"}),
+    ("project_info", {"name": "project"}),
+    ("role", {"project_name": "project", "role_name": "role", "role_description": "role"}),
+    ("policy", {"project_name": "project", "role_name": "role", "policies": ["p, proj:project:role, *, get, *, allow"]}),
+    ("group", {"project_name": "project", "role_name": "role", "groups": ["group"]}),
+    ("project_roles", {"project_name": "project", "roles": [{"name": "role", "groups": ["other"]}]}),
+    ("application", {"name": "app", "repository_url": "https://example.com/repo.git", "path": "path",
+                     "target_revision": "main", "namespace": "default", "project": "project"}),
+    ("applications", {"applications": [{"name": f"bulk-{index}", "repository_url": "https://example.com/repo.git",
+                                        "path": "path", "target_revision": "main", "namespace": "default"}
+                                       for index in range(10)]}),
+    ("application_info", {"projects": ["default", "project"], "fields": ["metadata.name", "status.sync.status"]}),
+    ("repository", {"type": "git", "repository_url": "https://example.com/repo.git", "username": "user",
+                    "password": "password", "project": "project"}),
+    ("sync", {"names": ["app"], "wait": False}),
+    ("tenant", {"projects": [{"name": f"tenant-{index}", "description": "tenant",
+                              "roles": [{"name": "developer", "groups": ["developers"],
+                                         "policies": [f"p, proj:tenant-{index}:developer, applications, get, *, allow"]}],
+                              "repositories": [{"type": "git", "repository_url": f"https://example.com/tenant-{index}.git",
+                                                "username": "user", "password": "password"}],
+                              "applications": [{"name": f"tenant-{index}-app-{app}",
+                                                "repository_url": f"https://example.com/tenant-{index}.git",
+                                                "path": "path", "target_revision": "main", "namespace": "default"}
+                                               for app in range(5)]}
+                             for index in range(3)]}),
+]
+
+
+def _module_scenario(module, args):
+    class ModuleScenario(Scenario):
+        def operations(self, server, scale):
+            return [lambda: run_module(module, dict(args, api_url=server.api_url, token="token", http_backend=HTTP_BACKEND))]
+
+    instance = ModuleScenario(f"module_{module}")
+    SCENARIOS.append(instance)
+
+
+for _module, _args in MODULE_TASKS:
+    _module_scenario(_module, _args)
+
+
+def run_scenario(item, scale, latency, project_padding):
+    with tempfile.TemporaryDirectory(prefix=f"argocd-{item.name}-") as workdir, \
+            MockArgoCD(latency=latency, project_padding=project_padding, **item.server_options) as server:
+        item.workdir = workdir
+        item.setup(server, scale)
+        # Module scenarios build on the objects of the previous module tasks
+        if item.name.startswith("module_"):
+            for module, args in MODULE_TASKS:
+                if f"module_{module}" == item.name:
+                    break
+                run_module(module, dict(args, api_url=server.api_url, token="token", http_backend=HTTP_BACKEND))
+
+        operations = item.operations(server, scale)
+        server.reset_stats()
+        latencies = []
+
+        def timed(operation):
+            started = time.perf_counter()
+            operation()
+            latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        if item.workers > 1:
+            with ThreadPoolExecutor(max_workers=item.workers) as executor:
+                list(executor.map(timed, operations))
+        else:
+            for operation in operations:
+                timed(operation)
+        elapsed = time.perf_counter() - started
+        stats = server.stats()
+
+    count = len(operations)
+    return {
+        "operations": count,
+        "requests": stats["requests"],
+        "requests_per_op": round(stats["requests"] / count, 2),
+        "bytes_in_per_op": stats["bytes_in"] // count,
+        "bytes_out_per_op": stats["bytes_out"] // count,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "ops_per_s": round(count / elapsed, 1) if elapsed else 0.0,
+        "by_route": stats["by_route"],
+        "strict": item.strict,
+    }
+
+
+def print_report(results):
+    header = f"{'scenario':32} {'ops':>6} {'req/op':>8} {'in B/op':>10} {'out B/op':>10} {'p50 ms':>9} {'p99 ms':>9} {'ops/s':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, result in results.items():
+        print(f"{name:32} {result['operations']:>6} {result['requests_per_op']:>8} "
+              f"{result['bytes_in_per_op']:>10} {result['bytes_out_per_op']:>10} "
+              f"{result['p50_ms']:>9} {result['p99_ms']:>9} {result['ops_per_s']:>9}")
+
+
+def load_baseline():
+    with open(BASELINE_PATH, "r", encoding="utf-8") as baseline_file:
+        return json.load(baseline_file)
+
+
+def check_baseline(results):
+    baseline = load_baseline()
+
+    regressions = []
+    for name, result in results.items():
+        if not result["strict"] or name not in baseline:
+            continue
+        if result["requests_per_op"] > baseline[name]["requests_per_op"]:
+            regressions.append(f"{name}: {result['requests_per_op']} requests per operation, "
+                               f"baseline {baseline[name]['requests_per_op']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added by the mock to every request")
+    parser.add_argument("--project-padding", type=int, default=0, help="bytes of filler in every project document")
+    parser.add_argument("--http-backend", choices=["auto", "requests", "urllib"], default="auto")
+    parser.add_argument("--only", action="append", help="run only these scenarios")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--check", action="store_true", help="fail when round trips exceed the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="record the round trips as the baseline")
+    options = parser.parse_args()
+
+    global HTTP_BACKEND
+    HTTP_BACKEND = options.http_backend
+    scale = SCALES[options.scale]
+    results = {}
+    for item in SCENARIOS:
+        if options.only and item.name not in options.only:
+            continue
+        results[item.name] = run_scenario(item, scale, options.latency, options.project_padding)
+
+    print_report(results)
+
+    if options.json:
+        with open(options.json, "w", encoding="utf-8") as json_file:
+            json.dump(results, json_file, indent=2, sort_keys=True)
+
+    if options.update_baseline:
+        # Scenarios left out with --only keep their recorded baseline
+        baseline = load_baseline() if options.only else {}
+        baseline.update((name, {"requests_per_op": result["requests_per_op"], "by_route": result["by_route"]})
+                        for name, result in results.items() if result["strict"])
+        with open(BASELINE_PATH, "w", encoding="utf-8") as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+
+    if options.check:
+        regressions = check_baseline(results)
+        if regressions:
+            print("\nAPI round trip regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
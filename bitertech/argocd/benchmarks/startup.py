@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# Cold start of a module: a fresh interpreter imports the module and its
+# module_utils, runs one task against the mock server and exits, the way
+# AnsiballZ runs it on a managed node.
+#
+#   python benchmarks/startup.py                  # 20 runs of project_info per HTTP backend
+#   python benchmarks/startup.py --runs 50 --module project
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+NAMESPACE_DIR = os.path.dirname(os.path.dirname(BENCHMARKS_DIR))
+
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from mock_server import MockArgoCD  # noqa: E402
+
+TASKS = {
+    "project_info": {"name": "project"},
+    "project": {"name": "project", "description": "description"},
+    "application": {"name": "app", "repository_url": "https://example.com/repo.git", "path": "path",
+                    "target_revision": "main", "namespace": "default", "project": "project"},
+}
+
+# Runs in the child interpreter, reports what the task imported on stderr
+CHILD = """
+import json, resource, runpy, sys
+sys.path.insert(0, sys.argv[1])
+from ansible.module_utils import basic
+basic._ANSIBLE_ARGS = sys.argv[3].encode("utf-8")
+basic._ANSIBLE_PROFILE = "legacy"
+try:
+    runpy.run_module("ansible_collections.bitertech.argocd.plugins.modules." + sys.argv[2], run_name="__main__")
+except SystemExit:
+    pass
+sys.stderr.write(json.dumps({"modules": len(sys.modules),
+                             "requests": "requests" in sys.modules,
+                             "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+
+def _link_collection(root):
+    os.makedirs(os.path.join(root, "ansible_collections"))
+    os.symlink(NAMESPACE_DIR, os.path.join(root, "ansible_collections", "bitertech"))
+
+
+def run_once(root, module, args):
+    payload = json.dumps({"ANSIBLE_MODULE_ARGS": args})
+    started = time.perf_counter()
+    child = subprocess.run([sys.executable, "-c", CHILD, root, module, payload],
+                           capture_output=True, text=True, check=False)
+    elapsed = time.perf_counter() - started
+    result = json.loads(child.stdout)
+    if result.get("failed"):
+        raise RuntimeError(f"module {module} failed: {result.get('msg')}")
+    return elapsed, json.loads(child.stderr.strip().splitlines()[-1])
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", choices=sorted(TASKS), default="project_info")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--json", help="write the results to this file")
+    options = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="argocd-startup-") as root, MockArgoCD() as server:
+        _link_collection(root)
+        server.seed_project("project")
+        for backend in ("requests", "urllib"):
+            args = dict(TASKS[options.module], api_url=server.api_url, token="token", http_backend=backend)
+            # First run warms the bytecode caches
+            run_once(root, options.module, args)
+            timings = []
+            for _ in range(options.runs):
+                elapsed, info = run_once(root, options.module, args)
+                timings.append(elapsed)
+            results[backend] = {
+                "p50_ms": round(percentile(timings, 0.5) * 1000, 1),
+                "p90_ms": round(percentile(timings, 0.9) * 1000, 1),
+                "modules": info["modules"],
+                "max_rss_kib": info["max_rss_kib"],
+                "imports_requests": info["requests"],
+            }
+    print(f"{'backend':10} {'p50 ms':>8} {'p90 ms':>8} {'modules':>8} {'RSS KiB':>8}  requests imported")
+    print("-" * 65)
+    for backend, result in results.items():
+        print(f"{backend:10} {result['p50_ms']:>8} {result['p90_ms']:>8} {result['modules']:>8} "
+              f"{result['max_rss_kib']:>8}  {result['imports_requests']}")
+
+    if options.json:
+        with open(options.json, "w", encoding="utf-8") as json_file:
+            json.dump(results, json_file, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from ansible_collections.bitertech.argocd.plugins.plugin_utils.argocd_action import ArgoCDAction
+
+
+class ActionModule(ArgoCDAction):
+    # The policies of the hosts editing the same role are written at once
+    MERGE_FIELD = "policies"
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+name: argocd
+short_description: HttpApi plugin for the ArgoCD API
+description:
+  - Lets the modules of the collection send their requests through a persistent, authenticated connection to the
+    ArgoCD API, so every task of a play reuses the same keep-alive channel.
+  - Use it with C(ansible_connection=ansible.netcommon.httpapi) and C(ansible_network_os=bitertech.argocd.argocd).
+  - The modules then do not need O(api_url) nor O(token).
+options:
+  token:
+    description:
+      - ArgoCD API token.
+      - When not set, a session token is requested with C(ansible_user) and C(ansible_httpapi_pass).
+    type: str
+    env:
+      - name: ARGOCD_TOKEN
+    vars:
+      - name: ansible_httpapi_argocd_token
+  api_base_path:
+    description: Path of the ArgoCD API on the server.
+    type: str
+    default: /api/v1
+    vars:
+      - name: ansible_httpapi_argocd_base_path
+'''
+
+import json
+
+from ansible.module_utils.six.moves.urllib.parse import urlencode
+from ansible_collections.ansible.netcommon.plugins.plugin_utils.httpapi_base import HttpApiBase
+
+
+BASE_HEADERS = {
+    "Content-Type": "application/json",
+    "Accept": "application/json",
+}
+
+
+class HttpApi(HttpApiBase):
+
+    def _base_path(self):
+        return self.get_option("api_base_path").rstrip("/")
+
+    def login(self, username, password):
+        token = self.get_option("token")
+        if not token and username and password:
+            # Exchange the credentials for a session token
+            data = json.dumps({"username": username, "password": password})
+            response, response_data = self.connection.send(f"{self._base_path()}/session",
+                                                           data,
+                                                           method="POST",
+                                                           headers=BASE_HEADERS)
+            token = json.loads(response_data.getvalue())["token"]
+
+        if token:
+            self.connection._auth = {"Authorization": f"Bearer {token}"}
+
+    def logout(self):
+        # Tokens are stateless, nothing to release
+        pass
+
+    def handle_httperror(self, exc):
+        # Let the client see the error responses instead of raising, except
+        # for an expired session which is renewed once
+        if exc.code == 401 and self.connection._auth and not self.get_option("token"):
+            self.connection._auth = None
+            self.login(self.connection.get_option("remote_user"), self.connection.get_option("password"))
+            return True
+        return exc
+
+    def send_request(self, method, path, query=None, data=None):
+        url = f"{self._base_path()}{path}"
+        if query:
+            url = f"{url}?{urlencode(query, doseq=True)}"
+
+        response, response_data = self.connection.send(url, data, method=method, headers=BASE_HEADERS)
+
+        headers = dict(response.headers.items()) if response.headers else {}
+        return response.getcode(), headers, response_data.getvalue().decode("utf-8")
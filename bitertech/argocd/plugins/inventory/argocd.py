@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+name: argocd
+short_description: ArgoCD applications inventory source
+description:
+  - Builds an inventory of the ArgoCD applications, one host per application.
+  - Applications are grouped by project, destination namespace and destination cluster.
+  - Only the fields needed to build the inventory are requested from the API.
+  - Uses a YAML configuration file that ends with C(argocd.yml) or C(argocd.yaml).
+extends_documentation_fragment:
+  - constructed
+  - inventory_cache
+options:
+  plugin:
+    description: Token that ensures this is a source file for the plugin.
+    required: true
+    choices: ['bitertech.argocd.argocd']
+  api_url:
+    description: URL of the ArgoCD API, for instance C(https://argocd.example.com/api/v1).
+    required: true
+    type: str
+    env:
+      - name: ARGOCD_API_URL
+  token:
+    description: ArgoCD API token.
+    required: true
+    type: str
+    env:
+      - name: ARGOCD_TOKEN
+  projects:
+    description: Only include the applications of these projects.
+    type: list
+    elements: str
+    default: []
+  selector:
+    description: Label selector applied to the applications.
+    type: str
+  ca_bundle:
+    description: Path to a CA bundle used to verify the server certificate.
+    type: path
+  connect_timeout:
+    description: Seconds to wait for the connection to be established.
+    type: float
+    default: 10
+  read_timeout:
+    description: Seconds to wait for the server response.
+    type: float
+    default: 30
+'''
+
+EXAMPLES = r'''
+# argocd.yml
+plugin: bitertech.argocd.argocd
+api_url: https://argocd.example.com/api/v1
+projects:
+  - my-project
+cache: true
+cache_plugin: ansible.builtin.jsonfile
+cache_connection: /tmp/argocd_inventory
+cache_timeout: 600
+keyed_groups:
+  - key: argocd_health_status
+    prefix: health
+'''
+
+from ansible.errors import AnsibleError
+from ansible.plugins.inventory import BaseInventoryPlugin, Constructable, Cacheable
+
+try:
+    from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient
+except ImportError as imp_exc:
+    ARGOCD_CLIENT_IMPORT_ERROR = imp_exc
+else:
+    ARGOCD_CLIENT_IMPORT_ERROR = None
+
+
+# Only these parts of the applications are downloaded
+APPLICATION_FIELDS = [
+    "items.metadata.name",
+    "items.metadata.labels",
+    "items.spec.project",
+    "items.spec.destination",
+    "items.spec.source.repoURL",
+    "items.spec.source.path",
+    "items.spec.source.targetRevision",
+    "items.status.sync.status",
+    "items.status.health.status",
+]
+
+
+class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
+
+    NAME = 'bitertech.argocd.argocd'
+
+    def verify_file(self, path):
+        if super(InventoryModule, self).verify_file(path):
+            return path.endswith(('argocd.yml', 'argocd.yaml'))
+        return False
+
+    def _fetch(self):
+        client = ArgoCDClient(self.get_option('api_url'),
+                              self.get_option('token'),
+                              connect_timeout=self.get_option('connect_timeout'),
+                              read_timeout=self.get_option('read_timeout'),
+                              ca_bundle=self.get_option('ca_bundle'))
+        with client:
+            applications = client.list_applications(projects=self.get_option('projects'),
+                                                    selector=self.get_option('selector'),
+                                                    fields=APPLICATION_FIELDS)
+            clusters = client.list_clusters()
+
+        return {
+            "applications": applications,
+            # Only the server to name mapping of the clusters is kept
+            "clusters": {cluster.get("server"): cluster.get("name") for cluster in clusters},
+        }
+
+    def _add_to_group(self, prefix, value, host):
+        if not value:
+            return
+        group = self.inventory.add_group(self._sanitize_group_name(f"argocd_{prefix}_{value}"))
+        self.inventory.add_child(group, host)
+
+    def _populate(self, results):
+        strict = self.get_option('strict')
+
+        for application in results["applications"]:
+            metadata = application.get("metadata", {})
+            spec = application.get("spec", {})
+            status = application.get("status", {})
+            destination = spec.get("destination", {})
+            cluster = destination.get("name") or results["clusters"].get(destination.get("server"))
+
+            host = self.inventory.add_host(metadata["name"])
+            hostvars = {
+                "argocd_project": spec.get("project"),
+                "argocd_labels": metadata.get("labels") or {},
+                "argocd_destination_server": destination.get("server"),
+                "argocd_destination_cluster": cluster,
+                "argocd_destination_namespace": destination.get("namespace"),
+                "argocd_source": spec.get("source") or {},
+                "argocd_sync_status": status.get("sync", {}).get("status"),
+                "argocd_health_status": status.get("health", {}).get("status"),
+            }
+            for key, value in hostvars.items():
+                self.inventory.set_variable(host, key, value)
+
+            self._add_to_group("project", spec.get("project"), host)
+            self._add_to_group("namespace", destination.get("namespace"), host)
+            self._add_to_group("destination", cluster or destination.get("server"), host)
+
+            self._set_composite_vars(self.get_option('compose'), hostvars, host, strict=strict)
+            self._add_host_to_composed_groups(self.get_option('groups'), hostvars, host, strict=strict)
+            self._add_host_to_keyed_groups(self.get_option('keyed_groups'), hostvars, host, strict=strict)
+
+    def parse(self, inventory, loader, path, cache=True):
+        super(InventoryModule, self).parse(inventory, loader, path, cache)
+
+        if ARGOCD_CLIENT_IMPORT_ERROR:
+            raise AnsibleError(f"The ArgoCD client could not be loaded: {ARGOCD_CLIENT_IMPORT_ERROR}")
+
+        self._read_config_data(path)
+
+        cache_key = self.get_cache_key(path)
+        # cache is False when the inventory is being refreshed
+        user_cache_setting = self.get_option('cache')
+        attempt_to_read_cache = user_cache_setting and cache
+        cache_needs_update = user_cache_setting and not cache
+
+        results = None
+        if attempt_to_read_cache:
+            try:
+                results = self._cache[cache_key]
+            except KeyError:
+                cache_needs_update = True
+
+        if results is None:
+            try:
+                results = self._fetch()
+            except Exception as exc:
+                raise AnsibleError(f"Failed to list the ArgoCD applications: {exc}")
+
+        if cache_needs_update:
+            self._cache[cache_key] = results
+
+        self._populate(results)
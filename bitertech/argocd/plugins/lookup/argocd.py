@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+name: argocd
+short_description: Read ArgoCD projects and applications
+description:
+  - Returns ArgoCD projects or applications, the requests are made from the controller.
+  - Results are memoized on disk for O(cache_ttl) seconds and shared by every host and fork of the run, so the same
+    lookup evaluated for hundreds of hosts costs a single API call.
+  - By default the results are only kept for the current run. A lookup evaluated after a task that changed the object
+    may return the memoized result, set O(cache_ttl=0) there.
+options:
+  _terms:
+    description:
+      - Names of the projects or applications to return.
+      - With O(kind=applications), names of the projects whose applications are listed, all when empty.
+    type: list
+    elements: str
+  kind:
+    description: Type of object to return.
+    type: str
+    choices: ['project', 'application', 'applications']
+    default: project
+  api_url:
+    description: URL of the ArgoCD API, for instance C(https://argocd.example.com/api/v1).
+    type: str
+    required: true
+    env:
+      - name: ARGOCD_API_URL
+  token:
+    description: ArgoCD API token.
+    type: str
+    required: true
+    env:
+      - name: ARGOCD_TOKEN
+  selector:
+    description: Label selector applied when O(kind=applications).
+    type: str
+  fields:
+    description: Paths of the fields returned by the API when O(kind=applications), for instance C(items.metadata.name).
+    type: list
+    elements: str
+  ca_bundle:
+    description: Path to a CA bundle used to verify the server certificate.
+    type: path
+  cache_dir:
+    description:
+      - Directory where the results are memoized.
+      - By default a directory of the run, removed when it ends. Set it to reuse the results in the next runs.
+    type: path
+  cache_ttl:
+    description: Seconds a memoized result is reused, V(0) disables memoization.
+    type: int
+    default: 300
+'''
+
+EXAMPLES = r'''
+- name: Description of the project of every host
+  ansible.builtin.debug:
+    msg: "{{ lookup('bitertech.argocd.argocd', argocd_project_name).metadata.description }}"
+
+- name: Names of the applications of a project
+  ansible.builtin.debug:
+    msg: "{{ query('bitertech.argocd.argocd', 'my-project', kind='applications', fields=['items.metadata.name'])
+             | map(attribute='metadata.name') }}"
+'''
+
+RETURN = r'''
+_raw:
+  description:
+    - One project or application document per term.
+    - With O(kind=applications), the application documents.
+  type: list
+  elements: dict
+'''
+
+import fcntl
+import hashlib
+import json
+import os
+
+from ansible import constants as C
+from ansible.errors import AnsibleError
+from ansible.plugins.lookup import LookupBase
+
+try:
+    from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient
+    from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_cache import SnapshotCache
+except ImportError as imp_exc:
+    ARGOCD_CLIENT_IMPORT_ERROR = imp_exc
+else:
+    ARGOCD_CLIENT_IMPORT_ERROR = None
+
+
+class LookupModule(LookupBase):
+
+    def _client(self):
+        if self._argocd_client is None:
+            self._argocd_client = ArgoCDClient(self.get_option('api_url'),
+                                               self.get_option('token'),
+                                               ca_bundle=self.get_option('ca_bundle'))
+        return self._argocd_client
+
+    def _fetch(self, kind, name):
+        if kind == 'project':
+            return self._client().get_project(name)
+        if kind == 'application':
+            return self._client().get_application(name)
+        return self._client().list_applications(projects=[name] if name else None,
+                                                selector=self.get_option('selector'),
+                                                fields=self.get_option('fields'))
+
+    def _memoized(self, cache, kind, name):
+        # The key covers every option that changes the result
+        key = hashlib.sha256(json.dumps([name,
+                                         self.get_option('selector'),
+                                         self.get_option('fields')]).encode("utf-8")).hexdigest()
+        cache_kind = f"lookup_{kind}"
+
+        entry = cache.get(cache_kind, key)
+        if entry is not None:
+            return entry["result"]
+        if not cache.cache_dir:
+            result = self._fetch(kind, name)
+            cache.put(cache_kind, key, {"result": result})
+            return result
+
+        # Forks evaluating the same lookup at the same time wait for the first
+        # one to fetch the result instead of all calling the API
+        os.makedirs(cache.cache_dir, mode=0o700, exist_ok=True)
+        lock_path = os.path.join(cache.cache_dir, f"{cache_kind}_{key}.lock")
+        lock_file = self._lock(lock_path)
+        try:
+            entry = cache.get(cache_kind, key)
+            if entry is not None:
+                return entry["result"]
+            result = self._fetch(kind, name)
+            cache.put(cache_kind, key, {"result": result})
+            return result
+        finally:
+            # Removed before it is released, the forks waiting on it lock a
+            # new file and find the result
+            os.remove(lock_path)
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    @staticmethod
+    def _lock(lock_path):
+        # Lock the file at lock_path, retrying when it was removed by its
+        # previous holder while this process waited on it
+        while True:
+            lock_file = open(lock_path, "a")
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if os.path.samestat(os.fstat(lock_file.fileno()), os.stat(lock_path)):
+                    return lock_file
+            except FileNotFoundError:
+                pass
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    def run(self, terms, variables=None, **kwargs):
+        if ARGOCD_CLIENT_IMPORT_ERROR:
+            raise AnsibleError(f"The ArgoCD client could not be loaded: {ARGOCD_CLIENT_IMPORT_ERROR}")
+
+        self.set_options(var_options=variables, direct=kwargs)
+        self._argocd_client = None
+
+        kind = self.get_option('kind')
+        cache = SnapshotCache(self.get_option('api_url'),
+                              cache_dir=self.get_option('cache_dir') or os.path.join(C.DEFAULT_LOCAL_TMP,
+                                                                                     "argocd_lookup"),
+                              ttl=self.get_option('cache_ttl'))
+
+        names = terms or ([None] if kind == 'applications' else [])
+        results = []
+        try:
+            for name in names:
+                result = self._memoized(cache, kind, name)
+                if kind == 'applications':
+                    results.extend(result)
+                else:
+                    results.append(result)
+        except Exception as exc:
+            raise AnsibleError(f"ArgoCD lookup of {kind} failed: {exc}")
+        finally:
+            if self._argocd_client is not None:
+                self._argocd_client.close()
+
+        return results
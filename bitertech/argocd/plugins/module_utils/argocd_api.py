@@ -1,19 +1,617 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
-import json
+import copy
+import gzip
+import random
+import time
 
-import requests
+from urllib.parse import quote
+
+from ansible.module_utils.basic import missing_required_lib
+from ansible.module_utils.connection import Connection
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_cache import SnapshotCache
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_diff import (
+    apply_merge_patch,
+    diff_objects,
+    is_subset,
+    make_diff,
+    merge_patch,
+)
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_http import (
+    ArgoCDCircuitOpen,
+    ArgoCDConnectionError,
+    ArgoCDError,
+    ArgoCDHTTPError,
+    ArgoCDStreamIdle,
+    ArgoCDStreamInterrupted,
+    ArgoCDTimeout,
+    HAS_REQUESTS,
+    HttpApiTransport,
+    make_transport,
+)
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_json import HAS_ORJSON, iter_json_items, make_codec
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_metrics import ApiMetrics, opentelemetry_hook
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_policy import member_index, normalize_policy
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_retry import (
+    GATEWAY_STATUSES,
+    IDEMPOTENT_METHODS,
+    RETRY_STATUSES,
+    CircuitBreaker,
+    RateLimiter,
+    RetryPolicy,
+    parse_retry_after,
+)
+
+# Options shared by every module to tune the client and its HTTP session
+ARGOCD_SESSION_ARGS = {
+    "pool_size": {"required": False, "type": 'int', "default": 10},
+    "keep_alive": {"required": False, "type": 'bool', "default": True},
+    "connect_timeout": {"required": False, "type": 'float', "default": 10},
+    "read_timeout": {"required": False, "type": 'float', "default": 30},
+    "ca_bundle": {"required": False, "type": 'path'},
+    "cache_dir": {"required": False, "type": 'path'},
+    "cache_ttl": {"required": False, "type": 'int', "default": 0},
+    "conflict_retries": {"required": False, "type": 'int', "default": 5},
+    "api_metrics": {"required": False, "type": 'bool', "default": False},
+    "trace_file": {"required": False, "type": 'path'},
+    "opentelemetry": {"required": False, "type": 'bool', "default": False},
+    "http_backend": {"required": False, "type": 'str', "default": 'auto', "choices": ['auto', 'requests', 'urllib']},
+    "retries": {"required": False, "type": 'int', "default": 3},
+    "retry_backoff": {"required": False, "type": 'float', "default": 0.5},
+    "retry_max_backoff": {"required": False, "type": 'float', "default": 30},
+    "rate_limit": {"required": False, "type": 'float', "default": 0},
+    "rate_burst": {"required": False, "type": 'int'},
+    "circuit_breaker_threshold": {"required": False, "type": 'int', "default": 5},
+    "circuit_breaker_timeout": {"required": False, "type": 'float', "default": 30},
+    "circuit_breaker_file": {"required": False, "type": 'path'},
+    "json_codec": {"required": False, "type": 'str', "default": 'auto', "choices": ['auto', 'orjson', 'json']},
+    "compress_requests": {"required": False, "type": 'bool', "default": False},
+}
+
+# Options of the modules creating applications, their sync policy
+APPLICATION_SYNC_ARGS = {
+    "auto_sync": {"required": False, "type": 'bool', "default": True},
+    "self_heal": {"required": False, "type": 'bool', "default": True},
+    "prune": {"required": False, "type": 'bool', "default": True},
+    "sync_options": {"required": False, "type": 'list', "elements": 'str'},
+}
+
+# Request bodies smaller than this are not worth compressing
+_COMPRESS_MIN_SIZE = 1024
+
+# Statuses of a server that is down or overloaded, counted by the circuit
+# breaker. A 429 comes from a server that is up and is not counted.
+_SERVER_DOWN_STATUSES = (502, 503, 504)
+
+# Default of the live arguments: the object is fetched from the API. Callers
+# that already listed the objects pass the live document, or None when the
+# object does not exist, to save the round trip.
+_FETCH = object()
+
+
+def repository_key(repository_url, project):
+    # Repositories are unique per URL and project
+    return repository_url, project or None
+
+
+def find_role(project_json, role_name):
+    for role in project_json.get("spec", {}).get("roles", []) or []:
+        if role.get("name") == role_name:
+            return role
+    return None
+
+
+def ensure_role(project_json, role_name, role_description=None):
+    if "spec" not in project_json:
+        project_json["spec"] = {}
+    if not project_json["spec"].get("roles"):
+        project_json["spec"]["roles"] = []
+
+    role = find_role(project_json, role_name)
+    if role is None:
+        role = {"name": role_name}
+        project_json["spec"]["roles"].append(role)
+    if role_description is not None:
+        role["description"] = role_description
+    return role
+
+
+def remove_role(project_json, role_name):
+    roles = project_json.get("spec", {}).get("roles", []) or []
+    project_json.setdefault("spec", {})["roles"] = [role for role in roles
+                                                    if role.get("name") != role_name]
+
+
+def update_role_members(role, key, members, status):
+    # key is "policies" or "groups", status one of present, absent or
+    # exclusive (the role ends up with exactly the given members). Policies
+    # are compared on their parsed fields, so spacing differences do not
+    # count as a different policy.
+    normalize = normalize_policy if key == "policies" else str.strip
+    current = member_index(key, role.get(key) or [])
+
+    if status == "present":
+        for member in members:
+            current.add(normalize(member))
+        role[key] = current.values()
+
+    if status == "absent":
+        for member in members:
+            current.discard(member)
+        role[key] = current.values()
+
+    if status == "exclusive":
+        # Keep the spelling already stored for the members that stay
+        index = member_index(key)
+        for member in members:
+            index.add(current.get(member, normalize(member)))
+        role[key] = index.values()
+
+
+def apply_roles(project_json, roles, status):
+    # Apply role, policy and group edits to a project document. Each role is
+    # a dict with a name and optional description, policies and groups.
+    if status == "exclusive":
+        wanted = set(role["name"] for role in roles)
+        for role in list(project_json.get("spec", {}).get("roles", []) or []):
+            if role.get("name") not in wanted:
+                remove_role(project_json, role.get("name"))
+
+    for desired in roles:
+        policies = desired.get("policies")
+        groups = desired.get("groups")
+
+        if status == "absent":
+            if policies is None and groups is None:
+                remove_role(project_json, desired["name"])
+                continue
+            target_role = find_role(project_json, desired["name"])
+            if target_role is None:
+                continue
+        else:
+            target_role = ensure_role(project_json,
+                                      desired["name"],
+                                      desired.get("description"))
+
+        if policies is not None:
+            update_role_members(target_role, "policies", policies, status)
+        if groups is not None:
+            update_role_members(target_role, "groups", groups, status)
 
 
 class ArgoCDClient:
 
-    def __init__(self, argo_api_url, api_token):
-        self.argo_api_url = argo_api_url
+    def __init__(self,
+                 argo_api_url,
+                 api_token,
+                 pool_size=10,
+                 keep_alive=True,
+                 connect_timeout=10,
+                 read_timeout=30,
+                 ca_bundle=None,
+                 cache_dir=None,
+                 cache_ttl=0,
+                 conflict_retries=5,
+                 check_mode=False,
+                 connection=None,
+                 metrics=None,
+                 http_backend="auto",
+                 retry=None,
+                 rate_limiter=None,
+                 breaker=None,
+                 json_codec="auto",
+                 compress_requests=False):
+        self.argo_api_url = argo_api_url.rstrip("/") if argo_api_url else ""
         # Headers for the API request
         self.headers = {
             "Authorization": f"Bearer {api_token}",
             "Content-Type": "application/json",
         }
+        if not keep_alive:
+            self.headers["Connection"] = "close"
+        # Project and application lists compress about tenfold
+        self.headers["Accept-Encoding"] = "gzip"
+
+        # Requests go either through the persistent httpapi connection, which
+        # owns the authenticated channel, or through our own HTTP transport
+        self.connection = connection
+        if connection is not None:
+            self.transport = HttpApiTransport(connection)
+        else:
+            self.transport = make_transport(http_backend,
+                                            self.headers,
+                                            connect_timeout=connect_timeout,
+                                            read_timeout=read_timeout,
+                                            pool_size=pool_size,
+                                            ca_bundle=ca_bundle)
+
+        # Project snapshots, so a sequence of edits on the same project does
+        # not download the whole AppProject document again and again
+        cache_scope = self.argo_api_url or getattr(connection, "socket_path", "httpapi")
+        self.cache = SnapshotCache(cache_scope, cache_dir=cache_dir, ttl=cache_ttl)
+
+        # Number of times a read-modify-write is replayed when the project
+        # was modified by someone else between the GET and the PUT
+        self.conflict_retries = conflict_retries
+
+        # In check mode changes are computed but never written
+        self.check_mode = check_mode
+
+        # Every HTTP call is recorded here
+        self.metrics = metrics or ApiMetrics()
+
+        # Transient failures (429, 502-504 and connection errors) are retried
+        # with backoff. The rate limiter and the circuit breaker are optional
+        # and shared by every thread using the client.
+        self.retry = retry or RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+
+        # Encoder and decoder of the bodies, and whether large request
+        # bodies are sent gzip compressed, which the server must accept
+        self.codec = make_codec(json_codec)
+        self.compress_requests = compress_requests and self.transport.supports_compression
+
+    @staticmethod
+    def _metrics_from_params(params):
+        hooks = []
+        if params.get("opentelemetry"):
+            hook = opentelemetry_hook()
+            if hook is not None:
+                hooks.append(hook)
+        return ApiMetrics(trace_file=params.get("trace_file"), hooks=hooks)
+
+    @staticmethod
+    def _resilience_from_params(params):
+        rate_limit = params.get("rate_limit") or 0
+        threshold = params.get("circuit_breaker_threshold", 5)
+        return {
+            "retry": RetryPolicy(retries=params.get("retries", 3),
+                                 backoff=params.get("retry_backoff", 0.5),
+                                 max_backoff=params.get("retry_max_backoff", 30)),
+            "rate_limiter": RateLimiter(rate_limit, params.get("rate_burst")) if rate_limit > 0 else None,
+            # A threshold of 0 disables the breaker
+            "breaker": CircuitBreaker(threshold,
+                                      reset_timeout=params.get("circuit_breaker_timeout", 30),
+                                      state_file=params.get("circuit_breaker_file")) if threshold else False,
+        }
+
+    @classmethod
+    def from_params(cls, params, check_mode=False):
+        return cls(params["api_url"],
+                   params["token"],
+                   pool_size=params.get("pool_size", 10),
+                   keep_alive=params.get("keep_alive", True),
+                   connect_timeout=params.get("connect_timeout", 10),
+                   read_timeout=params.get("read_timeout", 30),
+                   ca_bundle=params.get("ca_bundle"),
+                   cache_dir=params.get("cache_dir"),
+                   cache_ttl=params.get("cache_ttl", 0),
+                   conflict_retries=params.get("conflict_retries", 5),
+                   check_mode=check_mode,
+                   metrics=cls._metrics_from_params(params),
+                   http_backend=params.get("http_backend", "auto"),
+                   json_codec=params.get("json_codec", "auto"),
+                   compress_requests=params.get("compress_requests", False),
+                   **cls._resilience_from_params(params))
+
+    @classmethod
+    def from_module(cls, module, **overrides):
+        # Build the client of a module, using the persistent connection when
+        # the task runs with connection: httpapi and no api_url is given
+        params = dict(module.params, **overrides)
+        if params.get("json_codec") == "orjson" and not HAS_ORJSON:
+            module.fail_json(msg=missing_required_lib("orjson"))
+        if params.get("http_backend") == "requests" and not HAS_REQUESTS and params.get("api_url"):
+            module.fail_json(msg=missing_required_lib("requests"))
+
+        if module._socket_path and not params.get("api_url"):
+            return cls(None,
+                       None,
+                       cache_dir=params.get("cache_dir"),
+                       cache_ttl=params.get("cache_ttl", 0),
+                       conflict_retries=params.get("conflict_retries", 5),
+                       check_mode=module.check_mode,
+                       connection=Connection(module._socket_path),
+                       metrics=cls._metrics_from_params(params),
+                       json_codec=params.get("json_codec", "auto"),
+                       **cls._resilience_from_params(params))
+
+        if not params.get("api_url") or not params.get("token"):
+            module.fail_json(msg="api_url and token are required unless the task uses the httpapi connection")
+        return cls.from_params(params, check_mode=module.check_mode)
+
+    def metrics_result(self, params):
+        # Extra keys of a module result, the api_metrics block when requested
+        if params.get("api_metrics"):
+            return {"api_metrics": self.metrics.as_dict()}
+        return {}
+
+    def close(self):
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _request(self, method, path, path_params=None, body=None, query=None):
+        # path is a template such as "/projects/{name}", its parameters are
+        # quoted before being substituted. Metrics are grouped by template.
+        route = path
+        if path_params:
+            path = path.format(**{key: quote(str(value), safe="")
+                                  for key, value in path_params.items()})
+
+        data = self.codec.dumps(body) if body is not None else None
+        headers = None
+        if data is not None and self.compress_requests and len(data) >= _COMPRESS_MIN_SIZE:
+            data = gzip.compress(data, compresslevel=6)
+            headers = {"Content-Encoding": "gzip"}
+        started = time.time()
+        counter = time.perf_counter()
+        status = None
+        bytes_in = 0
+        attempt = 0
+        try:
+            while True:
+                try:
+                    self._admit()
+                    response = self.transport.request(method, f"{self.argo_api_url}{path}",
+                                                      query=query, data=data, headers=headers)
+                except ArgoCDCircuitOpen:
+                    raise
+                except ArgoCDConnectionError as error:
+                    self._observe(None)
+                    delay = self._retry_delay(method, attempt, error=error)
+                    if delay is None:
+                        raise
+                else:
+                    self._observe(response.status_code)
+                    response.loads = self.codec.loads
+                    status = response.status_code
+                    bytes_in = len(response.content)
+                    delay = self._retry_delay(method, attempt, response=response)
+                    if delay is None:
+                        return response
+
+                time.sleep(delay)
+                attempt += 1
+        finally:
+            self.metrics.record(method, route, status, started, time.perf_counter() - counter,
+                                bytes_in, len(data) if data else 0, retries=attempt)
+
+    def _admit(self):
+        # Every request goes through the circuit breaker, then waits for its
+        # turn in the rate limiter
+        if self.breaker and not self.breaker.allow():
+            raise ArgoCDCircuitOpen(f"The ArgoCD API failed repeatedly, requests are blocked for "
+                                    f"{self.breaker.remaining():.0f} more seconds")
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+    def _observe(self, status):
+        # Outcome of a request for the circuit breaker, status is None after a
+        # connection error
+        if self.breaker:
+            if status is None or status in _SERVER_DOWN_STATUSES:
+                self.breaker.failure()
+            else:
+                self.breaker.success()
+
+    def _retry_delay(self, method, attempt, response=None, error=None):
+        # Seconds to wait before retrying a request, None when its outcome is
+        # final. Requests failing with a connection error or a gateway error
+        # are only retried when sending them twice is harmless.
+        if attempt >= self.retry.retries:
+            return None
+        if error is not None:
+            return self.retry.delay(attempt) if method in IDEMPOTENT_METHODS else None
+        if response.status_code in GATEWAY_STATUSES:
+            if method not in IDEMPOTENT_METHODS:
+                return None
+        elif response.status_code not in RETRY_STATUSES:
+            return None
+        return self.retry.delay(attempt, parse_retry_after(response.headers.get("retry-after")))
+
+    def _stream_lines(self, path, query=None, read_timeout=None):
+        # Iterate over the lines of a streaming endpoint, each read waits at
+        # most read_timeout seconds
+        started = time.time()
+        counter = time.perf_counter()
+        status = 200
+        bytes_in = 0
+        opened = False
+        self._admit()
+        try:
+            for line in self.transport.stream_lines(f"{self.argo_api_url}{path}", query, read_timeout):
+                # The first line tells the circuit breaker the server answered,
+                # which also ends a half-open probe before a long watch
+                if not opened:
+                    opened = True
+                    self._observe(status)
+                bytes_in += len(line) + 1
+                if line:
+                    yield line
+            if not opened:
+                self._observe(status)
+        except ArgoCDHTTPError as errh:
+            status = errh.response.status_code
+            self._observe(status)
+            raise
+        except (ArgoCDStreamIdle, ArgoCDStreamInterrupted):
+            # The server answered, an idle stream is not a failure
+            if not opened:
+                self._observe(status)
+            raise
+        except ArgoCDConnectionError:
+            if not opened:
+                self._observe(None)
+            raise
+        finally:
+            self.metrics.record("GET", path, status, started, time.perf_counter() - counter, bytes_in, 0)
+
+    def _list_items(self, path, query=None):
+        # Iterate over the items of a list endpoint. They are decoded one at a
+        # time as the body arrives, instead of holding the whole body and its
+        # decoded copy in memory.
+        if not self.transport.supports_streaming:
+            response = self._request("GET", path, query=query)
+            response.raise_for_status()
+            yield from response.json().get("items") or []
+            return
+
+        started = time.time()
+        counter = time.perf_counter()
+        status = 200
+        bytes_in = 0
+        attempt = 0
+
+        def chunks():
+            nonlocal bytes_in
+            self._admit()
+            for index, chunk in enumerate(self.transport.stream_chunks(f"{self.argo_api_url}{path}", query)):
+                # Report the answer on the first chunk, a caller may stop
+                # reading before the end of the list
+                if not index:
+                    self._observe(status)
+                bytes_in += len(chunk)
+                yield chunk
+
+        try:
+            while True:
+                # A list that failed before its first item is retried like
+                # any other request, once items were yielded it cannot be
+                items = 0
+                try:
+                    for item in iter_json_items(chunks()):
+                        items += 1
+                        yield item
+                    self._observe(status)
+                    return
+                except ArgoCDHTTPError as errh:
+                    status = errh.response.status_code
+                    self._observe(status)
+                    delay = None if items else self._retry_delay("GET", attempt, response=errh.response)
+                    if delay is None:
+                        raise
+                except ArgoCDCircuitOpen:
+                    raise
+                except ArgoCDConnectionError as error:
+                    self._observe(None)
+                    delay = None if items else self._retry_delay("GET", attempt, error=error)
+                    if delay is None:
+                        raise
+
+                time.sleep(delay)
+                attempt += 1
+                status = 200
+        except ValueError as exc:
+            raise ArgoCDError(f"Invalid response of {path}: {exc}")
+        finally:
+            self.metrics.record("GET", path, status, started, time.perf_counter() - counter, bytes_in, 0,
+                                retries=attempt)
+
+    def _fetch_project(self, project_name, missing_ok=False, stored=False):
+        # Return a private copy of the project, served from the snapshot
+        # cache when possible. Snapshots stored on disk by an earlier task
+        # are only used with stored=True, as the base of an update.
+        project_json = self.cache.get("projects", project_name, stored=stored)
+        if project_json is not None:
+            return project_json
+
+        response = self._request("GET", "/projects/{name}",
+                                 path_params={"name": project_name})
+        if missing_ok and response.status_code == 404:
+            return None
+
+        response.raise_for_status()
+
+        project_json = response.json()
+        self.cache.put("projects", project_name, project_json)
+        return project_json
+
+    @staticmethod
+    def _is_conflict(response):
+        # Kubernetes rejects writes carrying a stale resourceVersion, ArgoCD
+        # surfaces it as a 409 or with the Kubernetes conflict message
+        if response.status_code == 409:
+            return True
+        return response.status_code >= 400 and "the object has been modified" in response.text
+
+    def _put_project(self, project_name, project_json):
+        # The document keeps the metadata.resourceVersion it was read with,
+        # so the server rejects the write if the project changed meanwhile
+        response = self._request("PUT", "/projects/{name}",
+                                 path_params={"name": project_name},
+                                 body={"project": project_json})
+
+        if self._is_conflict(response):
+            # Our snapshot is older than the live object
+            self.cache.invalidate("projects", project_name)
+
+        response.raise_for_status()
+
+        self.cache.put("projects", project_name, response.json())
+        return response
+
+    def _update_project(self, project_name, mutate):
+        # Read-modify-write of a project. mutate changes the document in
+        # place and may return an error dict to abort the update. On a
+        # resourceVersion conflict the project is fetched again and mutate
+        # is replayed on the fresh document.
+        attempt = 0
+        # The project as read before the first PUT that was sent
+        sent = {}
+        while True:
+            try:
+                return self._try_update_project(project_name, mutate, sent)
+            except ArgoCDHTTPError as errh:
+                if attempt >= self.conflict_retries or not self._is_conflict(errh.response):
+                    raise
+
+            # Exponential backoff with jitter so competing writers spread out
+            self.metrics.record_conflict_retry()
+            time.sleep(min(0.1 * 2 ** attempt, 2.0) * random.uniform(0.5, 1.5))
+            attempt += 1
+
+    def _try_update_project(self, project_name, mutate, sent=None):
+        # Step 1: Get the project data and apply the change to it. A snapshot
+        # from disk may be stale, it is only trusted as the base of a PUT,
+        # which the server rejects when the resourceVersion changed. When it
+        # leads to no write, the project is read again.
+        for stored in (True, False):
+            project_json = self._fetch_project(project_name, stored=stored)
+            before = copy.deepcopy(project_json)
+            error = mutate(project_json)
+            if (error is None and diff_objects(project_json, before)) or not self.cache.loaded("projects", project_name):
+                break
+
+        # Step 2: The change may not apply to this project
+        if error is not None:
+            return error, None
+
+        # Step 3: Skip the write when the document is unchanged. A replay
+        # finding nothing to do after a PUT was sent may be seeing that PUT:
+        # its response was lost and the retry hit a conflict on the version
+        # it had changed. The change is reported against the project as it
+        # was before that PUT.
+        if not diff_objects(project_json, before):
+            written = (sent or {}).get("before")
+            if written is not None and diff_objects(before, written):
+                return before, make_diff(written, before)
+            return before, None
+
+        diff = make_diff(before, project_json)
+        if self.check_mode:
+            return project_json, diff
+
+        # Step 4: Update the project with the modified data
+        if sent is not None:
+            sent.setdefault("before", before)
+        response = self._put_project(project_name, project_json)
+        return response.json(), diff
 
     def create_application(self,
                            name,
@@ -23,8 +621,18 @@ class ArgoCDClient:
                            values_files=None,
                            destination_server="https://kubernetes.default.svc",
                            namespace="default",
-                           project="default"):
-        # Define the application spec
+                           project="default",
+                           auto_sync=True,
+                           self_heal=True,
+                           prune=True,
+                           sync_options=None,
+                           upsert=False,
+                           live=_FETCH):
+        if isinstance(values_files, str):
+            values_files = [values_files]
+
+        # Define the application spec. An empty automated block turns
+        # automated sync off, sync options are left alone when not given.
         application_spec = {
             "metadata": {
                 "name": name,
@@ -36,7 +644,7 @@ class ArgoCDClient:
                     "path": path,
                     "targetRevision": target_revision,
                     "helm": {
-                        "valueFiles": [values_files]
+                        "valueFiles": values_files or []
                     }
                 },
                 "destination": {
@@ -45,30 +653,217 @@ class ArgoCDClient:
                 },
                 "syncPolicy": {
                     "automated": {
-                        "selfHeal": True,
-                        "prune": True
-                    }
+                        "selfHeal": self_heal,
+                        "prune": prune
+                    } if auto_sync else {},
+                    "syncOptions": sync_options,
                 },
             },
         }
 
-        # Create the application
-        response = requests.post(f"{self.argo_api_url}/applications",
-                                 headers=self.headers,
-                                 data=json.dumps(application_spec),
-                                 timeout=30)
+        return self.apply_application(application_spec, upsert=upsert, live=live)
+
+    def apply_application(self, application_json, upsert=False, live=_FETCH):
+        # Create or update an application from a whole document
+        name = application_json["metadata"]["name"]
+        application_spec = {"metadata": application_json["metadata"], "spec": application_json.get("spec", {})}
+
+        # Compare with the live application, if any
+        if live is _FETCH:
+            live = self.get_application(name, missing_ok=True)
+        if live is None:
+            diff = make_diff(None, application_spec["spec"])
+            if self.check_mode:
+                return application_spec, diff
+
+            response = self._request("POST", "/applications", body=application_spec)
+            response.raise_for_status()
+            return response.json(), diff
+
+        patch = merge_patch(application_spec, {"metadata": live.get("metadata", {}), "spec": live.get("spec", {})})
+        if not patch:
+            return live, None
+
+        patched = apply_merge_patch(live, patch)
+        diff = make_diff(live.get("spec"), patched.get("spec"))
+        if self.check_mode:
+            return patched, diff
+
+        if not upsert:
+            # Without upsert the server refuses to change an existing
+            # application
+            response = self._request("POST", "/applications", body=application_spec)
+            response.raise_for_status()
+            return response.json(), diff
+
+        # Only the fields that changed are sent, the rest of the live
+        # application, status included, is neither resent nor replaced
+        response = self._request("PATCH", "/applications/{name}",
+                                 path_params={"name": name},
+                                 body={"name": name,
+                                       "patch": self.codec.dumps(patch).decode("utf-8"),
+                                       "patchType": "merge"})
+        response.raise_for_status()
+        return response.json(), diff
+
+    def get_application(self, name, missing_ok=False):
+        response = self._request("GET", "/applications/{name}",
+                                 path_params={"name": name})
+        if missing_ok and response.status_code in (403, 404):
+            # ArgoCD answers 403 for applications that do not exist
+            return None
+
+        response.raise_for_status()
+        return response.json()
+
+    def sync_application(self, name, revision=None, prune=False):
+        # Returns the application as it was when the sync was requested
+        if self.check_mode:
+            return self.get_application(name)
+
+        sync_request = {"name": name, "prune": prune}
+        if revision:
+            sync_request["revision"] = revision
+
+        response = self._request("POST", "/applications/{name}/sync",
+                                 path_params={"name": name},
+                                 body=sync_request)
 
         response.raise_for_status()
         return response.json()
 
-    def create_project(self, project_name, description):
+    def watch_applications(self, names=None, projects=None, timeout=None):
+        # Yield application documents as they change, from the watch stream.
+        # The stream starts with the current state of the applications. The
+        # persistent connection cannot stream, there the applications are
+        # polled instead. timeout None waits forever, 0 yields the current
+        # state of the applications once.
+        if not self.transport.supports_streaming or timeout == 0:
+            yield from self._poll_applications(names, timeout)
+            return
+
+        query = {}
+        if names and len(names) == 1:
+            query["name"] = names[0]
+        if projects:
+            query["projects"] = projects
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while deadline is None or time.monotonic() < deadline:
+            read_timeout = max(deadline - time.monotonic(), 0.1) if deadline else None
+            stream = self._stream_lines("/stream/applications", query, read_timeout)
+            try:
+                for line in stream:
+                    event = self.codec.loads(line).get("result", {})
+                    application = event.get("application")
+                    if application and (not names or application["metadata"]["name"] in names):
+                        yield application
+                    # Events of other applications keep a busy stream alive
+                    # past the deadline
+                    if deadline is not None and time.monotonic() >= deadline:
+                        return
+            except (ArgoCDTimeout, ArgoCDStreamInterrupted):
+                # Nothing happened before the deadline or a proxy closed the
+                # idle stream, reconnect until the deadline
+                pass
+            finally:
+                stream.close()
+
+    def _poll_applications(self, names, timeout, interval=5):
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            for name in names or []:
+                yield self.get_application(name)
+            if deadline is not None and time.monotonic() + interval > deadline:
+                return
+            time.sleep(interval)
+
+    def wait_for_applications(self,
+                              names,
+                              sync_status="Synced",
+                              health_status="Healthy",
+                              timeout=300,
+                              projects=None,
+                              previous_operations=None):
+        # Wait until every application reaches the target sync and health
+        # status. previous_operations maps application names to the
+        # status.operationState.startedAt they had before a sync was requested,
+        # those applications must also have completed a newer operation.
+        previous_operations = previous_operations or {}
+        states = {}
+        pending = set(names)
+        failed = set()
+
+        for application in self.watch_applications(names, projects=projects, timeout=timeout):
+            name = application["metadata"]["name"]
+            status = application.get("status", {})
+            operation_state = status.get("operationState") or {}
+            state = {
+                "sync_status": status.get("sync", {}).get("status"),
+                "health_status": status.get("health", {}).get("status"),
+                "revision": status.get("sync", {}).get("revision"),
+                "operation_phase": operation_state.get("phase"),
+                "operation_message": operation_state.get("message"),
+            }
+            states[name] = state
+
+            new_operation = name not in previous_operations or \
+                operation_state.get("startedAt") != previous_operations[name]
+            if name in previous_operations and new_operation and state["operation_phase"] in ("Failed", "Error"):
+                failed.add(name)
+                pending.discard(name)
+            elif new_operation and \
+                    state["operation_phase"] not in ("Running", "Terminating") and \
+                    state["sync_status"] == sync_status and \
+                    state["health_status"] == health_status:
+                pending.discard(name)
+            else:
+                pending.add(name)
+
+            if not pending:
+                break
+
+        return states, sorted(pending), sorted(failed)
+
+    def list_applications(self, projects=None, selector=None, fields=None, name=None):
+        return list(self.iter_applications(projects=projects, selector=selector, fields=fields, name=name))
+
+    def iter_applications(self, projects=None, selector=None, fields=None, name=None):
+        # fields is a list of paths such as "items.metadata.name", the server
+        # only returns those parts of the documents
+        query = {}
+        if name:
+            query["name"] = name
+        if projects:
+            query["projects"] = projects
+        if selector:
+            query["selector"] = selector
+        if fields:
+            query["fields"] = ",".join(fields)
+
+        return self._list_items("/applications", query)
+
+    def list_projects(self, fields=None):
+        return list(self.iter_projects(fields=fields))
+
+    def iter_projects(self, fields=None):
+        query = {"fields": ",".join(fields)} if fields else None
+        return self._list_items("/projects", query)
+
+    def list_repositories(self):
+        return list(self._list_items("/repositories"))
+
+    def list_clusters(self):
+        return list(self._list_items("/clusters"))
+
+    def create_project(self, project_name, description, roles=None, live=_FETCH):
         # Step 1: Get the project data
-        project_data = requests.get(f"{self.argo_api_url}/projects/{project_name}",
-                                    headers=self.headers,
-                                    timeout=30)
+        project_json = live
+        if project_json is _FETCH:
+            project_json = self._fetch_project(project_name, missing_ok=True)
 
-        if project_data.status_code == 200:
-            return project_data.json(), None
+        if project_json is not None:
+            return project_json, None
 
         # Define the project spec
         project_spec = {
@@ -80,186 +875,160 @@ class ArgoCDClient:
             }
         }
 
+        # A new project is created with its roles, saving the update that
+        # would add them afterwards
+        if roles:
+            apply_roles(project_spec["project"], roles, "present")
+
+        diff = make_diff(None, project_spec["project"])
+        if self.check_mode:
+            return project_spec["project"], diff
+
         # Create the project
-        response = requests.post(f"{self.argo_api_url}/projects",
-                                 headers=self.headers,
-                                 data=json.dumps(project_spec),
-                                 timeout=30)
+        response = self._request("POST", "/projects", body=project_spec)
 
         response.raise_for_status()
 
-        return response.json(), None
+        self.cache.put("projects", project_name, response.json())
+        return response.json(), diff
 
-    def update_project(self, project_name, description):
-        # Step 1: Get the project data
-        project_data = requests.get(f"{self.argo_api_url}/projects/{project_name}",
-                                    headers=self.headers,
-                                    timeout=30)
+    def apply_project(self, project_json, live=_FETCH):
+        # Create a project from a whole document, or make the spec, labels
+        # and annotations of the live project match it
+        project_name = project_json["metadata"]["name"]
+        if live is _FETCH:
+            live = self._fetch_project(project_name, missing_ok=True)
 
-        project_data.raise_for_status()
+        if live is None:
+            diff = make_diff(None, project_json)
+            if self.check_mode:
+                return project_json, diff
 
-        # Step 2: Parse the JSON response
-        project_json = project_data.json()
+            response = self._request("POST", "/projects", body={"project": project_json})
 
-        project_json["metadata"]["name"] = project_name
-        project_json["metadata"]["description"] = description
+            response.raise_for_status()
 
-        # Create the project
-        response = requests.put(f"{self.argo_api_url}/projects/{project_name}",
-                                headers=self.headers,
-                                data=json.dumps({"project": project_json}),
-                                timeout=30)
+            self.cache.put("projects", project_name, response.json())
+            return response.json(), diff
 
-        response.raise_for_status()
-        return response.json()
+        def mutate(current):
+            current["spec"] = copy.deepcopy(project_json.get("spec", {}))
+            for key in ("labels", "annotations"):
+                if key in project_json["metadata"]:
+                    current["metadata"][key] = copy.deepcopy(project_json["metadata"][key])
+
+        return self._update_project(project_name, mutate)
+
+    def update_project(self, project_name, description):
+        def mutate(project_json):
+            project_json["metadata"]["name"] = project_name
+            project_json["metadata"]["description"] = description
+
+        return self._update_project(project_name, mutate)
 
     # To be implemented
     def delete_project(self, name):
         return {}, None
 
-    def get_project(self, name):
-        response = requests.get(f"{self.argo_api_url}/projects/{name}",
-                                headers=self.headers,
-                                timeout=30)
-
-        response.raise_for_status()
-        return response.json()
+    def get_project(self, name, missing_ok=False):
+        return self._fetch_project(name, missing_ok=missing_ok)
 
     def add_role_to_project(self, project_name, role_name, role_description):
-        # Step 1: Get the project data
-        project_data = requests.get(f"{self.argo_api_url}/projects/{project_name}",
-                                    headers=self.headers,
-                                    timeout=30)
-
-        project_data.raise_for_status()
+        def mutate(project_json):
+            # Add the new role data to the "roles" section
+            if find_role(project_json, role_name) is None:
+                ensure_role(project_json, role_name, role_description)
 
-        # Step 2: Parse the JSON response
-        project_json = project_data.json()
-
-        # Step 3: Add the new role data to the "roles" section
-        new_role = {
-            "name": role_name,
-            "description": role_description,
-        }
-        if "spec" not in project_json:
-            project_json["spec"] = {}
-        if "roles" not in project_json["spec"]:
-            project_json["spec"]["roles"] = []
-
-        for role in project_json["spec"]["roles"]:
-            if role.get("name") == role_name:
-                return project_data.json()
-
-        project_json["spec"]["roles"].append(new_role)
-
-        # Step 4: Update the project with the modified data
-        updated_project_data = requests.put(
-            f"{self.argo_api_url}/projects/{project_name}",
-            headers=self.headers,
-            data=json.dumps({"project": project_json}),
-            timeout=30
-        )
-
-        updated_project_data.raise_for_status()
-        return updated_project_data.json(), None
+        return self._update_project(project_name, mutate)
 
     def remove_role_from_project(self, project_name, role_name):
         # To be implemented
         return {}, None
 
     def add_remove_policies_to_role(self, project_name, role_name, policies, status):
-        # Step 1: Get the project data
-        project_data = requests.get(f"{self.argo_api_url}/projects/{project_name}",
-                                    headers=self.headers,
-                                    timeout=30)
-
-        project_data.raise_for_status()
+        def mutate(project_json):
+            # Find the role in the "roles" section
+            target_role = find_role(project_json, role_name)
 
-        # Step 2: Parse the JSON response
-        project_json = project_data.json()
+            if target_role is None:
+                return {"error": f"Role '{role_name}' not found in project"}
 
-        # Step 3: Add the new role data to the "roles" section
-        roles = project_json.get("spec", {}).get("roles", [])
+            update_role_members(target_role, "policies", policies, status)
 
-        target_role = None
-        for role in roles:
-            if role["name"] == role_name:
-                target_role = role
-                break
-
-        if target_role is None:
-            return {"error": "Role '{role_name}' not found in project"}, None
-
-        if "policies" not in target_role:
-            target_role["policies"] = []
+        return self._update_project(project_name, mutate)
 
-        if status == "present":
-            for policy in policies:
-                if policy not in target_role["policies"]:
-                    target_role["policies"].append(policy)
+    def add_remove_groups_to_role(self, project_name, role_name, groups, status):
+        def mutate(project_json):
+            # Find the role in the "roles" section
+            target_role = find_role(project_json, role_name)
 
-        if status == "absent":
-            for policy in policies:
-                if policy in target_role["policies"]:
-                    target_role["policies"].remove(policy)
+            if target_role is None:
+                return {"error": f"Role '{role_name}' not found in project"}
 
-        # Step 4: Update the project with the modified data
-        updated_project_data = requests.put(
-            f"{self.argo_api_url}/projects/{project_name}",
-            headers=self.headers,
-            data=json.dumps({"project": project_json}),
-            timeout=30
-        )
+            update_role_members(target_role, "groups", groups, status)
 
-        updated_project_data.raise_for_status()
-        return updated_project_data.json(), None
+        return self._update_project(project_name, mutate)
 
-    def add_remove_groups_to_role(self, project_name, role_name, groups, status):
-        # Step 1: Get the project data
-        project_data = requests.get(f"{self.argo_api_url}/projects/{project_name}",
-                                    headers=self.headers,
-                                    timeout=30)
+    def apply_project_roles(self, project_name, roles, status="present", description=None):
+        # Apply any number of role, policy and group edits, and the
+        # description when given, with a single read-modify-write of the
+        # project
+        def mutate(project_json):
+            if description is not None:
+                project_json["metadata"]["description"] = description
+            apply_roles(project_json, roles, status)
 
-        project_data.raise_for_status()
+        return self._update_project(project_name, mutate)
 
-        # Step 2: Parse the JSON response
-        project_json = project_data.json()
+    def list_repository_credentials(self, url=None):
+        query = {"url": url} if url else None
+        return list(self._list_items("/repocreds", query))
 
-        # Step 3: Add the new role data to the "roles" section
-        roles = project_json.get("spec", {}).get("roles", [])
+    def create_repository_credentials(self,
+                                      url,
+                                      username,
+                                      password,
+                                      type=None,
+                                      update_password="always",
+                                      live=_FETCH):
+        # Credential template, used by every repository whose URL starts
+        # with url and that has no credentials of its own
+        credentials_spec = {
+            "url": url,
+            "username": username,
+            "password": password,
+        }
+        if type:
+            credentials_spec["type"] = type
 
-        target_role = None
-        for role in roles:
-            if role["name"] == role_name:
-                target_role = role
-                break
+        if live is _FETCH:
+            live = next((item for item in self.list_repository_credentials(url) if item.get("url") == url), None)
+        visible_spec = dict(credentials_spec, password=None)
+        if live is not None and update_password == "on_create" and is_subset(visible_spec, live):
+            return live, None
 
-        if target_role is None:
-            return {"error": "Role '{role_name}' not found in project"}, None
+        diff = make_diff(dict(live, password=None) if live else None, visible_spec)
+        if self.check_mode:
+            return visible_spec, diff
 
-        if "groups" not in target_role:
-            target_role["groups"] = []
+        # Create the template, upsert updates an existing one
+        query = {"upsert": "true"} if live is not None else None
+        response = self._request("POST", "/repocreds",
+                                 body=credentials_spec,
+                                 query=query)
 
-        if status == "present":
-            for group in groups:
-                if group not in target_role["groups"]:
-                    target_role["groups"].append(group)
+        response.raise_for_status()
 
-        if status == "absent":
-            for group in groups:
-                if group in target_role["groups"]:
-                    target_role["groups"].remove(group)
+        return response.json(), diff
 
-        # Step 4: Update the project with the modified data
-        updated_project_data = requests.put(
-            f"{self.argo_api_url}/projects/{project_name}",
-            headers=self.headers,
-            data=json.dumps({"project": project_json}),
-            timeout=30
-        )
+    def get_repository(self, repository_url, missing_ok=False):
+        response = self._request("GET", "/repositories/{repo}",
+                                 path_params={"repo": repository_url})
+        if missing_ok and response.status_code in (403, 404):
+            return None
 
-        updated_project_data.raise_for_status()
-        return updated_project_data.json(), None
+        response.raise_for_status()
+        return response.json()
 
     def create_repository(self,
                           type,
@@ -267,7 +1036,9 @@ class ArgoCDClient:
                           username,
                           password,
                           project,
-                          name):
+                          name,
+                          update_password="always",
+                          live=_FETCH):
         # Define the repository spec
         repository_spec = {
             "type": type,
@@ -279,12 +1050,25 @@ class ArgoCDClient:
         if type == "helm":
             repository_spec["name"] = name
 
-        # Create the repository
-        response = requests.post(f"{self.argo_api_url}/repositories",
-                                 headers=self.headers,
-                                 data=json.dumps(repository_spec),
-                                 timeout=30)
+        # The API never returns the password, a registered repository whose
+        # visible fields match is only left alone when update_password is
+        # on_create
+        if live is _FETCH:
+            live = self.get_repository(repository_url, missing_ok=True)
+        visible_spec = dict(repository_spec, password=None)
+        if live is not None and update_password == "on_create" and is_subset(visible_spec, live):
+            return live, None
+
+        diff = make_diff(dict(live, password=None) if live else None, visible_spec)
+        if self.check_mode:
+            return visible_spec, diff
+
+        # Create the repository, upsert updates an existing one
+        query = {"upsert": "true"} if live is not None else None
+        response = self._request("POST", "/repositories",
+                                 body=repository_spec,
+                                 query=query)
 
         response.raise_for_status()
 
-        return response.json(), None
+        return response.json(), diff
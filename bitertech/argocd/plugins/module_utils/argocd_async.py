@@ -0,0 +1,111 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_http import ArgoCDError, ArgoCDHTTPError
+
+
+class AsyncArgoCDClient:
+    # asyncio counterpart of ArgoCDClient. Every call runs the synchronous
+    # client in a thread pool sized like its connection pool, so the
+    # session, the project snapshots, the diffing and the conflict retries
+    # behave exactly as with the synchronous client.
+
+    def __init__(self, argo_api_url, api_token, pool_size=10, **client_options):
+        self.client = ArgoCDClient(argo_api_url, api_token, pool_size=pool_size, **client_options)
+        self.argo_api_url = self.client.argo_api_url
+        self._executor = ThreadPoolExecutor(max_workers=pool_size)
+
+    async def _call(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor,
+                                          functools.partial(getattr(self.client, method), *args, **kwargs))
+
+    async def close(self):
+        self._executor.shutdown(wait=True)
+        self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def create_application(self, *args, **kwargs):
+        return await self._call("create_application", *args, **kwargs)
+
+    async def get_application(self, *args, **kwargs):
+        return await self._call("get_application", *args, **kwargs)
+
+    async def list_applications(self, *args, **kwargs):
+        return await self._call("list_applications", *args, **kwargs)
+
+    async def list_projects(self, *args, **kwargs):
+        return await self._call("list_projects", *args, **kwargs)
+
+    async def create_project(self, *args, **kwargs):
+        return await self._call("create_project", *args, **kwargs)
+
+    async def update_project(self, *args, **kwargs):
+        return await self._call("update_project", *args, **kwargs)
+
+    async def get_project(self, *args, **kwargs):
+        return await self._call("get_project", *args, **kwargs)
+
+    async def add_role_to_project(self, *args, **kwargs):
+        return await self._call("add_role_to_project", *args, **kwargs)
+
+    async def add_remove_policies_to_role(self, *args, **kwargs):
+        return await self._call("add_remove_policies_to_role", *args, **kwargs)
+
+    async def add_remove_groups_to_role(self, *args, **kwargs):
+        return await self._call("add_remove_groups_to_role", *args, **kwargs)
+
+    async def apply_project_roles(self, *args, **kwargs):
+        return await self._call("apply_project_roles", *args, **kwargs)
+
+    async def get_repository(self, *args, **kwargs):
+        return await self._call("get_repository", *args, **kwargs)
+
+    async def create_repository(self, *args, **kwargs):
+        return await self._call("create_repository", *args, **kwargs)
+
+
+async def fan_out(clients, operation, objects, concurrency=10):
+    # Run one client operation for every (instance, object) pair with at most
+    # concurrency calls in flight. objects are dicts of keyword arguments of
+    # the operation. Failures are reported per pair instead of aborting.
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(client, arguments):
+        outcome = {"instance": client.argo_api_url, "object": arguments}
+        async with semaphore:
+            try:
+                outcome["result"] = await getattr(client, operation)(**arguments)
+                outcome["failed"] = False
+            except ArgoCDHTTPError as errh:
+                outcome.update(failed=True, msg=errh.response.text)
+            except ArgoCDError as errex:
+                outcome.update(failed=True, msg=str(errex))
+        return outcome
+
+    return await asyncio.gather(*[run(client, arguments)
+                                  for client in clients
+                                  for arguments in objects])
+
+
+def run_fan_out(instances, operation, objects, concurrency=10, **client_options):
+    # Synchronous entry point: instances is a list of (api_url, token)
+    async def main():
+        clients = [AsyncArgoCDClient(api_url, token, pool_size=concurrency, **client_options)
+                   for api_url, token in instances]
+        try:
+            return await fan_out(clients, operation, objects, concurrency=concurrency)
+        finally:
+            for client in clients:
+                await client.close()
+
+    return asyncio.run(main())
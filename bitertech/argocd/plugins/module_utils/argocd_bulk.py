@@ -0,0 +1,111 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def run_bulk(func, items, max_workers=10):
+    # Run func over every item in a bounded thread pool. The results keep the
+    # order of the items, func is expected to return a dict describing the
+    # outcome of one item with at least a "failed" key.
+    if not items:
+        return []
+
+    workers = max(1, min(max_workers, len(items)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, items))
+
+
+def run_stream(func, items, max_workers=10):
+    # Like run_bulk for an iterator of any length, which is consumed as
+    # workers free up so at most max_workers items are held at a time. The
+    # results are yielded as they complete.
+    workers = max(1, max_workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        running = set()
+        for item in items:
+            if len(running) >= workers:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            running.add(executor.submit(func, item))
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def summarize(results):
+    failed = [item for item in results if item.get("failed")]
+    return {
+        "total": len(results),
+        "changed": len([item for item in results if item.get("changed")]),
+        "failed": len(failed),
+        "failures": [{"name": item.get("name"), "msg": item.get("msg")} for item in failed],
+    }
+
+
+class DependencyPlan:
+    # Tasks with dependencies between them, run in a bounded thread pool as
+    # soon as everything they depend on has succeeded. A task whose
+    # dependency failed is not run and is reported as failed.
+
+    def __init__(self):
+        self._tasks = {}
+
+    def add(self, key, func, depends_on=()):
+        # func returns a dict describing the outcome of the task with at
+        # least a "failed" key. Dependencies on keys that are not in the plan
+        # are ignored. A key can only be added once.
+        if key in self._tasks:
+            raise ValueError(f"{key} is planned twice")
+        self._tasks[key] = {"func": func, "depends_on": list(depends_on)}
+
+    def __contains__(self, key):
+        return key in self._tasks
+
+    def run(self, max_workers=10):
+        # The results keep the order in which the tasks were added
+        if not self._tasks:
+            return []
+
+        results = {}
+        waiting = {key: set(dep for dep in task["depends_on"] if dep in self._tasks and dep != key)
+                   for key, task in self._tasks.items()}
+
+        def ready():
+            return [key for key, deps in waiting.items() if not deps - set(results)]
+
+        workers = max(1, min(max_workers, len(self._tasks)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            running = {}
+            while waiting or running:
+                # Skipping a task can make its own dependents ready
+                started = True
+                while started:
+                    started = False
+                    for key in ready():
+                        started = True
+                        failed = [dep for dep in waiting.pop(key) if results[dep].get("failed")]
+                        if failed:
+                            results[key] = {"name": key, "changed": False, "failed": True,
+                                            "msg": f"Skipped, {', '.join(sorted(failed))} failed"}
+                        else:
+                            running[executor.submit(self._tasks[key]["func"])] = key
+
+                if not running:
+                    # Only a dependency cycle leaves tasks waiting here
+                    for key in list(waiting):
+                        waiting.pop(key)
+                        results[key] = {"name": key, "changed": False, "failed": True,
+                                        "msg": "Skipped, dependency cycle"}
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = running.pop(future)
+                    try:
+                        results[key] = future.result()
+                    except Exception as exc:
+                        results[key] = {"name": key, "changed": False, "failed": True, "msg": str(exc)}
+
+        return [results[key] for key in self._tasks]
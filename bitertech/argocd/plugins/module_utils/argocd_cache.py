@@ -0,0 +1,104 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+
+class SnapshotCache:
+    # Cache of API documents (projects, applications...) keyed by kind, name
+    # and metadata.resourceVersion. Snapshots always live in memory for the
+    # lifetime of the client and, when a cache_dir and a ttl are given, they
+    # are also written to disk so successive tasks of a play can reuse them.
+    # A snapshot read from disk was stored by another task and may be stale.
+
+    def __init__(self, scope, cache_dir=None, ttl=0):
+        self.ttl = ttl
+        self.cache_dir = None
+        if cache_dir and ttl > 0:
+            # Snapshots of different ArgoCD instances never mix
+            digest = hashlib.sha256(scope.encode("utf-8")).hexdigest()[:16]
+            self.cache_dir = os.path.join(os.path.expanduser(cache_dir), digest)
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def _path(self, kind, name):
+        return os.path.join(self.cache_dir, kind, quote(name, safe="") + ".json")
+
+    def get(self, kind, name, stored=True):
+        # stored=False leaves out the snapshots read from disk
+        with self._lock:
+            snapshot = self._snapshots.get((kind, name))
+        if snapshot is None and stored:
+            snapshot = self._load(kind, name)
+        if snapshot is None or (snapshot.get("loaded") and not stored):
+            return None
+        # Callers mutate the documents they get, hand out copies only
+        return copy.deepcopy(snapshot["document"])
+
+    def put(self, kind, name, document):
+        resource_version = document.get("metadata", {}).get("resourceVersion")
+        with self._lock:
+            current = self._snapshots.get((kind, name))
+            if (current is not None and not current.get("loaded") and resource_version
+                    and current["resourceVersion"] == resource_version):
+                return
+            snapshot = {
+                "resourceVersion": resource_version,
+                "stored_at": time.time(),
+                "document": copy.deepcopy(document),
+            }
+            self._snapshots[(kind, name)] = snapshot
+        self._store(kind, name, snapshot)
+
+    def loaded(self, kind, name):
+        # True when the snapshot in memory was read from disk
+        with self._lock:
+            snapshot = self._snapshots.get((kind, name))
+        return snapshot is not None and snapshot.get("loaded", False)
+
+    def invalidate(self, kind, name):
+        with self._lock:
+            self._snapshots.pop((kind, name), None)
+        if self.cache_dir:
+            try:
+                os.remove(self._path(kind, name))
+            except OSError:
+                pass
+
+    def _load(self, kind, name):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(kind, name), "r", encoding="utf-8") as cache_file:
+                snapshot = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - snapshot.get("stored_at", 0) > self.ttl:
+            return None
+
+        snapshot["loaded"] = True
+        with self._lock:
+            self._snapshots.setdefault((kind, name), snapshot)
+        return snapshot
+
+    def _store(self, kind, name, snapshot):
+        if not self.cache_dir:
+            return
+        directory = os.path.join(self.cache_dir, kind)
+        try:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            # Write then rename so concurrent readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as cache_file:
+                json.dump(snapshot, cache_file)
+            os.replace(tmp_path, self._path(kind, name))
+        except OSError:
+            # The disk store is only an optimization
+            pass
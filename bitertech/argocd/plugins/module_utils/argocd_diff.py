@@ -0,0 +1,110 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+
+def _is_empty(value):
+    # ArgoCD omits empty fields, so a missing key, null, false, "" and empty
+    # collections all describe the same state
+    return value is None or value is False or value == "" or value == [] or value == {}
+
+
+def diff_objects(desired, actual, subset=False, path=""):
+    # Compare two API documents and return the list of paths that differ.
+    # With subset=True only the keys present in desired are compared and
+    # None values in desired mean "not managed", which is what is needed to
+    # compare a desired spec with the object fetched from the API.
+    if _is_empty(desired) and _is_empty(actual):
+        return []
+
+    if isinstance(desired, dict) and isinstance(actual, dict):
+        if subset:
+            keys = [key for key in desired if desired[key] is not None]
+        else:
+            keys = list(desired) + [key for key in actual if key not in desired]
+
+        changes = []
+        for key in keys:
+            changes.extend(diff_objects(desired.get(key),
+                                        actual.get(key),
+                                        subset=subset,
+                                        path=f"{path}.{key}" if path else key))
+        return changes
+
+    if isinstance(desired, list) and isinstance(actual, list):
+        if len(desired) != len(actual):
+            return [path]
+
+        changes = []
+        for index, (desired_item, actual_item) in enumerate(zip(desired, actual)):
+            changes.extend(diff_objects(desired_item,
+                                        actual_item,
+                                        subset=subset,
+                                        path=f"{path}[{index}]"))
+        return changes
+
+    if desired != actual:
+        return [path]
+    return []
+
+
+def is_subset(desired, actual):
+    return not diff_objects(desired, actual, subset=True)
+
+
+def make_diff(before, after, before_header=None, after_header=None):
+    # Diff in the format expected by Ansible for --diff output
+    diff = {"before": before if before is not None else {}, "after": after if after is not None else {}}
+    if before_header:
+        diff["before_header"] = before_header
+    if after_header:
+        diff["after_header"] = after_header
+    return diff
+
+
+# Value of _patch_value for equal documents, None is the null of the patch
+_UNCHANGED = object()
+
+
+def merge_patch(desired, actual):
+    # JSON merge patch (RFC 7386) turning actual into desired, {} when there
+    # is nothing to change. Same rules as diff_objects with subset=True: keys
+    # missing or None in desired are not managed and left alone. An empty
+    # object in desired clears the object of actual, lists are replaced as a
+    # whole.
+    patch = _patch_value(desired, actual)
+    return {} if patch is _UNCHANGED else patch
+
+
+def _patch_value(desired, actual):
+    if _is_empty(desired) and _is_empty(actual):
+        return _UNCHANGED
+
+    if isinstance(desired, dict) and isinstance(actual, dict):
+        if not desired:
+            # null removes the key from the patched document
+            return None
+        patch = {}
+        for key, value in desired.items():
+            if value is None:
+                continue
+            change = _patch_value(value, actual.get(key))
+            if change is not _UNCHANGED:
+                patch[key] = change
+        return patch or _UNCHANGED
+
+    if not diff_objects(desired, actual, subset=True):
+        return _UNCHANGED
+    return desired
+
+
+def apply_merge_patch(document, patch):
+    # The document as the server stores it once patched
+    if not isinstance(patch, dict):
+        return patch
+    patched = dict(document) if isinstance(document, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            patched.pop(key, None)
+        else:
+            patched[key] = apply_merge_patch(patched.get(key), value)
+    return patched
@@ -0,0 +1,325 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+try:
+    import yaml
+    HAS_YAML = True
+except ImportError:
+    HAS_YAML = False
+
+# On-disk export of an ArgoCD instance: one JSON-lines file per kind of
+# object, optionally gzip compressed, and a manifest with the version of
+# every exported object
+
+EXPORT_KINDS = ("projects", "applications", "repositories")
+
+MANIFEST_NAME = "manifest.json"
+
+# Kind of a Kubernetes manifest to the kind of an export file
+MANIFEST_KINDS = {"AppProject": "projects", "Application": "applications"}
+
+# Metadata set by the API server, never sent back when restoring an object
+VOLATILE_METADATA = ("resourceVersion", "uid", "creationTimestamp", "generation", "managedFields",
+                     "selfLink", "deletionTimestamp", "deletionGracePeriodSeconds")
+
+
+# Fields of a repository set by ArgoCD on every connection check, such as
+# connectionState.attemptedAt, never exported nor restored
+VOLATILE_REPOSITORY_FIELDS = ("connectionState",)
+
+
+def export_path(dest, kind, compress=False):
+    return os.path.join(dest, f"{kind}.jsonl.gz" if compress else f"{kind}.jsonl")
+
+
+def find_export(source, kind):
+    # Path of the export of a kind in a directory, compressed or not
+    for compress in (False, True):
+        path = export_path(source, kind, compress)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def open_export(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def object_key(kind, document):
+    if kind == "repositories":
+        return document.get("repo")
+    return document.get("metadata", {}).get("name")
+
+
+def object_version(kind, document):
+    # Repositories have no metadata, their version is a digest of the line
+    if kind == "repositories":
+        return hashlib.sha256(dump_line(document).encode("utf-8")).hexdigest()[:16]
+    return document.get("metadata", {}).get("resourceVersion")
+
+
+def dump_line(document):
+    return json.dumps(document, sort_keys=True, separators=(",", ":"))
+
+
+def iter_export(path):
+    # Yield the documents of an export file, one at a time
+    with open_export(path, "rt") as export_file:
+        for line in export_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_manifest(dest):
+    try:
+        with open(os.path.join(dest, MANIFEST_NAME), "r", encoding="utf-8") as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _temporary_path(path):
+    # Same suffix as path, so a temporary .gz file is compressed too
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-", suffix=os.path.basename(path))
+    os.close(fd)
+    return tmp_path
+
+
+def _replace_atomically(path, write):
+    # Write then rename so an interrupted export never leaves a partial file
+    tmp_path = _temporary_path(path)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def write_manifest(dest, manifest):
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    _replace_atomically(os.path.join(dest, MANIFEST_NAME), write)
+
+
+def write_export(path, kind, documents, check_mode=False):
+    # Write a whole export file from an iterator of documents, which is
+    # consumed one document at a time. Returns the version of every object.
+    versions = {}
+
+    def write(tmp_path):
+        with open_export(tmp_path, "wt") as export_file:
+            for document in documents:
+                versions[object_key(kind, document)] = object_version(kind, document)
+                export_file.write(dump_line(document) + "\n")
+
+    if check_mode:
+        for document in documents:
+            versions[object_key(kind, document)] = object_version(kind, document)
+    else:
+        _replace_atomically(path, write)
+    return versions
+
+
+def rewrite_export(path, kind, updates, removed, check_mode=False):
+    # Rewrite an export file: the lines of unchanged objects are copied as
+    # they are, updates (key to document) replace or add objects and the
+    # removed keys are dropped. The file is left untouched when nothing
+    # differs. Returns the counts of each outcome.
+    counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+    updates = dict(updates)
+
+    def merge(export_file):
+        with open_export(path, "rt") as current_file:
+            for line in current_file:
+                line = line.rstrip("\n")
+                if not line:
+                    continue
+                key = object_key(kind, json.loads(line))
+                if key in updates:
+                    new_line = dump_line(updates.pop(key))
+                    counts["updated" if new_line != line else "unchanged"] += 1
+                    line = new_line
+                elif key in removed:
+                    counts["removed"] += 1
+                    continue
+                else:
+                    counts["unchanged"] += 1
+                if export_file is not None:
+                    export_file.write(line + "\n")
+
+        for document in updates.values():
+            counts["added"] += 1
+            if export_file is not None:
+                export_file.write(dump_line(document) + "\n")
+
+    if check_mode:
+        merge(None)
+        return counts
+
+    tmp_path = _temporary_path(path)
+    try:
+        with open_export(tmp_path, "wt") as export_file:
+            merge(export_file)
+        if counts["added"] or counts["updated"] or counts["removed"]:
+            os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return counts
+
+
+def document_kind(document, default=None):
+    # Kind of an object read from a manifest or an export file. Exported
+    # objects have no kind, it comes from the name of their file.
+    if document.get("kind") in MANIFEST_KINDS:
+        return MANIFEST_KINDS[document["kind"]]
+    if default is not None:
+        return default
+    if "repo" in document:
+        return "repositories"
+    spec = document.get("spec", {})
+    if "destination" in spec or "source" in spec or "sources" in spec:
+        return "applications"
+    return "projects"
+
+
+def _file_kind(path):
+    # Kind named by an export file, such as projects.jsonl.gz
+    name = os.path.basename(path).split(".")[0]
+    return name if name in EXPORT_KINDS else None
+
+
+def source_files(src):
+    # Files to restore from: the export files and manifests of a directory,
+    # in a stable order, or src itself
+    if not os.path.isdir(src):
+        return [src]
+    paths = []
+    for root, dirs, files in os.walk(src):
+        dirs[:] = sorted(directory for directory in dirs if not directory.startswith("."))
+        for name in sorted(files):
+            # Hidden files, such as temporary exports and checkpoints, are skipped
+            if name.startswith(".") or name == MANIFEST_NAME:
+                continue
+            if name.endswith((".jsonl", ".jsonl.gz", ".json", ".yaml", ".yml")):
+                paths.append(os.path.join(root, name))
+    return paths
+
+
+def iter_source(src):
+    # Yield (kind, document) for every object of a directory or file, one
+    # document at a time. JSON-lines files are exports, .json and YAML files
+    # hold Kubernetes manifests, several per file for YAML.
+    for path in source_files(src):
+        if path.endswith((".jsonl", ".jsonl.gz")):
+            documents = iter_export(path)
+        elif path.endswith(".json"):
+            with open(path, "r", encoding="utf-8") as manifest_file:
+                document = json.load(manifest_file)
+            documents = document.get("items", []) if "items" in document else [document]
+        else:
+            if not HAS_YAML:
+                raise ValueError(f"PyYAML is required to read {path}")
+            documents = _iter_yaml(path)
+
+        default = _file_kind(path)
+        for document in documents:
+            if isinstance(document, dict) and document:
+                yield document_kind(document, default), document
+
+
+def _iter_yaml(path):
+    with open(path, "r", encoding="utf-8") as manifest_file:
+        try:
+            for document in yaml.safe_load_all(manifest_file):
+                yield document
+        except yaml.YAMLError as error:
+            raise ValueError(f"Invalid YAML in {path}: {error}")
+
+
+def restorable(kind, document):
+    # Copy of a document without what the API server sets on its own
+    document = dict(document)
+    for key in ("status", "operation", "apiVersion", "kind"):
+        document.pop(key, None)
+    if kind == "repositories":
+        return exportable_repository(document)
+    document["metadata"] = dict((key, value) for key, value in document.get("metadata", {}).items()
+                                if key not in VOLATILE_METADATA)
+    return document
+
+
+def exportable_repository(document):
+    # Copy of a repository without its connection state, which changes on
+    # every check and would make each export rewrite the line
+    return dict((key, value) for key, value in document.items() if key not in VOLATILE_REPOSITORY_FIELDS)
+
+
+def document_digest(document):
+    return hashlib.sha256(dump_line(document).encode("utf-8")).hexdigest()[:16]
+
+
+class Checkpoint:
+    # JSON-lines journal of the objects already restored. A line is appended
+    # as soon as an object is applied, so an interrupted restore resumes
+    # with the objects that were not applied yet, or whose document changed.
+
+    def __init__(self, path, check_mode=False):
+        self.path = path
+        self.check_mode = check_mode
+        self._lock = threading.Lock()
+        self._done = {}
+        self._file = None
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as checkpoint_file:
+                for line in checkpoint_file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # The last line of an interrupted run may be partial
+                        continue
+                    self._done[(entry["kind"], entry["key"])] = entry["digest"]
+        except OSError:
+            pass
+        return self
+
+    def __len__(self):
+        return len(self._done)
+
+    def done(self, kind, key, digest):
+        return self._done.get((kind, key)) == digest
+
+    def record(self, kind, key, digest):
+        if self.check_mode:
+            return
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(dump_line({"kind": kind, "key": key, "digest": digest}) + "\n")
+            self._file.flush()
+            self._done[(kind, key)] = digest
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        self.close()
+        if not self.check_mode and os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,331 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import gzip
+import http.client
+import json
+import socket
+import ssl
+import zlib
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+
+from ansible.module_utils.connection import ConnectionError as SocketConnectionError
+from ansible.module_utils.urls import Request
+
+try:
+    from ansible.module_utils.urls import make_context
+except ImportError:
+    make_context = None
+
+# requests is an optional accelerator: it brings connection pooling but it is
+# only imported when the requests backend is selected, to keep module start
+# up fast and to not require it on the managed nodes
+try:
+    import importlib.util
+    HAS_REQUESTS = importlib.util.find_spec("requests") is not None
+except (ImportError, ValueError):
+    HAS_REQUESTS = False
+
+
+class ArgoCDError(Exception):
+    pass
+
+
+class ArgoCDConnectionError(ArgoCDError):
+    pass
+
+
+class ArgoCDTimeout(ArgoCDConnectionError):
+    pass
+
+
+class ArgoCDStreamIdle(ArgoCDTimeout):
+    # Nothing arrived on an open streaming response within the read timeout
+    pass
+
+
+class ArgoCDStreamInterrupted(ArgoCDConnectionError):
+    # A streaming response was cut before the server ended it
+    pass
+
+
+class ArgoCDCircuitOpen(ArgoCDConnectionError):
+    # The server failed too many times in a row, the request was not sent
+    pass
+
+
+class ArgoCDHTTPError(ArgoCDError):
+
+    def __init__(self, message, response):
+        super().__init__(message)
+        self.response = response
+
+
+def _is_gzip(headers):
+    return (headers or {}).get("content-encoding", "").lower() == "gzip"
+
+
+def _gunzip_chunks(chunks):
+    # Decompress a gzip body as it arrives
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+
+def _split_lines(chunks):
+    pending = b""
+    for chunk in chunks:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip(b"\r")
+    if pending:
+        yield pending.rstrip(b"\r")
+
+
+class ArgoCDResponse:
+    # Response of any of the transports. The client replaces loads with the
+    # decoder of its JSON codec.
+
+    loads = staticmethod(json.loads)
+
+    def __init__(self, status_code, headers, content, url):
+        self.status_code = status_code
+        # Header names are case insensitive, keep them lower case
+        self.headers = {name.lower(): value for name, value in (headers or {}).items()}
+        self.content = content or b""
+        self.url = url
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return self.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise ArgoCDHTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class RequestsTransport:
+    # Pooled keep-alive session of the requests library
+
+    supports_streaming = True
+    supports_compression = True
+
+    def __init__(self, headers, connect_timeout=10, read_timeout=30, pool_size=10, ca_bundle=None):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._requests = requests
+        self.timeout = (connect_timeout, read_timeout)
+        # One pooled session reused by every call of the client, so the
+        # TCP+TLS handshake is paid once per host instead of once per request
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if ca_bundle:
+            self.session.verify = ca_bundle
+
+    def _convert(self, exc):
+        if isinstance(exc, self._requests.exceptions.Timeout):
+            return ArgoCDTimeout(str(exc))
+        return ArgoCDConnectionError(str(exc))
+
+    def request(self, method, url, query=None, data=None, headers=None):
+        # gzip encoded responses are decoded by requests
+        try:
+            response = self.session.request(method, url, params=query, data=data, headers=headers,
+                                            timeout=self.timeout)
+        except self._requests.exceptions.RequestException as exc:
+            raise self._convert(exc)
+        return ArgoCDResponse(response.status_code, response.headers, response.content, url)
+
+    def _stream(self, url, query, read_timeout, iterate):
+        from urllib3.exceptions import ReadTimeoutError
+
+        try:
+            response = self.session.request("GET", url, params=query, stream=True,
+                                            timeout=(self.timeout[0], read_timeout or self.timeout[1]))
+        except self._requests.exceptions.RequestException as exc:
+            raise self._convert(exc)
+
+        with response:
+            if response.status_code >= 400:
+                ArgoCDResponse(response.status_code, response.headers, response.content, url).raise_for_status()
+            try:
+                for item in iterate(response):
+                    yield item
+            except self._requests.exceptions.ConnectionError as exc:
+                # requests reports an idle stream as a connection error
+                if exc.args and isinstance(exc.args[0], ReadTimeoutError):
+                    raise ArgoCDStreamIdle(str(exc))
+                raise ArgoCDStreamInterrupted(str(exc))
+            except self._requests.exceptions.RequestException as exc:
+                raise ArgoCDStreamInterrupted(str(exc))
+
+    def stream_lines(self, url, query=None, read_timeout=None):
+        # Yield every line of a streaming response, each read waits at most
+        # read_timeout seconds
+        return self._stream(url, query, read_timeout, lambda response: response.iter_lines(chunk_size=None))
+
+    def stream_chunks(self, url, query=None, read_timeout=None, chunk_size=65536):
+        # Yield the body of a response in chunks, without holding all of it
+        return self._stream(url, query, read_timeout, lambda response: response.iter_content(chunk_size=chunk_size))
+
+    def close(self):
+        self.session.close()
+
+
+class UrlsTransport:
+    # Ansible's own URL layer, always available on the managed nodes. It
+    # does not pool connections.
+
+    supports_streaming = True
+    supports_compression = True
+
+    def __init__(self, headers, connect_timeout=10, read_timeout=30, ca_bundle=None):
+        # urllib has a single timeout for connecting and reading
+        self.timeout = max(connect_timeout, read_timeout)
+        self.ca_bundle = ca_bundle
+        # Request decodes gzip below the chunked transfer encoding, which
+        # breaks chunked gzip responses. Bodies are decoded here instead.
+        self._request = Request(headers=headers, ca_path=ca_bundle, follow_redirects="safe", decompress=False)
+        self._context = None
+
+    def _open(self, method, url, query, data, timeout, headers=None):
+        if query:
+            url = f"{url}?{urlencode(query, doseq=True)}"
+        options = {}
+        if make_context is not None:
+            # Request builds a TLS context per call and loading the CA
+            # certificates costs tens of milliseconds, build it once. Plain
+            # http never uses it, an empty context is enough there.
+            if self._context is None:
+                if url.startswith("https://"):
+                    self._context = make_context(cafile=self.ca_bundle)
+                else:
+                    self._context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+            options["context"] = self._context
+        try:
+            return self._request.open(method, url, data=data, timeout=timeout, headers=headers, **options)
+        except HTTPError:
+            raise
+        except socket.timeout as exc:
+            raise ArgoCDTimeout(str(exc))
+        except URLError as exc:
+            if isinstance(exc.reason, socket.timeout):
+                raise ArgoCDTimeout(str(exc))
+            raise ArgoCDConnectionError(str(exc))
+        except (OSError, http.client.HTTPException) as exc:
+            raise ArgoCDConnectionError(str(exc))
+
+    def _response(self, status_code, headers, content, url):
+        response = ArgoCDResponse(status_code, headers, content, url)
+        if _is_gzip(response.headers) and response.content:
+            try:
+                response.content = gzip.decompress(response.content)
+            except (OSError, EOFError) as exc:
+                raise ArgoCDConnectionError(f"Invalid gzip response: {exc}")
+        return response
+
+    def request(self, method, url, query=None, data=None, headers=None):
+        try:
+            response = self._open(method, url, query, data, self.timeout, headers)
+        except HTTPError as exc:
+            # Error responses are returned like any other, the client decides
+            return self._response(exc.code, exc.headers, exc.read() if exc.fp else b"", url)
+
+        with response:
+            try:
+                content = response.read()
+            except socket.timeout as exc:
+                raise ArgoCDTimeout(str(exc))
+            except (OSError, http.client.HTTPException) as exc:
+                raise ArgoCDConnectionError(str(exc))
+            return self._response(response.getcode(), response.headers, content, url)
+
+    def _stream(self, url, query, read_timeout, iterate, chunk_size=65536):
+        # iterate turns the decoded chunks of the body into items
+        try:
+            response = self._open("GET", url, query, None, read_timeout or self.timeout)
+        except HTTPError as exc:
+            self._response(exc.code, exc.headers, exc.read() if exc.fp else b"", url).raise_for_status()
+
+        with response:
+            try:
+                # read1 returns what already arrived, a line is not held back
+                # until a whole chunk is read
+                chunks = iter(lambda: response.read1(chunk_size), b"")
+                if _is_gzip(response.headers):
+                    chunks = _gunzip_chunks(chunks)
+                for item in iterate(chunks):
+                    yield item
+            except socket.timeout as exc:
+                raise ArgoCDStreamIdle(str(exc))
+            except (OSError, http.client.HTTPException) as exc:
+                raise ArgoCDStreamInterrupted(str(exc))
+
+    def stream_lines(self, url, query=None, read_timeout=None):
+        return self._stream(url, query, read_timeout, _split_lines)
+
+    def stream_chunks(self, url, query=None, read_timeout=None, chunk_size=65536):
+        return self._stream(url, query, read_timeout, iter, chunk_size)
+
+    def close(self):
+        pass
+
+
+class HttpApiTransport:
+    # Requests sent through the persistent httpapi connection, which owns
+    # the authenticated channel. It cannot stream, and its bodies are text
+    # so they cannot be compressed.
+
+    supports_streaming = False
+    supports_compression = False
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def request(self, method, url, query=None, data=None, headers=None):
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        try:
+            status_code, headers, text = self.connection.send_request(method, url, query=query, data=data)
+        except SocketConnectionError as exc:
+            raise ArgoCDConnectionError(str(exc))
+        return ArgoCDResponse(status_code, headers, (text or "").encode("utf-8"), url)
+
+    def stream_lines(self, url, query=None, read_timeout=None):
+        raise ArgoCDError("The httpapi connection cannot stream responses")
+
+    def stream_chunks(self, url, query=None, read_timeout=None, chunk_size=65536):
+        raise ArgoCDError("The httpapi connection cannot stream responses")
+
+    def close(self):
+        pass
+
+
+def make_transport(backend, headers, connect_timeout=10, read_timeout=30, pool_size=10, ca_bundle=None):
+    # backend is auto, requests or urllib. auto picks requests when it is
+    # installed, for its connection pooling.
+    if backend == "requests" and not HAS_REQUESTS:
+        raise ImportError("requests is not installed")
+    if backend in ("auto", "requests") and HAS_REQUESTS:
+        return RequestsTransport(headers,
+                                 connect_timeout=connect_timeout,
+                                 read_timeout=read_timeout,
+                                 pool_size=pool_size,
+                                 ca_bundle=ca_bundle)
+    return UrlsTransport(headers,
+                         connect_timeout=connect_timeout,
+                         read_timeout=read_timeout,
+                         ca_bundle=ca_bundle)
@@ -0,0 +1,156 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import codecs
+import json
+
+# orjson is an optional accelerator, imported only when a codec uses it
+try:
+    import importlib.util
+    HAS_ORJSON = importlib.util.find_spec("orjson") is not None
+except (ImportError, ValueError):
+    HAS_ORJSON = False
+
+_WHITESPACE = " \t\n\r"
+
+# Characters that can continue a number
+_NUMBER = "0123456789.eE+-"
+
+
+class _Reader:
+    # Text buffer filled on demand from an iterator of byte chunks
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def fill(self, size=0):
+        # Read at least one more chunk, and more until size characters are
+        # left to consume. The chunks are joined once, with what is left of
+        # the buffer. False once the body is exhausted.
+        if self.eof:
+            return False
+        pieces = [self.buffer[self.position:]]
+        left = length = len(pieces[0])
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                pieces.append(text)
+                length += len(text)
+                if length >= size:
+                    break
+        else:
+            text = self._decoder.decode(b"", final=True)
+            pieces.append(text)
+            length += len(text)
+            self.eof = True
+        # Drop what was already consumed so the buffer stays small
+        self.buffer = "".join(pieces)
+        self.position = 0
+        return length > left
+
+    def peek(self):
+        # Next character that is not whitespace, None at the end of the body
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in _WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill():
+                return None
+
+    def expect(self, characters):
+        character = self.peek()
+        if character is None or character not in characters:
+            raise ValueError(f"Expected one of {characters!r} at offset {self.position}, got {character!r}")
+        self.position += 1
+        return character
+
+    def value(self, decoder):
+        # Decode the next JSON value, reading more of the body while it is
+        # incomplete. A number followed by nothing but number characters up
+        # to the end of the buffer, as 12 in "12." or "12", may be truncated,
+        # it is only accepted once more of the body was read. Each attempt
+        # decodes the value from its start, so the pending text is doubled
+        # before the next one: a value of n characters is decoded O(log n)
+        # times instead of once per chunk.
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.position)
+                if self.eof or not self._truncated(value, end):
+                    self.position = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            self.fill(2 * (len(self.buffer) - self.position))
+
+    def _truncated(self, value, end):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return False
+        return all(character in _NUMBER for character in self.buffer[end:])
+
+
+def iter_json_items(chunks, key="items"):
+    # Yield the elements of the array stored under key in the top level JSON
+    # object of a body given as byte chunks, one at a time. Only the current
+    # element is decoded, the whole body is never held in memory.
+    decoder = json.JSONDecoder()
+    reader = _Reader(chunks)
+
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        name = reader.value(decoder)
+        reader.expect(":")
+        if name == key and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.expect("]")
+            else:
+                while True:
+                    yield reader.value(decoder)
+                    if reader.expect(",]") == "]":
+                        break
+        else:
+            # Other members, such as the list metadata, are skipped
+            reader.value(decoder)
+        if reader.expect(",}") == "}":
+            return
+
+
+class JsonCodec:
+    # The json module of the standard library, always available
+
+    name = "json"
+
+    @staticmethod
+    def dumps(document):
+        # Compact separators, the default ones add a space after every , and :
+        return json.dumps(document, separators=(",", ":")).encode("utf-8")
+
+    loads = staticmethod(json.loads)
+
+
+class OrjsonCodec:
+    # orjson encodes and decodes large documents several times faster
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self.dumps = orjson.dumps
+        self.loads = orjson.loads
+
+
+def make_codec(name="auto"):
+    # name is auto, orjson or json. auto picks orjson when it is installed.
+    if name in ("auto", "orjson") and HAS_ORJSON:
+        return OrjsonCodec()
+    if name == "orjson":
+        raise ImportError("orjson is not installed")
+    return JsonCodec()
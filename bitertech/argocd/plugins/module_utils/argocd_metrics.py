@@ -0,0 +1,100 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import json
+import threading
+
+
+class ApiMetrics:
+    # Records every HTTP call made by a client: method, path template,
+    # status, duration and bytes in both directions. Records can also be
+    # appended to a JSON-lines trace file and passed to hooks, for instance
+    # to export them as OpenTelemetry spans.
+
+    def __init__(self, trace_file=None, hooks=None):
+        self.trace_file = trace_file
+        self.hooks = list(hooks or [])
+        self.records = []
+        # Read-modify-write cycles replayed after a conflict
+        self.conflict_retries = 0
+        self._lock = threading.Lock()
+
+    def record(self, method, route, status, started, duration, bytes_in, bytes_out, retries=0):
+        record = {
+            "method": method,
+            "route": route,
+            "status": status,
+            "started": started,
+            "duration": round(duration, 6),
+            "bytes_in": bytes_in,
+            "bytes_out": bytes_out,
+            "retries": retries,
+        }
+        with self._lock:
+            self.records.append(record)
+            if self.trace_file:
+                with open(self.trace_file, "a", encoding="utf-8") as trace:
+                    trace.write(json.dumps(record) + "\n")
+
+        for hook in self.hooks:
+            hook(record)
+
+    def record_conflict_retry(self):
+        with self._lock:
+            self.conflict_retries += 1
+
+    def summary(self):
+        with self._lock:
+            records = list(self.records)
+
+        routes = {}
+        for record in records:
+            route = routes.setdefault(f"{record['method']} {record['route']}",
+                                      {"count": 0, "duration": 0.0, "bytes_in": 0, "bytes_out": 0})
+            route["count"] += 1
+            route["duration"] = round(route["duration"] + record["duration"], 6)
+            route["bytes_in"] += record["bytes_in"]
+            route["bytes_out"] += record["bytes_out"]
+
+        return {
+            "requests": len(records),
+            "duration": round(sum(record["duration"] for record in records), 6),
+            "bytes_in": sum(record["bytes_in"] for record in records),
+            "bytes_out": sum(record["bytes_out"] for record in records),
+            "retries": sum(record["retries"] for record in records),
+            "conflict_retries": self.conflict_retries,
+            "by_route": routes,
+        }
+
+    def as_dict(self):
+        with self._lock:
+            records = list(self.records)
+        return {"summary": self.summary(), "requests": records}
+
+
+def opentelemetry_hook(tracer_name="bitertech.argocd"):
+    # Hook exporting every request as a client span through the globally
+    # configured OpenTelemetry tracer provider, None when OpenTelemetry is
+    # not installed
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return None
+
+    tracer = trace.get_tracer(tracer_name)
+
+    def hook(record):
+        start_ns = int(record["started"] * 1e9)
+        span = tracer.start_span(f"{record['method']} {record['route']}",
+                                 kind=trace.SpanKind.CLIENT,
+                                 start_time=start_ns,
+                                 attributes={
+                                     "http.request.method": record["method"],
+                                     "url.template": record["route"],
+                                     "http.response.status_code": record["status"] or 0,
+                                     "http.request.body.size": record["bytes_out"],
+                                     "http.response.body.size": record["bytes_in"],
+                                     "argocd.retries": record["retries"],
+                                 })
+        span.end(end_time=start_ns + int(record["duration"] * 1e9))
+
+    return hook
@@ -0,0 +1,64 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import csv
+
+
+def parse_policy(line):
+    # Parse an ArgoCD Casbin policy line such as
+    # "p, proj:my-project:my-role, applications, get, my-project/*, allow"
+    # into a canonical tuple, whitespace around the fields is not significant
+    fields = next(csv.reader([line.strip()], skipinitialspace=True), [])
+    return tuple(field.strip() for field in fields)
+
+
+def format_policy(fields):
+    return ", ".join(fields)
+
+
+def normalize_policy(line):
+    return format_policy(parse_policy(line))
+
+
+def group_key(group):
+    return group.strip()
+
+
+class MemberIndex:
+    # Order-preserving set of role members (policies or groups). Members are
+    # indexed by a canonical key so membership tests, additions and removals
+    # are O(1) while the original order and spelling of the members is kept.
+
+    def __init__(self, members=None, key=None):
+        self._key = key or (lambda member: member)
+        self._members = {}
+        for member in members or []:
+            self.add(member)
+
+    def __contains__(self, member):
+        return self._key(member) in self._members
+
+    def __len__(self):
+        return len(self._members)
+
+    def get(self, member, default=None):
+        return self._members.get(self._key(member), default)
+
+    def add(self, member):
+        key = self._key(member)
+        if key in self._members:
+            return False
+        self._members[key] = member
+        return True
+
+    def discard(self, member):
+        return self._members.pop(self._key(member), None) is not None
+
+    def values(self):
+        return list(self._members.values())
+
+
+def member_index(key, members=None):
+    # Index for the "policies" or "groups" list of a role
+    if key == "policies":
+        return MemberIndex(members, key=parse_policy)
+    return MemberIndex(members, key=group_key)
@@ -0,0 +1,163 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from email.utils import parsedate_to_datetime
+
+# Statuses of a request the server did not process, or is unable to process
+# for now, retried for every method
+RETRY_STATUSES = (429, 503)
+
+# Statuses of a gateway that lost the request or timed out waiting for the
+# server, which may have applied it. Only retried like a connection error.
+GATEWAY_STATUSES = (502, 504)
+
+# Methods retried after a connection error, when the request may have reached
+# the server. PUT is safe as project updates carry their resourceVersion, and
+# PATCH as the client only sends merge patches, which change nothing when
+# applied twice.
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "PATCH", "DELETE")
+
+
+def parse_retry_after(value):
+    # Seconds to wait from a Retry-After header, given in seconds or as an
+    # HTTP date. None when missing or invalid.
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+
+    def __init__(self, retries=3, backoff=0.5, max_backoff=30.0):
+        # retries: attempts after the first one
+        # backoff: delay before the first retry, doubled on every retry
+        # max_backoff: longest delay, Retry-After included
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def delay(self, attempt, retry_after=None):
+        # The server knows best when it asks for a delay, otherwise
+        # exponential backoff with jitter so forks do not retry in lockstep
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        return min(self.backoff * 2 ** attempt, self.max_backoff) * random.uniform(0.5, 1.5)
+
+
+class RateLimiter:
+    # Token bucket shared by every thread of a client: rate requests per
+    # second on average, bursts of up to burst requests
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = max(1, burst or int(rate) or 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        # Take a token, sleeping until one is available. Returns the time
+        # spent waiting.
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class CircuitBreaker:
+    # Opens after threshold consecutive failures, then fails every request at
+    # once for reset_timeout seconds instead of letting each of them wait for
+    # a dead server. After that one request is let through, its outcome
+    # closes the breaker or opens it again. With a state_file the state is
+    # shared by every process using the same file, such as the forks of a
+    # play.
+
+    def __init__(self, threshold=5, reset_timeout=30.0, state_file=None):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state_file = state_file
+        self._failures = 0
+        self._opened_until = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not self.state_file:
+            return
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as state:
+                shared = json.load(state)
+            self._failures = shared.get("failures", 0)
+            self._opened_until = shared.get("opened_until", 0.0)
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        if not self.state_file:
+            return
+        # Replaced atomically, readers never see a partial file
+        directory = os.path.dirname(self.state_file) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            with os.fdopen(fd, "w", encoding="utf-8") as state:
+                json.dump({"failures": self._failures, "opened_until": self._opened_until}, state)
+            os.replace(tmp_path, self.state_file)
+        except OSError:
+            pass
+
+    def allow(self):
+        # False while the breaker is open
+        with self._lock:
+            self._load()
+            now = time.time()
+            if self._opened_until > now:
+                return False
+            if self._opened_until and self._failures >= self.threshold:
+                # Half open, a single request probes the server
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def remaining(self):
+        return max(0.0, self._opened_until - time.time())
+
+    def success(self):
+        with self._lock:
+            self._load()
+            self._probing = False
+            if self._failures or self._opened_until:
+                self._failures = 0
+                self._opened_until = 0.0
+                self._save()
+
+    def failure(self):
+        with self._lock:
+            self._load()
+            self._probing = False
+            self._failures += 1
+            if self._failures >= self.threshold:
+                self._opened_until = time.time() + self.reset_timeout
+            self._save()
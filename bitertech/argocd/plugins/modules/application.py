@@ -5,41 +5,37 @@ from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
 
-import requests
-
 from ansible.module_utils.basic import AnsibleModule
 
 # Correct the import statement
-try:
-    from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient
-except ImportError as imp_exc:
-    ANOTHER_LIBRARY_IMPORT_ERROR = imp_exc
-else:
-    ANOTHER_LIBRARY_IMPORT_ERROR = None
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import APPLICATION_SYNC_ARGS, ArgoCDClient, ARGOCD_SESSION_ARGS
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_http import ArgoCDConnectionError, ArgoCDError, ArgoCDHTTPError, ArgoCDTimeout
 
 
 def main():
 
     fields = {
-        "api_url": {"required": True, "type": 'str'},
-        "token": {"required": True, "type": 'str'},
+        "api_url": {"required": False, "type": 'str'},
+        "token": {"required": False, "type": 'str', "no_log": True},
         "name": {"required": True, "type": 'str'},
         "repository_url": {"required": True, "type": 'str'},
         "path": {"required": True, "type": 'str'},
         "target_revision": {"required": True, "type": 'str'},
         "namespace": {"required": True, "type": 'str'},
-        "values_files": {"required": False, "type": 'str'},
+        "values_files": {"required": False, "type": 'list', "elements": 'str'},
         "destination_server": {"required": False, "type": 'str'},
         "project": {"required": False, "type": "str"},
+        "upsert": {"required": False, "type": "bool", "default": True},
         "status": {"type": "str", "choices": ["present", "absent"], "default": "present"}
     }
+    fields.update(APPLICATION_SYNC_ARGS)
+    fields.update(ARGOCD_SESSION_ARGS)
 
     module = AnsibleModule(
-        argument_spec=fields
+        argument_spec=fields,
+        supports_check_mode=True
     )
 
-    api_url = module.params["api_url"]
-    token = module.params["token"]
     name = module.params["name"]
     repository_url = module.params["repository_url"]
     path = module.params["path"]
@@ -48,27 +44,33 @@ def main():
     values_files = module.params["values_files"]
     destination_server = module.params["destination_server"]
     project = module.params["project"]
+    upsert = module.params["upsert"]
     status = module.params["status"]
 
     try:
-        client = ArgoCDClient(api_url, token)
+        client = ArgoCDClient.from_module(module)
         if status == "present":
-            result = client.create_application(name,
-                                               repository_url,
-                                               path,
-                                               target_revision,
-                                               values_files=values_files,
-                                               destination_server=destination_server,
-                                               namespace=namespace,
-                                               project=project)
-        module.exit_json(changed=True, result=result)
-    except requests.exceptions.HTTPError as errh:
+            result, diff = client.create_application(name,
+                                                     repository_url,
+                                                     path,
+                                                     target_revision,
+                                                     values_files=values_files,
+                                                     destination_server=destination_server,
+                                                     namespace=namespace,
+                                                     project=project,
+                                                     upsert=upsert,
+                                                     **{key: module.params[key] for key in APPLICATION_SYNC_ARGS})
+        module.exit_json(changed=diff is not None,
+                         result=result,
+                         diff=diff or {},
+                         **client.metrics_result(module.params))
+    except ArgoCDHTTPError as errh:
         module.fail_json(msg=str(errh.response.json()))
-    except requests.exceptions.ReadTimeout as errrt:
+    except ArgoCDTimeout as errrt:
         module.fail_json(msg=str(errrt))
-    except requests.exceptions.ConnectionError as conerr:
+    except ArgoCDConnectionError as conerr:
         module.fail_json(msg=str(conerr))
-    except requests.exceptions.RequestException as errex:
+    except ArgoCDError as errex:
         module.fail_json(msg=str(errex))
 
 
@@ -0,0 +1,174 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+
+from ansible.module_utils.basic import AnsibleModule
+
+# Correct the import statement
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import APPLICATION_SYNC_ARGS, ArgoCDClient, ARGOCD_SESSION_ARGS
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_http import ArgoCDError, ArgoCDHTTPError
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_bulk import run_bulk, summarize
+
+
+def resolve_clusters(client, clusters, cluster_selector):
+    # The target clusters, with their server and labels. The clusters API is
+    # only read for a selector or for clusters given without their server.
+    registered = None
+    if cluster_selector is not None or any(not cluster["server"] for cluster in clusters or []):
+        registered = client.list_clusters()
+
+    if cluster_selector is not None:
+        return [{"name": cluster["name"], "server": cluster["server"], "labels": cluster.get("labels") or {}}
+                for cluster in registered
+                if all((cluster.get("labels") or {}).get(key) == value for key, value in cluster_selector.items())]
+
+    by_name = dict((cluster["name"], cluster) for cluster in registered or [])
+    resolved = []
+    for cluster in clusters:
+        live = by_name.get(cluster["name"]) or {}
+        server = cluster["server"] or live.get("server")
+        if not server:
+            raise ArgoCDError(f"Cluster {cluster['name']} is not registered in ArgoCD")
+        resolved.append(dict(cluster, server=server, labels=live.get("labels") or {}))
+    return resolved
+
+
+def render_instances(params, clusters):
+    # One application per cluster. Its name, namespace, revision and values
+    # files are formatted with the placeholders {name}, {cluster}, {server}
+    # and {labels[key]}.
+    instances = []
+    for cluster in clusters:
+        variables = {"name": params["name"], "cluster": cluster["name"], "server": cluster["server"],
+                     "labels": cluster["labels"]}
+        try:
+            instances.append({
+                "name": params["name_template"].format(**variables),
+                "cluster": cluster["name"],
+                "server": cluster["server"],
+                "namespace": (cluster.get("namespace") or params["namespace"]).format(**variables),
+                "target_revision": (cluster.get("target_revision") or params["target_revision"]).format(**variables),
+                "values_files": [values_file.format(**variables)
+                                 for values_file in (cluster.get("values_files") or params["values_files"] or [])],
+            })
+        except (KeyError, IndexError, ValueError) as exc:
+            raise ArgoCDError(f"Invalid placeholder for cluster {cluster['name']}: {exc}")
+    return instances
+
+
+def create_instance(client, params, instance, live):
+    outcome = {"name": instance["name"], "cluster": instance["cluster"], "server": instance["server"]}
+    try:
+        result, diff = client.create_application(instance["name"],
+                                                 params["repository_url"],
+                                                 params["path"],
+                                                 instance["target_revision"],
+                                                 values_files=instance["values_files"],
+                                                 destination_server=instance["server"],
+                                                 namespace=instance["namespace"],
+                                                 project=params["project"],
+                                                 upsert=params["upsert"],
+                                                 live=live,
+                                                 **{key: params[key] for key in APPLICATION_SYNC_ARGS})
+        return dict(outcome, changed=diff is not None, failed=False, result=result, diff=diff or {})
+    except ArgoCDHTTPError as errh:
+        return dict(outcome, changed=False, failed=True, msg=errh.response.text)
+    except ArgoCDError as errex:
+        return dict(outcome, changed=False, failed=True, msg=str(errex))
+    except Exception as exc:
+        # Such as a malformed document, only this cluster fails
+        return dict(outcome, changed=False, failed=True, msg=f"{type(exc).__name__}: {exc}")
+
+
+def main():
+
+    cluster_fields = {
+        "name": {"required": True, "type": 'str'},
+        "server": {"required": False, "type": 'str'},
+        "namespace": {"required": False, "type": 'str'},
+        "target_revision": {"required": False, "type": 'str'},
+        "values_files": {"required": False, "type": 'list', "elements": 'str'},
+    }
+
+    fields = {
+        "api_url": {"required": False, "type": 'str'},
+        "token": {"required": False, "type": 'str', "no_log": True},
+        "name": {"required": True, "type": 'str'},
+        "name_template": {"required": False, "type": 'str', "default": "{name}-{cluster}"},
+        "repository_url": {"required": True, "type": 'str'},
+        "path": {"required": True, "type": 'str'},
+        "target_revision": {"required": True, "type": 'str'},
+        "namespace": {"required": True, "type": 'str'},
+        "values_files": {"required": False, "type": 'list', "elements": 'str'},
+        "project": {"required": False, "type": "str", "default": "default"},
+        "upsert": {"required": False, "type": "bool", "default": True},
+        "clusters": {"required": False, "type": 'list', "elements": 'dict', "options": cluster_fields},
+        "cluster_selector": {"required": False, "type": 'dict'},
+        "max_workers": {"required": False, "type": 'int', "default": 10},
+        "status": {"type": "str", "choices": ["present"], "default": "present"}
+    }
+    fields.update(APPLICATION_SYNC_ARGS)
+    fields.update(ARGOCD_SESSION_ARGS)
+
+    module = AnsibleModule(
+        argument_spec=fields,
+        mutually_exclusive=[["clusters", "cluster_selector"]],
+        required_one_of=[["clusters", "cluster_selector"]],
+        supports_check_mode=True
+    )
+
+    params = module.params
+    max_workers = params["max_workers"]
+
+    # The pool must be able to hold a connection per worker
+    client = ArgoCDClient.from_module(module, pool_size=max(params["pool_size"], max_workers))
+
+    try:
+        # Step 1: The clusters and the application of each of them
+        clusters = resolve_clusters(client, params["clusters"], params["cluster_selector"])
+        if not clusters:
+            module.fail_json(msg=f"No cluster matches {params['cluster_selector']}")
+        instances = render_instances(params, clusters)
+        names = [instance["name"] for instance in instances]
+        duplicates = sorted(set(name for name in names if names.count(name) > 1))
+        if duplicates:
+            module.fail_json(msg=f"Several clusters get the application names {', '.join(duplicates)}, "
+                                 f"name_template must contain {{cluster}}")
+
+        # Step 2: The live applications of the project in one list call
+        # instead of a GET per cluster
+        projection = ["items.metadata.name", "items.metadata.resourceVersion", "items.spec"]
+        live_applications = dict((application["metadata"]["name"], application)
+                                 for application in client.iter_applications(projects=[params["project"]],
+                                                                             fields=projection)
+                                 if application["metadata"]["name"] in names)
+    except ArgoCDHTTPError as errh:
+        module.fail_json(msg=errh.response.text)
+    except ArgoCDError as errex:
+        module.fail_json(msg=str(errex))
+
+    # Step 3: Create or update the applications concurrently
+    results = run_bulk(lambda instance: create_instance(client, params, instance,
+                                                        live_applications.get(instance["name"])),
+                       instances,
+                       max_workers=max_workers)
+    summary = summarize(results)
+
+    if summary["failed"]:
+        module.fail_json(msg=f"{summary['failed']} of {summary['total']} clusters failed",
+                         changed=summary["changed"] > 0,
+                         results=results,
+                         summary=summary,
+                         **client.metrics_result(module.params))
+
+    module.exit_json(changed=summary["changed"] > 0,
+                     results=results,
+                     summary=summary,
+                     **client.metrics_result(module.params))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+
+from ansible.module_utils.basic import AnsibleModule
+
+# Correct the import statement
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient, ARGOCD_SESSION_ARGS
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_http import ArgoCDConnectionError, ArgoCDError, ArgoCDHTTPError, ArgoCDTimeout
+
+
+def main():
+
+    fields = {
+        "api_url": {"required": False, "type": 'str'},
+        "token": {"required": False, "type": 'str', "no_log": True},
+        "name": {"required": False, "type": 'str'},
+        "projects": {"required": False, "type": 'list', "elements": 'str', "aliases": ['project']},
+        "selector": {"required": False, "type": 'str'},
+        "fields": {"required": False, "type": 'list', "elements": 'str'},
+    }
+    fields.update(ARGOCD_SESSION_ARGS)
+
+    module = AnsibleModule(
+        argument_spec=fields,
+        supports_check_mode=True
+    )
+
+    name = module.params["name"]
+    projects = module.params["projects"]
+    selector = module.params["selector"]
+
+    # Paths are relative to an application, such as metadata.name, the API
+    # expects them relative to the list
+    projection = None
+    if module.params["fields"]:
+        projection = [path if path.startswith("items.") else f"items.{path}" for path in module.params["fields"]]
+
+    try:
+        client = ArgoCDClient.from_module(module)
+        applications = client.list_applications(projects=projects,
+                                                selector=selector,
+                                                fields=projection,
+                                                name=name)
+        module.exit_json(changed=False, applications=applications, **client.metrics_result(module.params))
+    except ArgoCDHTTPError as errh:
+        module.fail_json(msg=str(errh.response.json()))
+    except ArgoCDTimeout as errrt:
+        module.fail_json(msg=str(errrt))
+    except ArgoCDConnectionError as conerr:
+        module.fail_json(msg=str(conerr))
+    except ArgoCDError as errex:
+        module.fail_json(msg=str(errex))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+
+from ansible.module_utils.basic import AnsibleModule
+
+# Correct the import statement
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import APPLICATION_SYNC_ARGS, ArgoCDClient, ARGOCD_SESSION_ARGS
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_http import ArgoCDError, ArgoCDHTTPError
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_bulk import run_bulk, summarize
+
+
+def create_application(client, application):
+    name = application["name"]
+    try:
+        result, diff = client.create_application(application["name"],
+                                                 application["repository_url"],
+                                                 application["path"],
+                                                 application["target_revision"],
+                                                 values_files=application["values_files"],
+                                                 destination_server=application["destination_server"],
+                                                 namespace=application["namespace"],
+                                                 project=application["project"],
+                                                 upsert=application["upsert"],
+                                                 **{key: application[key] for key in APPLICATION_SYNC_ARGS})
+        return {"name": name, "changed": diff is not None, "failed": False, "result": result, "diff": diff or {}}
+    except ArgoCDHTTPError as errh:
+        return {"name": name, "changed": False, "failed": True, "msg": errh.response.text}
+    except ArgoCDError as errex:
+        return {"name": name, "changed": False, "failed": True, "msg": str(errex)}
+    except Exception as exc:
+        # Such as a malformed document, only this application fails
+        return {"name": name, "changed": False, "failed": True, "msg": f"{type(exc).__name__}: {exc}"}
+
+
+def main():
+
+    application_fields = {
+        "name": {"required": True, "type": 'str'},
+        "repository_url": {"required": True, "type": 'str'},
+        "path": {"required": True, "type": 'str'},
+        "target_revision": {"required": True, "type": 'str'},
+        "namespace": {"required": True, "type": 'str'},
+        "values_files": {"required": False, "type": 'list', "elements": 'str'},
+        "destination_server": {"required": False, "type": 'str', "default": "https://kubernetes.default.svc"},
+        "project": {"required": False, "type": "str", "default": "default"},
+        "upsert": {"required": False, "type": "bool", "default": True},
+    }
+    application_fields.update(APPLICATION_SYNC_ARGS)
+
+    fields = {
+        "api_url": {"required": False, "type": 'str'},
+        "token": {"required": False, "type": 'str', "no_log": True},
+        "applications": {"required": True, "type": 'list', "elements": 'dict', "options": application_fields},
+        "max_workers": {"required": False, "type": 'int', "default": 10},
+        "status": {"type": "str", "choices": ["present"], "default": "present"}
+    }
+    fields.update(ARGOCD_SESSION_ARGS)
+
+    module = AnsibleModule(
+        argument_spec=fields,
+        supports_check_mode=True
+    )
+
+    applications = module.params["applications"]
+    max_workers = module.params["max_workers"]
+
+    # The pool must be able to hold a connection per worker
+    client = ArgoCDClient.from_module(module, pool_size=max(module.params["pool_size"], max_workers))
+    results = run_bulk(lambda application: create_application(client, application),
+                       applications,
+                       max_workers=max_workers)
+    summary = summarize(results)
+
+    if summary["failed"]:
+        module.fail_json(msg=f"{summary['failed']} of {summary['total']} applications failed",
+                         changed=summary["changed"] > 0,
+                         results=results,
+                         summary=summary,
+                         **client.metrics_result(module.params))
+
+    module.exit_json(changed=summary["changed"] > 0,
+                     results=results,
+                     summary=summary,
+                     **client.metrics_result(module.params))
+
+
+if __name__ == "__main__":
+    main()
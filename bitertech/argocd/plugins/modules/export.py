@@ -0,0 +1,161 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+
+import os
+
+from ansible.module_utils.basic import AnsibleModule
+
+# Correct the import statement
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient, ARGOCD_SESSION_ARGS
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_http import ArgoCDConnectionError, ArgoCDError, ArgoCDHTTPError, ArgoCDTimeout
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_bulk import run_bulk
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_export import (
+    EXPORT_KINDS,
+    export_path,
+    exportable_repository,
+    object_key,
+    object_version,
+    read_manifest,
+    rewrite_export,
+    write_export,
+    write_manifest,
+)
+
+# Enough to tell whether an object changed since the last export
+VERSION_FIELDS = ["items.metadata.name", "items.metadata.resourceVersion"]
+
+# Applications without their status, which holds the live resource tree
+APPLICATION_FIELDS = ["items.metadata", "items.spec"]
+
+
+def export_repositories(client, path, previous, check_mode):
+    # Repositories are small and have no resourceVersion, they are listed
+    # in full and compared line by line
+    documents = dict((object_key("repositories", document), exportable_repository(document))
+                     for document in client.list_repositories())
+    if previous is None:
+        versions = write_export(path, "repositories", iter(documents.values()), check_mode)
+        counts = {"added": len(versions), "updated": 0, "removed": 0, "unchanged": 0}
+    else:
+        counts = rewrite_export(path, "repositories", documents, set(previous) - set(documents), check_mode)
+        versions = dict((key, object_version("repositories", document)) for key, document in documents.items())
+    return versions, counts, len(documents)
+
+
+def export_objects(client, kind, path, previous, include_status, max_workers, check_mode):
+    if kind == "projects":
+        iterate, fetch, fields = client.iter_projects, client.get_project, None
+    else:
+        iterate, fetch = client.iter_applications, client.get_application
+        fields = None if include_status else APPLICATION_FIELDS
+
+    def clean(document):
+        if not include_status and kind == "applications":
+            document.pop("status", None)
+        return document
+
+    # Step 1: First export, everything is streamed to the file
+    if previous is None:
+        versions = write_export(path, kind, (clean(document) for document in iterate(fields=fields)), check_mode)
+        return versions, {"added": len(versions), "updated": 0, "removed": 0, "unchanged": 0}, len(versions)
+
+    # Step 2: Compare the live versions with the manifest
+    live = dict((document["metadata"]["name"], document["metadata"].get("resourceVersion"))
+                for document in iterate(fields=VERSION_FIELDS))
+    changed = set(name for name, version in live.items() if previous.get(name) != version)
+
+    # Step 3: Fetch the changed objects only, with one list call when most of
+    # them changed and concurrent GETs otherwise
+    if len(changed) > len(live) // 2:
+        updates = dict((document["metadata"]["name"], clean(document))
+                       for document in iterate(fields=fields) if document["metadata"]["name"] in changed)
+    else:
+        documents = run_bulk(lambda name: fetch(name, missing_ok=True), sorted(changed), max_workers=max_workers)
+        updates = dict((document["metadata"]["name"], clean(document)) for document in documents if document)
+
+    # Changed objects that could not be fetched were deleted meanwhile
+    present = set(live) - (changed - set(updates))
+    counts = rewrite_export(path, kind, updates, set(previous) - present, check_mode)
+
+    versions = dict((name, live[name]) for name in present)
+    versions.update((name, object_version(kind, document)) for name, document in updates.items())
+    return versions, counts, len(updates)
+
+
+def main():
+
+    fields = {
+        "api_url": {"required": False, "type": 'str'},
+        "token": {"required": False, "type": 'str', "no_log": True},
+        "dest": {"required": True, "type": 'path'},
+        "kinds": {"required": False, "type": 'list', "elements": 'str', "choices": list(EXPORT_KINDS),
+                  "default": list(EXPORT_KINDS)},
+        "compress": {"required": False, "type": 'bool', "default": False},
+        "include_status": {"required": False, "type": 'bool', "default": False},
+        "full": {"required": False, "type": 'bool', "default": False},
+        "max_workers": {"required": False, "type": 'int', "default": 10},
+    }
+    fields.update(ARGOCD_SESSION_ARGS)
+
+    module = AnsibleModule(
+        argument_spec=fields,
+        supports_check_mode=True
+    )
+
+    dest = module.params["dest"]
+    kinds = module.params["kinds"]
+    compress = module.params["compress"]
+    include_status = module.params["include_status"]
+    max_workers = module.params["max_workers"]
+
+    if not os.path.isdir(dest) and not module.check_mode:
+        os.makedirs(dest, mode=0o700)
+
+    # The manifest is only trusted when the previous export used the same format
+    manifest = read_manifest(dest)
+    reuse = (not module.params["full"]
+             and manifest.get("compress") == compress
+             and manifest.get("include_status") == include_status)
+    objects = dict(manifest.get("objects", {})) if reuse else {}
+
+    try:
+        client = ArgoCDClient.from_module(module, pool_size=max(module.params["pool_size"], max_workers))
+
+        exports = {}
+        for kind in kinds:
+            path = export_path(dest, kind, compress)
+            previous = objects.get(kind) if os.path.exists(path) else None
+            if kind == "repositories":
+                versions, counts, fetched = export_repositories(client, path, previous, module.check_mode)
+            else:
+                versions, counts, fetched = export_objects(client, kind, path, previous, include_status,
+                                                           max_workers, module.check_mode)
+            objects[kind] = versions
+            exports[kind] = dict(counts, path=path, total=len(versions), fetched=fetched)
+
+            # An export in the other format is stale now
+            stale_path = export_path(dest, kind, not compress)
+            if os.path.exists(stale_path) and not module.check_mode:
+                os.remove(stale_path)
+
+        changed = any(export["added"] or export["updated"] or export["removed"] for export in exports.values())
+        if not module.check_mode:
+            write_manifest(dest, {"compress": compress, "include_status": include_status, "objects": objects})
+
+        module.exit_json(changed=changed, dest=dest, exports=exports, **client.metrics_result(module.params))
+    except ArgoCDHTTPError as errh:
+        module.fail_json(msg=str(errh.response.json()))
+    except ArgoCDTimeout as errrt:
+        module.fail_json(msg=str(errrt))
+    except ArgoCDConnectionError as conerr:
+        module.fail_json(msg=str(conerr))
+    except ArgoCDError as errex:
+        module.fail_json(msg=str(errex))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,51 +5,53 @@ from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
 
-import requests
-
 from ansible.module_utils.basic import AnsibleModule
 
 # Correct the import statement
-from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient, ARGOCD_SESSION_ARGS
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_http import ArgoCDConnectionError, ArgoCDError, ArgoCDHTTPError, ArgoCDTimeout
 
 
 def main():
 
     fields = {
-        "api_url": {"required": True, "type": 'str'},
-        "token": {"required": True, "type": 'str'},
+        "api_url": {"required": False, "type": 'str'},
+        "token": {"required": False, "type": 'str', "no_log": True},
         "project_name": {"required": True, "type": 'str'},
         "role_name": {"required": True, "type": 'str'},
         "policies": {"required": True, "type": 'list'},
         "status": {"type": "str", "choices": ["present", "absent"], "default": "present"},
 
     }
+    fields.update(ARGOCD_SESSION_ARGS)
 
     module = AnsibleModule(
-        argument_spec=fields
+        argument_spec=fields,
+        supports_check_mode=True
     )
 
-    api_url = module.params["api_url"]
-    token = module.params["token"]
     project_name = module.params["project_name"]
     role_name = module.params["role_name"]
     policies = module.params["policies"]
     status = module.params["status"]
 
     try:
-        client = ArgoCDClient(api_url, token)
+        client = ArgoCDClient.from_module(module)
 
-        result = client.add_remove_policies_to_role(
+        result, diff = client.add_remove_policies_to_role(
             project_name, role_name, policies, status)
 
-        module.exit_json(changed=True, result=result)
-    except requests.exceptions.HTTPError as errh:
+        module.exit_json(changed=diff is not None,
+                         result=result,
+                         diff=diff or {},
+                         **client.metrics_result(module.params))
+    except ArgoCDHTTPError as errh:
         module.fail_json(msg=str(errh.response.json()))
-    except requests.exceptions.ReadTimeout as errrt:
+    except ArgoCDTimeout as errrt:
         module.fail_json(msg=str(errrt))
-    except requests.exceptions.ConnectionError as conerr:
+    except ArgoCDConnectionError as conerr:
         module.fail_json(msg=str(conerr))
-    except requests.exceptions.RequestException as errex:
+    except ArgoCDError as errex:
         module.fail_json(msg=str(errex))
 
 
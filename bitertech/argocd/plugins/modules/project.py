@@ -5,50 +5,52 @@ from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
 
-import requests
-
 from ansible.module_utils.basic import AnsibleModule
 
 # Correct the import statement
-from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient, ARGOCD_SESSION_ARGS
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_http import ArgoCDConnectionError, ArgoCDError, ArgoCDHTTPError, ArgoCDTimeout
 
 
 def main():
 
     fields = {
-        "api_url": {"required": True, "type": 'str'},
-        "token": {"required": True, "type": 'str'},
+        "api_url": {"required": False, "type": 'str'},
+        "token": {"required": False, "type": 'str', "no_log": True},
         "name": {"required": True, "type": 'str'},
         "description": {"required": True, "type": 'str'},
         "status": {"type": "str", "choices": ["present", "absent", "update"], "default": "present"}
     }
+    fields.update(ARGOCD_SESSION_ARGS)
 
     module = AnsibleModule(
-        argument_spec=fields
+        argument_spec=fields,
+        supports_check_mode=True
     )
 
-    api_url = module.params["api_url"]
-    token = module.params["token"]
     name = module.params["name"]
     description = module.params["description"]
     status = module.params["status"]
 
     try:
-        client = ArgoCDClient(api_url, token)
+        client = ArgoCDClient.from_module(module)
         if status == "present":
-            result = client.create_project(name, description)
+            result, diff = client.create_project(name, description)
         if status == "update":
-            result = client.update_project(name, description)
+            result, diff = client.update_project(name, description)
         if status == "absent":
-            result = client.delete_project(name, description)
-        module.exit_json(changed=True, result=result)
-    except requests.exceptions.HTTPError as errh:
+            result, diff = client.delete_project(name)
+        module.exit_json(changed=diff is not None,
+                         result=result,
+                         diff=diff or {},
+                         **client.metrics_result(module.params))
+    except ArgoCDHTTPError as errh:
         module.fail_json(msg=str(errh.response.json()))
-    except requests.exceptions.ReadTimeout as errrt:
+    except ArgoCDTimeout as errrt:
         module.fail_json(msg=str(errrt))
-    except requests.exceptions.ConnectionError as conerr:
+    except ArgoCDConnectionError as conerr:
         module.fail_json(msg=str(conerr))
-    except requests.exceptions.RequestException as errex:
+    except ArgoCDError as errex:
         module.fail_json(msg=str(errex))
 
 
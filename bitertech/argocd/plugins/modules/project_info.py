@@ -5,41 +5,40 @@ from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
 
-import requests
-
 from ansible.module_utils.basic import AnsibleModule
 
 # Correct the import statement
-from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient, ARGOCD_SESSION_ARGS
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_http import ArgoCDConnectionError, ArgoCDError, ArgoCDHTTPError, ArgoCDTimeout
 
 
 def main():
 
     fields = {
-        "api_url": {"required": True, "type": 'str'},
-        "token": {"required": True, "type": 'str'},
+        "api_url": {"required": False, "type": 'str'},
+        "token": {"required": False, "type": 'str', "no_log": True},
         "name": {"required": True, "type": 'str'}
     }
+    fields.update(ARGOCD_SESSION_ARGS)
 
     module = AnsibleModule(
-        argument_spec=fields
+        argument_spec=fields,
+        supports_check_mode=True
     )
 
-    api_url = module.params["api_url"]
-    token = module.params["token"]
     name = module.params["name"]
 
     try:
-        client = ArgoCDClient(api_url, token)
+        client = ArgoCDClient.from_module(module)
         result = client.get_project(name)
-        module.exit_json(changed=True, result=result)
-    except requests.exceptions.HTTPError as errh:
+        module.exit_json(changed=False, result=result, **client.metrics_result(module.params))
+    except ArgoCDHTTPError as errh:
         module.fail_json(msg=str(errh.response.json()))
-    except requests.exceptions.ReadTimeout as errrt:
+    except ArgoCDTimeout as errrt:
         module.fail_json(msg=str(errrt))
-    except requests.exceptions.ConnectionError as conerr:
+    except ArgoCDConnectionError as conerr:
         module.fail_json(msg=str(conerr))
-    except requests.exceptions.RequestException as errex:
+    except ArgoCDError as errex:
         module.fail_json(msg=str(errex))
 
 
@@ -0,0 +1,62 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+
+from ansible.module_utils.basic import AnsibleModule
+
+# Correct the import statement
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient, ARGOCD_SESSION_ARGS
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_http import ArgoCDConnectionError, ArgoCDError, ArgoCDHTTPError, ArgoCDTimeout
+
+
+def main():
+
+    role_fields = {
+        "name": {"required": True, "type": 'str'},
+        "description": {"required": False, "type": 'str'},
+        "policies": {"required": False, "type": 'list', "elements": 'str'},
+        "groups": {"required": False, "type": 'list', "elements": 'str'},
+    }
+
+    fields = {
+        "api_url": {"required": False, "type": 'str'},
+        "token": {"required": False, "type": 'str', "no_log": True},
+        "project_name": {"required": True, "type": 'str'},
+        "roles": {"required": True, "type": 'list', "elements": 'dict', "options": role_fields},
+        "status": {"type": "str", "choices": ["present", "absent", "exclusive"], "default": "present"},
+    }
+    fields.update(ARGOCD_SESSION_ARGS)
+
+    module = AnsibleModule(
+        argument_spec=fields,
+        supports_check_mode=True
+    )
+
+    project_name = module.params["project_name"]
+    roles = module.params["roles"]
+    status = module.params["status"]
+
+    try:
+        client = ArgoCDClient.from_module(module)
+
+        result, diff = client.apply_project_roles(project_name, roles, status)
+
+        module.exit_json(changed=diff is not None,
+                         result=result,
+                         diff=diff or {},
+                         **client.metrics_result(module.params))
+    except ArgoCDHTTPError as errh:
+        module.fail_json(msg=str(errh.response.json()))
+    except ArgoCDTimeout as errrt:
+        module.fail_json(msg=str(errrt))
+    except ArgoCDConnectionError as conerr:
+        module.fail_json(msg=str(conerr))
+    except ArgoCDError as errex:
+        module.fail_json(msg=str(errex))
+
+
+if __name__ == "__main__":
+    main()
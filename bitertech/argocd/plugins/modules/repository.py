@@ -5,67 +5,172 @@ from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
 
-import requests
-
 from ansible.module_utils.basic import AnsibleModule
 
 # Correct the import statement
-try:
-    from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient
-except ImportError as imp_exc:
-    ANOTHER_LIBRARY_IMPORT_ERROR = imp_exc
-else:
-    ANOTHER_LIBRARY_IMPORT_ERROR = None
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient, ARGOCD_SESSION_ARGS, repository_key
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_http import ArgoCDConnectionError, ArgoCDError, ArgoCDHTTPError, ArgoCDTimeout
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_bulk import run_bulk, summarize
+
+
+def register(kind, name, apply):
+    try:
+        result, diff = apply()
+        return {"name": name, "kind": kind, "changed": diff is not None, "failed": False,
+                "result": result, "diff": diff or {}}
+    except ArgoCDHTTPError as errh:
+        return {"name": name, "kind": kind, "changed": False, "failed": True, "msg": errh.response.text}
+    except ArgoCDError as errex:
+        return {"name": name, "kind": kind, "changed": False, "failed": True, "msg": str(errex)}
+    except Exception as exc:
+        # Such as a malformed document, only this object fails
+        return {"name": name, "kind": kind, "changed": False, "failed": True, "msg": f"{type(exc).__name__}: {exc}"}
+
+
+def register_all(client, repositories, credentials, max_workers):
+    # Step 1: List the existing repositories and credential templates once
+    live_credentials = {}
+    if credentials:
+        live_credentials = dict((item["url"], item) for item in client.list_repository_credentials())
+    live_repositories = {}
+    if repositories:
+        live_repositories = dict((repository_key(item["repo"], item.get("project")), item)
+                                 for item in client.list_repositories())
+
+    # Step 2: Credential templates first, ArgoCD checks the access to a new
+    # repository when it is registered
+    def apply_credentials(item):
+        return register("credentials", item["url"], lambda: client.create_repository_credentials(
+            item["url"],
+            item["username"],
+            item["password"],
+            type=item["type"],
+            update_password=item["update_password"],
+            live=live_credentials.get(item["url"])))
+
+    def apply_repository(item):
+        return register("repository", item["repository_url"], lambda: client.create_repository(
+            item["type"],
+            item["repository_url"],
+            item["username"],
+            item["password"],
+            item["project"],
+            item["name"],
+            update_password=item["update_password"],
+            live=live_repositories.get(repository_key(item["repository_url"], item["project"]))))
+
+    # Step 3: Only the missing or changed objects are written, concurrently
+    results = run_bulk(apply_credentials, credentials, max_workers=max_workers)
+    results += run_bulk(apply_repository, repositories, max_workers=max_workers)
+    return results
 
 
 def main():
 
-    fields = {
-        "api_url": {"required": True, "type": 'str'},
-        "token": {"required": True, "type": 'str'},
+    repository_fields = {
         "type": {"required": True, "type": 'str'},
         "repository_url": {"required": True, "type": 'str'},
-        "username": {"required": True, "type": 'str'},
-        "password": {"required": True, "type": 'str'},
+        "username": {"required": False, "type": 'str'},
+        "password": {"required": False, "type": 'str', "no_log": True},
         "project": {"required": False, "type": "str"},
         "name": {"required": False, "type": "str"},
+        "update_password": {"type": "str", "choices": ["always", "on_create"], "default": "on_create"},
+    }
+
+    credentials_fields = {
+        "url": {"required": True, "type": 'str'},
+        "type": {"required": False, "type": 'str'},
+        "username": {"required": False, "type": 'str'},
+        "password": {"required": False, "type": 'str', "no_log": True},
+        "update_password": {"type": "str", "choices": ["always", "on_create"], "default": "on_create"},
+    }
+
+    fields = {
+        "api_url": {"required": False, "type": 'str'},
+        "token": {"required": False, "type": 'str', "no_log": True},
+        "type": {"required": False, "type": 'str'},
+        "repository_url": {"required": False, "type": 'str'},
+        "username": {"required": False, "type": 'str'},
+        "password": {"required": False, "type": 'str', "no_log": True},
+        "project": {"required": False, "type": "str"},
+        "name": {"required": False, "type": "str"},
+        "update_password": {"type": "str", "choices": ["always", "on_create"], "default": "on_create"},
+        "repositories": {"required": False, "type": 'list', "elements": 'dict', "options": repository_fields},
+        "credentials": {"required": False, "type": 'list', "elements": 'dict', "options": credentials_fields},
+        "max_workers": {"required": False, "type": 'int', "default": 10},
         "status": {"type": "str", "choices": ["present", "absent"], "default": "present"}
     }
+    fields.update(ARGOCD_SESSION_ARGS)
 
     module = AnsibleModule(
-        argument_spec=fields
+        argument_spec=fields,
+        supports_check_mode=True,
+        required_one_of=[["repository_url", "repositories", "credentials"]],
+        mutually_exclusive=[["repository_url", "repositories"]],
+        required_by={"repository_url": ["type"]}
     )
 
-    api_url = module.params["api_url"]
-    token = module.params["token"]
     type = module.params["type"]
     repository_url = module.params["repository_url"]
     username = module.params["username"]
     password = module.params["password"]
     project = module.params["project"]
     name = module.params["name"]
+    update_password = module.params["update_password"]
+    repositories = module.params["repositories"] or []
+    credentials = module.params["credentials"] or []
+    max_workers = module.params["max_workers"]
     status = module.params["status"]
 
     try:
-        client = ArgoCDClient(api_url, token)
+        if repository_url is None:
+            if status != "present":
+                module.fail_json(msg="repositories and credentials only support status present")
+
+            # The pool must be able to hold a connection per worker
+            client = ArgoCDClient.from_module(module, pool_size=max(module.params["pool_size"], max_workers))
+            results = register_all(client, repositories, credentials, max_workers)
+            summary = summarize(results)
+            diff = [dict(item["diff"], before_header=item["name"], after_header=item["name"])
+                    for item in results if item.get("diff")]
+
+            if summary["failed"]:
+                module.fail_json(msg=f"{summary['failed']} of {summary['total']} repositories failed",
+                                 changed=summary["changed"] > 0,
+                                 results=results,
+                                 summary=summary,
+                                 diff=diff,
+                                 **client.metrics_result(module.params))
+
+            module.exit_json(changed=summary["changed"] > 0,
+                             results=results,
+                             summary=summary,
+                             diff=diff,
+                             **client.metrics_result(module.params))
+
+        client = ArgoCDClient.from_module(module)
         if status == "present":
-            result = client.create_repository(
+            result, diff = client.create_repository(
                 type,
                 repository_url,
                 username,
                 password,
                 project,
-                name
+                name,
+                update_password=update_password
             )
 
-        module.exit_json(changed=True, result=result)
-    except requests.exceptions.HTTPError as errh:
+        module.exit_json(changed=diff is not None,
+                         result=result,
+                         diff=diff or {},
+                         **client.metrics_result(module.params))
+    except ArgoCDHTTPError as errh:
         module.fail_json(msg=str(errh.response.json()))
-    except requests.exceptions.ReadTimeout as errrt:
+    except ArgoCDTimeout as errrt:
         module.fail_json(msg=str(errrt))
-    except requests.exceptions.ConnectionError as conerr:
+    except ArgoCDConnectionError as conerr:
         module.fail_json(msg=str(conerr))
-    except requests.exceptions.RequestException as errex:
+    except ArgoCDError as errex:
         module.fail_json(msg=str(errex))
 
 
@@ -0,0 +1,228 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+
+import hashlib
+import itertools
+import os
+
+from ansible.module_utils.basic import AnsibleModule
+
+# Correct the import statement
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient, ARGOCD_SESSION_ARGS
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_http import ArgoCDConnectionError, ArgoCDError, ArgoCDHTTPError, ArgoCDTimeout
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_bulk import run_stream
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_export import (
+    EXPORT_KINDS,
+    Checkpoint,
+    document_digest,
+    iter_source,
+    object_key,
+    restorable,
+)
+
+# Projects must exist before the repositories and applications they scope
+RESTORE_ORDER = ("projects", "repositories", "applications")
+
+
+def checkpoint_path(src, api_url):
+    # One checkpoint per source and instance, next to the source
+    instance = hashlib.sha256((api_url or "httpapi").encode("utf-8")).hexdigest()[:8]
+    if os.path.isdir(src):
+        return os.path.join(src, f".restore-{instance}.jsonl")
+    return os.path.join(os.path.dirname(src), f".{os.path.basename(src)}.restore-{instance}.jsonl")
+
+
+def load_live(client, kind):
+    # The live objects of a kind with one list call
+    if kind == "projects":
+        live = {}
+        for project_json in client.list_projects():
+            name = project_json["metadata"]["name"]
+            live[name] = project_json
+            # Updates start from this snapshot instead of a GET
+            client.cache.put("projects", name, project_json)
+        return live
+    if kind == "repositories":
+        return dict((repository["repo"], repository) for repository in client.list_repositories())
+    projection = ["items.metadata.name", "items.metadata.resourceVersion", "items.spec"]
+    return dict((application["metadata"]["name"], application)
+                for application in client.iter_applications(fields=projection))
+
+
+def apply_object(client, kind, document, live, upsert):
+    if kind == "projects":
+        return client.apply_project(document, live=live)
+    if kind == "repositories":
+        # Exports hold no password. Writing a registered repository without
+        # it would wipe its stored credentials, it is left alone.
+        if live is not None and not document.get("password"):
+            return live, None
+        return client.create_repository(document.get("type") or "git",
+                                        document["repo"],
+                                        document.get("username"),
+                                        document.get("password"),
+                                        document.get("project"),
+                                        document.get("name"),
+                                        update_password="on_create",
+                                        live=live)
+    return client.apply_application(document, upsert=upsert, live=live)
+
+
+def restore_kind(client, src, kind, checkpoint, failed_projects, upsert, max_workers):
+    # Step 1: Stream the objects of this kind that are not in the checkpoint
+    counts = {"total": 0, "resumed": 0}
+
+    def pending():
+        for document_kind, document in iter_source(src):
+            if document_kind != kind:
+                continue
+            document = restorable(kind, document)
+            key = object_key(kind, document)
+            digest = document_digest(document)
+            counts["total"] += 1
+            if checkpoint.done(kind, key, digest):
+                counts["resumed"] += 1
+                continue
+            yield key, digest, document
+
+    objects = pending()
+    first = next(objects, None)
+    if first is None:
+        return counts, []
+
+    # Step 2: Read the live state once, only when something is left to apply
+    live = load_live(client, kind)
+
+    def apply(item):
+        key, digest, document = item
+        outcome = {"name": f"{kind}:{key}", "kind": kind, "object": key}
+        project = document.get("spec", {}).get("project") if kind == "applications" else document.get("project")
+        if kind != "projects" and project in failed_projects:
+            return dict(outcome, changed=False, failed=True, msg=f"Skipped, project:{project} failed")
+        try:
+            result, diff = apply_object(client, kind, document, live.get(key), upsert)
+            if isinstance(result, dict) and "error" in result:
+                return dict(outcome, changed=False, failed=True, msg=result["error"])
+        except ArgoCDHTTPError as errh:
+            return dict(outcome, changed=False, failed=True, msg=errh.response.text)
+        except ArgoCDError as errex:
+            return dict(outcome, changed=False, failed=True, msg=str(errex))
+        except Exception as exc:
+            # Such as a malformed document, only this object fails and it
+            # is retried by the next run
+            return dict(outcome, changed=False, failed=True, msg=f"{type(exc).__name__}: {exc}")
+
+        checkpoint.record(kind, key, digest)
+        if diff is not None:
+            diff = dict(diff, before_header=f"{kind} {key}", after_header=f"{kind} {key}")
+        return dict(outcome, changed=diff is not None, failed=False, diff=diff or {})
+
+    # Step 3: Apply concurrently, the source is read as workers free up
+    results = []
+    for result in run_stream(apply, itertools.chain([first], objects), max_workers=max_workers):
+        if result["failed"] and kind == "projects":
+            failed_projects.add(result["object"])
+        # Only what changed or failed is reported, a restore may hold
+        # thousands of objects
+        if result["changed"] or result["failed"]:
+            results.append(result)
+    return counts, results
+
+
+def main():
+
+    fields = {
+        "api_url": {"required": False, "type": 'str'},
+        "token": {"required": False, "type": 'str', "no_log": True},
+        "src": {"required": True, "type": 'path'},
+        "kinds": {"required": False, "type": 'list', "elements": 'str', "choices": list(EXPORT_KINDS),
+                  "default": list(EXPORT_KINDS)},
+        "upsert": {"required": False, "type": 'bool', "default": True},
+        "checkpoint": {"required": False, "type": 'path'},
+        "resume": {"required": False, "type": 'bool', "default": True},
+        "max_workers": {"required": False, "type": 'int', "default": 10},
+    }
+    fields.update(ARGOCD_SESSION_ARGS)
+
+    module = AnsibleModule(
+        argument_spec=fields,
+        supports_check_mode=True
+    )
+
+    src = module.params["src"]
+    kinds = module.params["kinds"]
+    max_workers = module.params["max_workers"]
+
+    if not os.path.exists(src):
+        module.fail_json(msg=f"{src} does not exist")
+
+    # The pool must be able to hold a connection per worker
+    client = ArgoCDClient.from_module(module, pool_size=max(module.params["pool_size"], max_workers))
+
+    checkpoint = Checkpoint(module.params["checkpoint"] or checkpoint_path(src, client.argo_api_url),
+                            check_mode=module.check_mode)
+    if module.params["resume"]:
+        checkpoint.load()
+    else:
+        checkpoint.remove()
+
+    try:
+        restored = {}
+        results = []
+        failed_projects = set()
+        for kind in RESTORE_ORDER:
+            if kind not in kinds:
+                continue
+            counts, kind_results = restore_kind(client, src, kind, checkpoint, failed_projects,
+                                                module.params["upsert"], max_workers)
+            restored[kind] = dict(counts,
+                                  changed=len([result for result in kind_results if result["changed"]]),
+                                  failed=len([result for result in kind_results if result["failed"]]))
+            results.extend(kind_results)
+    except ValueError as errv:
+        checkpoint.close()
+        module.fail_json(msg=str(errv))
+    except ArgoCDHTTPError as errh:
+        checkpoint.close()
+        module.fail_json(msg=str(errh.response.json()))
+    except ArgoCDTimeout as errrt:
+        checkpoint.close()
+        module.fail_json(msg=str(errrt))
+    except ArgoCDConnectionError as conerr:
+        checkpoint.close()
+        module.fail_json(msg=str(conerr))
+    except ArgoCDError as errex:
+        checkpoint.close()
+        module.fail_json(msg=str(errex))
+
+    failures = [{"name": result["name"], "msg": result["msg"]} for result in results if result["failed"]]
+    changed = any(result["changed"] for result in results)
+    diff = [result["diff"] for result in results if result.get("diff")]
+
+    if failures:
+        # The checkpoint is kept, the next run retries the failed objects only
+        checkpoint.close()
+        module.fail_json(msg=f"{len(failures)} objects failed to restore",
+                         changed=changed,
+                         restored=restored,
+                         results=results,
+                         failures=failures,
+                         checkpoint=checkpoint.path,
+                         diff=diff,
+                         **client.metrics_result(module.params))
+
+    # A complete restore leaves nothing to resume
+    checkpoint.remove()
+    module.exit_json(changed=changed,
+                     restored=restored,
+                     results=results,
+                     diff=diff,
+                     **client.metrics_result(module.params))
+
+
+if __name__ == "__main__":
+    main()
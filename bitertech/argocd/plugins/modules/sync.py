@@ -0,0 +1,95 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+
+from ansible.module_utils.basic import AnsibleModule
+
+# Correct the import statement
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient, ARGOCD_SESSION_ARGS
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_http import ArgoCDConnectionError, ArgoCDError, ArgoCDHTTPError, ArgoCDTimeout
+
+
+def main():
+
+    fields = {
+        "api_url": {"required": False, "type": 'str'},
+        "token": {"required": False, "type": 'str', "no_log": True},
+        "names": {"required": True, "type": 'list', "elements": 'str'},
+        "projects": {"required": False, "type": 'list', "elements": 'str'},
+        "sync": {"required": False, "type": 'bool', "default": True},
+        "revision": {"required": False, "type": 'str'},
+        "prune": {"required": False, "type": 'bool', "default": False},
+        "wait": {"required": False, "type": 'bool', "default": True},
+        "timeout": {"required": False, "type": 'int', "default": 300},
+        "sync_status": {"required": False, "type": 'str', "default": "Synced"},
+        "health_status": {"required": False, "type": 'str', "default": "Healthy"},
+    }
+    fields.update(ARGOCD_SESSION_ARGS)
+
+    module = AnsibleModule(
+        argument_spec=fields,
+        supports_check_mode=True
+    )
+
+    names = module.params["names"]
+    projects = module.params["projects"]
+    sync = module.params["sync"]
+    revision = module.params["revision"]
+    prune = module.params["prune"]
+    wait = module.params["wait"]
+    timeout = module.params["timeout"]
+    sync_status = module.params["sync_status"]
+    health_status = module.params["health_status"]
+
+    # 0 checks the applications once, there is no waiting forever
+    if timeout < 0:
+        module.fail_json(msg=f"timeout must be 0 or more seconds, got {timeout}")
+
+    try:
+        client = ArgoCDClient.from_module(module)
+
+        # Remember the last operation of every application, so the wait only
+        # ends once the sync requested here has completed
+        previous_operations = {}
+        if sync:
+            for name in names:
+                application = client.sync_application(name, revision=revision, prune=prune)
+                operation_state = application.get("status", {}).get("operationState") or {}
+                previous_operations[name] = operation_state.get("startedAt")
+
+        if not wait or module.check_mode:
+            module.exit_json(changed=sync, applications={}, **client.metrics_result(module.params))
+
+        states, pending, failed = client.wait_for_applications(names,
+                                                               sync_status=sync_status,
+                                                               health_status=health_status,
+                                                               timeout=timeout,
+                                                               projects=projects,
+                                                               previous_operations=previous_operations)
+        if failed:
+            module.fail_json(msg=f"Sync failed for {', '.join(failed)}",
+                             changed=sync,
+                             applications=states,
+                             **client.metrics_result(module.params))
+        if pending:
+            module.fail_json(msg=f"Timed out waiting for {', '.join(pending)}",
+                             changed=sync,
+                             applications=states,
+                             **client.metrics_result(module.params))
+
+        module.exit_json(changed=sync, applications=states, **client.metrics_result(module.params))
+    except ArgoCDHTTPError as errh:
+        module.fail_json(msg=str(errh.response.json()))
+    except ArgoCDTimeout as errrt:
+        module.fail_json(msg=str(errrt))
+    except ArgoCDConnectionError as conerr:
+        module.fail_json(msg=str(conerr))
+    except ArgoCDError as errex:
+        module.fail_json(msg=str(errex))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+
+from ansible.module_utils.basic import AnsibleModule
+
+# Correct the import statement
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import APPLICATION_SYNC_ARGS, ArgoCDClient, ARGOCD_SESSION_ARGS, repository_key
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_http import ArgoCDError, ArgoCDHTTPError
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_bulk import DependencyPlan, summarize
+
+
+def reconcile(kind, name, project, apply):
+    # Run one step of the plan and describe its outcome
+    outcome = {"name": f"{kind}:{name}", "kind": kind, "object": name, "project": project}
+    try:
+        result, diff = apply()
+        if isinstance(result, dict) and "error" in result:
+            return dict(outcome, changed=False, failed=True, msg=result["error"])
+        if diff is not None:
+            diff = dict(diff, before_header=f"{kind} {name}", after_header=f"{kind} {name}")
+        return dict(outcome, changed=diff is not None, failed=False, diff=diff or {})
+    except ArgoCDHTTPError as errh:
+        return dict(outcome, changed=False, failed=True, msg=errh.response.text)
+    except ArgoCDError as errex:
+        return dict(outcome, changed=False, failed=True, msg=str(errex))
+    except Exception as exc:
+        # Such as a malformed document, only this object and its dependents
+        # fail
+        return dict(outcome, changed=False, failed=True, msg=f"{type(exc).__name__}: {exc}")
+
+
+def plan_project(plan, client, project, live_projects, live_repositories, live_applications, roles_status):
+    name = project["name"]
+    roles = project["roles"] or []
+    live_project = live_projects.get(name)
+
+    # Step 1: The project, a new one is created with its roles in one call.
+    # An existing one gets its description and roles in one update.
+    if live_project is None:
+        def apply_project():
+            return client.create_project(name, project["description"] or "", roles=roles, live=live_project)
+    else:
+        def apply_project():
+            return client.apply_project_roles(name, roles, roles_status, description=project["description"])
+    plan.add(f"project:{name}", lambda: reconcile("project", name, name, apply_project))
+
+    # Step 2: The repositories of the project, once it exists
+    for repository in project["repositories"] or []:
+        url = repository["repository_url"]
+
+        def apply_repository(repository=repository, url=url):
+            return client.create_repository(repository["type"],
+                                            url,
+                                            repository["username"],
+                                            repository["password"],
+                                            name,
+                                            repository["name"],
+                                            update_password=repository["update_password"],
+                                            live=live_repositories.get(repository_key(url, name)))
+        plan.add(f"repository:{name}:{url}",
+                 lambda apply=apply_repository, url=url: reconcile("repository", url, name, apply),
+                 depends_on=[f"project:{name}"])
+
+    # Step 3: The applications, once the project and their repository exist
+    for application in project["applications"] or []:
+        app_name = application["name"]
+
+        def apply_application(application=application, app_name=app_name):
+            return client.create_application(app_name,
+                                             application["repository_url"],
+                                             application["path"],
+                                             application["target_revision"],
+                                             values_files=application["values_files"],
+                                             destination_server=application["destination_server"],
+                                             namespace=application["namespace"],
+                                             project=name,
+                                             upsert=application["upsert"],
+                                             **{key: application[key] for key in APPLICATION_SYNC_ARGS},
+                                             live=live_applications.get(app_name))
+        plan.add(f"application:{app_name}",
+                 lambda apply=apply_application, app_name=app_name: reconcile("application", app_name, name, apply),
+                 depends_on=[f"project:{name}", f"repository:{name}:{application['repository_url']}"])
+
+
+def main():
+
+    role_fields = {
+        "name": {"required": True, "type": 'str'},
+        "description": {"required": False, "type": 'str'},
+        "policies": {"required": False, "type": 'list', "elements": 'str'},
+        "groups": {"required": False, "type": 'list', "elements": 'str'},
+    }
+
+    repository_fields = {
+        "type": {"required": True, "type": 'str'},
+        "repository_url": {"required": True, "type": 'str'},
+        "username": {"required": True, "type": 'str'},
+        "password": {"required": True, "type": 'str', "no_log": True},
+        "name": {"required": False, "type": "str"},
+        "update_password": {"type": "str", "choices": ["always", "on_create"], "default": "on_create"},
+    }
+
+    application_fields = {
+        "name": {"required": True, "type": 'str'},
+        "repository_url": {"required": True, "type": 'str'},
+        "path": {"required": True, "type": 'str'},
+        "target_revision": {"required": True, "type": 'str'},
+        "namespace": {"required": True, "type": 'str'},
+        "values_files": {"required": False, "type": 'list', "elements": 'str'},
+        "destination_server": {"required": False, "type": 'str', "default": "https://kubernetes.default.svc"},
+        "upsert": {"required": False, "type": "bool", "default": True},
+    }
+    application_fields.update(APPLICATION_SYNC_ARGS)
+
+    project_fields = {
+        "name": {"required": True, "type": 'str'},
+        "description": {"required": False, "type": 'str'},
+        "roles": {"required": False, "type": 'list', "elements": 'dict', "options": role_fields},
+        "repositories": {"required": False, "type": 'list', "elements": 'dict', "options": repository_fields},
+        "applications": {"required": False, "type": 'list', "elements": 'dict', "options": application_fields},
+    }
+
+    fields = {
+        "api_url": {"required": False, "type": 'str'},
+        "token": {"required": False, "type": 'str', "no_log": True},
+        "projects": {"required": True, "type": 'list', "elements": 'dict', "options": project_fields},
+        "roles_status": {"type": "str", "choices": ["present", "exclusive"], "default": "present"},
+        "max_workers": {"required": False, "type": 'int', "default": 10},
+    }
+    fields.update(ARGOCD_SESSION_ARGS)
+
+    module = AnsibleModule(
+        argument_spec=fields,
+        supports_check_mode=True
+    )
+
+    projects = module.params["projects"]
+    roles_status = module.params["roles_status"]
+    max_workers = module.params["max_workers"]
+
+    # The pool must be able to hold a connection per worker
+    client = ArgoCDClient.from_module(module, pool_size=max(module.params["pool_size"], max_workers))
+
+    try:
+        # Step 1: Read the live state with one list call per kind of object
+        names = set(project["name"] for project in projects)
+        live_projects = {}
+        for project_json in client.list_projects():
+            name = project_json["metadata"]["name"]
+            if name in names:
+                live_projects[name] = project_json
+                # Role updates start from this snapshot instead of a GET
+                client.cache.put("projects", name, project_json)
+
+        live_repositories = {}
+        if any(project["repositories"] for project in projects):
+            live_repositories = dict((repository_key(repository["repo"], repository.get("project")), repository)
+                                     for repository in client.list_repositories())
+
+        live_applications = {}
+        if any(project["applications"] for project in projects):
+            projection = ["items.metadata.name", "items.metadata.resourceVersion", "items.spec"]
+            live_applications = dict((application["metadata"]["name"], application)
+                                     for application in client.iter_applications(fields=projection))
+    except ArgoCDHTTPError as errh:
+        module.fail_json(msg=errh.response.text)
+    except ArgoCDError as errex:
+        module.fail_json(msg=str(errex))
+
+    # Step 2: Plan the changes, independent objects are applied concurrently
+    plan = DependencyPlan()
+    try:
+        for project in projects:
+            plan_project(plan, client, project, live_projects, live_repositories, live_applications, roles_status)
+    except ValueError as exc:
+        # The same object declared twice, such as an application in two
+        # projects, would be applied twice with different settings
+        module.fail_json(msg=f"Invalid tenants: {exc}")
+
+    results = plan.run(max_workers=max_workers)
+    summary = summarize(results)
+    diff = [result["diff"] for result in results if result.get("diff")]
+
+    if summary["failed"]:
+        module.fail_json(msg=f"{summary['failed']} of {summary['total']} objects failed",
+                         changed=summary["changed"] > 0,
+                         results=results,
+                         summary=summary,
+                         diff=diff,
+                         **client.metrics_result(module.params))
+
+    module.exit_json(changed=summary["changed"] > 0,
+                     results=results,
+                     summary=summary,
+                     diff=diff,
+                     **client.metrics_result(module.params))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import copy
+import os
+
+from ansible import constants as C
+from ansible import context
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible.plugins.action import ActionBase
+from ansible.utils.vars import merge_hash
+
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import find_role
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_policy import member_index
+from ansible_collections.bitertech.argocd.plugins.plugin_utils.argocd_coalesce import Coordinator, request_key
+
+
+class ArgoCDAction(ActionBase):
+    # Runs a module of the collection from the controller side of the task.
+    # With hosts: all, the hosts of a task often send the very same request:
+    # it is sent once and every host gets a copy of its result. For modules
+    # editing the members of a role (MERGE_FIELD), the members requested by
+    # the hosts running the task at the same time are merged into a single
+    # read-modify-write, each host gets its own result.
+    #
+    # Task variables:
+    #   argocd_coalesce: false runs the module for every host as usual
+    #   argocd_batch_window: seconds the first host waits for the others
+
+    _supports_check_mode = True
+    _supports_async = True
+
+    # Option holding the role members, policies or groups, None when the
+    # requests of the module are only coalesced when identical
+    MERGE_FIELD = None
+
+    def __init__(self, *args, **kwargs):
+        super(ArgoCDAction, self).__init__(*args, **kwargs)
+        # The action is created once per task and host, then run once per
+        # attempt of an until/retries loop
+        self._attempt = 0
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ArgoCDAction, self).run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+        task_vars = task_vars or {}
+        self._attempt += 1
+
+        module_args = dict(self._task.args)
+        if self._task.async_val or not boolean(task_vars.get("argocd_coalesce", True), strict=False):
+            return merge_hash(result, self._run_module(module_args, task_vars))
+
+        # Requests are only shared within a task and attempt, by hosts
+        # talking to the ArgoCD API through the same connection, so a retry
+        # never gets the result of an earlier attempt
+        scope = [self._task._uuid,
+                 self._attempt,
+                 self._task.action,
+                 self._connection.transport,
+                 self._play_context.remote_addr,
+                 self._play_context.check_mode,
+                 self._play_context.diff]
+        coordinator = Coordinator(os.path.join(C.DEFAULT_LOCAL_TMP, "argocd_coalesce"))
+        host = task_vars.get("inventory_hostname", self._play_context.remote_addr)
+
+        members = module_args.get(self.MERGE_FIELD) if self.MERGE_FIELD else None
+        if isinstance(members, list):
+            shared_args = dict((key, value) for key, value in module_args.items() if key != self.MERGE_FIELD)
+            # Every host of the batch could join, as long as a fork runs it
+            expected = len(task_vars.get("ansible_play_batch") or [host])
+            forks = context.CLIARGS.get("forks")
+            if forks:
+                expected = min(expected, forks)
+
+            module_result = None
+            if expected > 1:
+                module_result = coordinator.batch(request_key(scope, shared_args),
+                                                  host,
+                                                  members,
+                                                  lambda parts: self._run_batch(shared_args, parts, task_vars),
+                                                  window=float(task_vars.get("argocd_batch_window", 1.0)),
+                                                  expected=expected)
+            if module_result is None:
+                module_result = self._run_module(module_args, task_vars)
+        else:
+            module_result, shared = coordinator.run_once(request_key(scope, module_args),
+                                                         lambda: self._run_module(module_args, task_vars))
+            if shared:
+                module_result = dict(module_result, coalesced=True)
+
+        return merge_hash(result, module_result)
+
+    def _run_module(self, module_args, task_vars):
+        wrap_async = self._task.async_val and not self._connection.has_native_async
+        module_result = self._execute_module(module_args=module_args, task_vars=task_vars, wrap_async=wrap_async)
+        if not wrap_async:
+            # remove a temporary path we created
+            self._remove_tmp_path(self._connection._shell.tmpdir)
+        return module_result
+
+    def _run_batch(self, shared_args, parts, task_vars):
+        # Step 1: One module run with the members of every host, in order
+        merged = member_index(self.MERGE_FIELD)
+        for members in parts.values():
+            for member in members:
+                merged.add(member)
+        module_args = dict(shared_args)
+        module_args[self.MERGE_FIELD] = merged.values()
+        module_result = self._run_module(module_args, task_vars)
+
+        if module_result.get("failed") or len(parts) == 1:
+            return dict((host, dict(module_result, batch_size=len(parts))) for host in parts)
+
+        # Step 2: A host changed the role when one of its members was added
+        # or removed by the write
+        changed = self._changed_members(module_result)
+        results = {}
+        for host, members in parts.items():
+            host_changed = any(member in changed for member in members)
+            host_result = dict(copy.deepcopy(module_result), changed=host_changed, batch_size=len(parts))
+            if not host_changed:
+                host_result["diff"] = {}
+            results[host] = host_result
+        return results
+
+    def _changed_members(self, module_result):
+        # Index of the members present before or after the write, but not both
+        diff = module_result.get("diff") or {}
+        if not module_result.get("changed") or not diff:
+            return member_index(self.MERGE_FIELD)
+
+        role_name = self._task.args.get("role_name")
+        before = member_index(self.MERGE_FIELD, (find_role(diff.get("before") or {}, role_name) or {}).get(self.MERGE_FIELD))
+        after = member_index(self.MERGE_FIELD, (find_role(diff.get("after") or {}, role_name) or {}).get(self.MERGE_FIELD))
+        changed = member_index(self.MERGE_FIELD)
+        for member in before.values():
+            if member not in after:
+                changed.add(member)
+        for member in after.values():
+            if member not in before:
+                changed.add(member)
+        return changed
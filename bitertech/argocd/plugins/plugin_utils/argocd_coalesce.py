@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import time
+import uuid
+
+# Coordination of the action plugins of several hosts. Every host of a task
+# runs in its own worker process, they meet through files and locks in a
+# directory of the controller.
+
+
+def request_key(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:32]
+
+
+@contextlib.contextmanager
+def _locked(path):
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, document):
+    # Replaced atomically, readers never see a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as json_file:
+        json.dump(document, json_file, default=str)
+    os.replace(tmp_path, path)
+
+
+def _shareable(result):
+    # Failed results are never handed to another caller, it runs on its own
+    return isinstance(result, dict) and not result.get("failed")
+
+
+def _remove(*paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class Coordinator:
+    # A result is only shared with the callers that asked for it while it was
+    # being computed, never with later ones, and its files are removed once
+    # they have read it.
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, mode=0o700, exist_ok=True)
+
+    def run_once(self, key, func):
+        # The first caller runs func, the callers with the same key arriving
+        # while it runs wait for it and share its result. Returns the result
+        # and whether it was shared. When func raises or fails, the waiting
+        # callers run it on their own.
+        path = os.path.join(self.root, key)
+        lock_path = path + ".lock"
+        flight_path = path + ".flight.json"
+
+        # Step 1: Join the running call, or start one
+        with _locked(lock_path):
+            flight_id = _read_json(flight_path)
+            leader = flight_id is None
+            if leader:
+                flight_id = uuid.uuid4().hex
+                _write_json(flight_path, flight_id)
+                _write_json(os.path.join(self.root, f"{flight_id}.json"), {"waiting": 0})
+                # Held until the result is written, the other callers wait on it
+                running = open(os.path.join(self.root, f"{flight_id}.running"), "a")
+                fcntl.flock(running, fcntl.LOCK_EX)
+            else:
+                state_path = os.path.join(self.root, f"{flight_id}.json")
+                state = _read_json(state_path)
+                state["waiting"] += 1
+                _write_json(state_path, state)
+        state_path = os.path.join(self.root, f"{flight_id}.json")
+        running_path = os.path.join(self.root, f"{flight_id}.running")
+
+        # Step 2: The other callers read the result once it is written, the
+        # last one removes it
+        if not leader:
+            with _locked(running_path):
+                pass
+            with _locked(lock_path):
+                state = _read_json(state_path)
+                result = state.get("result")
+                state["waiting"] -= 1
+                if state["waiting"] > 0:
+                    _write_json(state_path, state)
+                else:
+                    _remove(state_path, running_path)
+            if result is None:
+                return func(), False
+            return result, True
+
+        # Step 3: Run func, later callers start a new call
+        result = None
+        try:
+            result = func()
+            return result, False
+        finally:
+            with _locked(lock_path):
+                _remove(flight_path)
+                state = _read_json(state_path)
+                if state["waiting"] > 0:
+                    state["result"] = result if _shareable(result) else None
+                    _write_json(state_path, state)
+                else:
+                    _remove(state_path, running_path)
+            fcntl.flock(running, fcntl.LOCK_UN)
+            running.close()
+
+    def batch(self, key, member, part, func, window=1.0, expected=None):
+        # The callers with the same key arriving within window seconds of the
+        # first one are run together. The first caller waits for the others,
+        # at most window seconds or until expected members joined, then calls
+        # func with the part of every member, {member: part}, which returns
+        # {member: result}. Returns the result of this member, None when the
+        # batch failed and the caller has to run on its own.
+        directory = os.path.join(self.root, key)
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        lock_path = os.path.join(directory, "lock")
+        open_path = os.path.join(directory, "open.json")
+
+        # Step 1: Join the open batch, or open one
+        with _locked(lock_path):
+            batch_id = _read_json(open_path)
+            leader = batch_id is None
+            if leader:
+                batch_id = uuid.uuid4().hex
+                _write_json(open_path, batch_id)
+                # Held until the results are written, the other members wait on it
+                running = open(os.path.join(directory, f"{batch_id}.running"), "a")
+                fcntl.flock(running, fcntl.LOCK_EX)
+            parts_path = os.path.join(directory, f"{batch_id}.parts.json")
+            parts = _read_json(parts_path) or {}
+            parts[member] = part
+            _write_json(parts_path, parts)
+        results_path = os.path.join(directory, f"{batch_id}.results.json")
+        running_path = os.path.join(directory, f"{batch_id}.running")
+
+        # Step 2: The other members wait for the results of the first one,
+        # the last one to read them removes the files of the batch
+        if not leader:
+            with _locked(running_path):
+                pass
+            with _locked(lock_path):
+                results = _read_json(results_path) or {}
+                result = results.pop(member, None)
+                if results:
+                    _write_json(results_path, results)
+                else:
+                    _remove(results_path, parts_path, running_path)
+            return result if _shareable(result) else None
+
+        # Step 3: Wait for the other members, then close the batch
+        results = {}
+        try:
+            deadline = time.monotonic() + window
+            while time.monotonic() < deadline:
+                with _locked(lock_path):
+                    joined = len(_read_json(parts_path) or {})
+                if expected and joined >= expected:
+                    break
+                time.sleep(0.02)
+            with _locked(lock_path):
+                _remove(open_path)
+                parts = _read_json(parts_path)
+
+            results = func(parts)
+            return results.get(member)
+        finally:
+            with _locked(lock_path):
+                # Every other member reads its own entry, None when missing
+                followers = dict((name, results.get(name)) for name in parts if name != member)
+                if followers:
+                    _write_json(results_path, followers)
+                else:
+                    _remove(results_path, parts_path, running_path)
+            fcntl.flock(running, fcntl.LOCK_UN)
+            running.close()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import json
+
+import pytest
+
+from ansible_collections.bitertech.argocd.plugins.module_utils import argocd_api
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_http import ArgoCDResponse
+
+
+class FakeTransport:
+    # Serves the applications by name, the watch stream is never expected
+    supports_streaming = True
+    supports_compression = False
+
+    def __init__(self, applications):
+        self.applications = applications
+        self.calls = []
+
+    def request(self, method, url, query=None, data=None, headers=None):
+        name = url.rsplit("/", 1)[-1]
+        self.calls.append(name)
+        return ArgoCDResponse(200, {}, json.dumps(self.applications[name]).encode("utf-8"), url)
+
+    def stream_lines(self, url, query=None, read_timeout=None):
+        raise AssertionError("the watch stream was opened")
+
+    def close(self):
+        pass
+
+
+def application(name, sync_status, health_status):
+    return {"metadata": {"name": name}, "status": {"sync": {"status": sync_status}, "health": {"status": health_status}}}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def sleep(seconds):
+        raise AssertionError(f"slept {seconds} seconds")
+
+    monkeypatch.setattr(argocd_api.time, "sleep", sleep)
+    client = ArgoCDClient("http://argocd.invalid/api/v1", "token", http_backend="urllib", breaker=False)
+    client.transport = FakeTransport({"app-1": application("app-1", "Synced", "Healthy"),
+                                      "app-2": application("app-2", "OutOfSync", "Healthy")})
+    return client
+
+
+def test_zero_timeout_checks_once(client):
+    states, pending, failed = client.wait_for_applications(["app-1", "app-2"], timeout=0)
+    assert client.transport.calls == ["app-1", "app-2"]
+    assert pending == ["app-2"]
+    assert failed == []
+    assert states["app-1"]["sync_status"] == "Synced"
+    assert states["app-2"]["sync_status"] == "OutOfSync"
+
+
+def test_zero_timeout_reports_ready_applications(client):
+    assert client.wait_for_applications(["app-1"], timeout=0)[1:] == ([], [])
+    assert client.transport.calls == ["app-1"]
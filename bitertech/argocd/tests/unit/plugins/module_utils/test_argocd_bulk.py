@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import threading
+
+import pytest
+
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_bulk import DependencyPlan
+
+REPOSITORY = "repository:tenant:https://example.com/repo.git"
+
+
+class Recorder:
+    # Tasks recording the order in which they ran
+    def __init__(self):
+        self.ran = []
+        self._lock = threading.Lock()
+
+    def task(self, key, failed=False):
+        def func():
+            with self._lock:
+                self.ran.append(key)
+            return {"name": key, "changed": not failed, "failed": failed}
+        return func
+
+
+def test_failed_repository_skips_its_applications():
+    recorder = Recorder()
+    plan = DependencyPlan()
+    plan.add("project:tenant", recorder.task("project:tenant"))
+    plan.add(REPOSITORY, recorder.task(REPOSITORY, failed=True), depends_on=["project:tenant"])
+    plan.add("application:app", recorder.task("application:app"), depends_on=["project:tenant", REPOSITORY])
+    plan.add("application:app-child", recorder.task("application:app-child"), depends_on=["application:app"])
+    plan.add("application:other", recorder.task("application:other"), depends_on=["project:tenant"])
+
+    results = plan.run(max_workers=4)
+    assert "application:app" not in recorder.ran
+    assert "application:app-child" not in recorder.ran
+    assert sorted(recorder.ran) == ["application:other", "project:tenant", REPOSITORY]
+    assert results[2] == {"name": "application:app", "changed": False, "failed": True,
+                          "msg": f"Skipped, {REPOSITORY} failed"}
+    # Skipped dependents are skipped in turn
+    assert results[3]["msg"] == "Skipped, application:app failed"
+    assert not results[4]["failed"]
+
+
+def test_duplicate_keys_are_rejected():
+    plan = DependencyPlan()
+    plan.add("project:tenant", lambda: {"failed": False})
+    with pytest.raises(ValueError, match="project:tenant is planned twice"):
+        plan.add("project:tenant", lambda: {"failed": False})
+    assert "project:tenant" in plan
+
+
+def test_dependencies_run_first():
+    recorder = Recorder()
+    plan = DependencyPlan()
+    # Added before what they depend on, the results keep this order
+    plan.add("application:app", recorder.task("application:app"), depends_on=[REPOSITORY])
+    plan.add(REPOSITORY, recorder.task(REPOSITORY), depends_on=["project:tenant"])
+    plan.add("project:tenant", recorder.task("project:tenant"))
+
+    results = plan.run(max_workers=3)
+    assert recorder.ran == ["project:tenant", REPOSITORY, "application:app"]
+    assert [result["name"] for result in results] == ["application:app", REPOSITORY, "project:tenant"]
+
+
+def test_independent_tasks_run_concurrently():
+    # Both tasks wait for each other, the barrier breaks unless they run
+    # together and the tasks fail
+    barrier = threading.Barrier(2, timeout=5)
+
+    def task():
+        barrier.wait()
+        return {"failed": False}
+
+    plan = DependencyPlan()
+    plan.add("application:a", task)
+    plan.add("application:b", task)
+    assert plan.run(max_workers=2) == [{"failed": False}, {"failed": False}]
+
+
+def test_missing_dependencies_are_ignored():
+    plan = DependencyPlan()
+    plan.add("application:app", lambda: {"name": "application:app", "failed": False}, depends_on=["project:elsewhere"])
+    assert plan.run() == [{"name": "application:app", "failed": False}]
+
+
+def test_exceptions_fail_their_task():
+    def broken():
+        raise RuntimeError("boom")
+
+    recorder = Recorder()
+    plan = DependencyPlan()
+    plan.add("project:tenant", broken)
+    plan.add("application:app", recorder.task("application:app"), depends_on=["project:tenant"])
+    results = plan.run()
+    assert results[0] == {"name": "project:tenant", "changed": False, "failed": True, "msg": "boom"}
+    assert results[1]["msg"] == "Skipped, project:tenant failed"
+    assert recorder.ran == []
+
+
+def test_dependency_cycle():
+    recorder = Recorder()
+    plan = DependencyPlan()
+    plan.add("project:tenant", recorder.task("project:tenant"))
+    plan.add("application:a", recorder.task("application:a"), depends_on=["application:b"])
+    plan.add("application:b", recorder.task("application:b"), depends_on=["application:a"])
+    results = plan.run()
+    assert recorder.ran == ["project:tenant"]
+    assert [result.get("msg") for result in results] == [None, "Skipped, dependency cycle", "Skipped, dependency cycle"]
+
+
+def test_empty_plan():
+    assert DependencyPlan().run() == []
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import json
+
+import pytest
+
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_http import ArgoCDResponse
+
+
+class FakeTransport:
+    # Answers each request with the next (status, body) outcome
+    supports_streaming = False
+    supports_compression = False
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def request(self, method, url, query=None, data=None, headers=None):
+        self.calls.append(method)
+        status, body = self.outcomes.pop(0)
+        return ArgoCDResponse(status, {}, json.dumps(body).encode("utf-8"), url)
+
+    def close(self):
+        pass
+
+
+def project(version, description="description"):
+    return {"metadata": {"name": "project", "resourceVersion": version, "description": description}}
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    # An earlier task stored version 1 of the project on disk
+    client = make_client(str(tmp_path), [(200, project("1"))])
+    client.get_project("project")
+    return str(tmp_path)
+
+
+def make_client(cache_dir, outcomes):
+    client = ArgoCDClient("http://argocd.invalid/api/v1", "token", http_backend="urllib",
+                          cache_dir=cache_dir, cache_ttl=300, breaker=False)
+    client.transport = FakeTransport(outcomes)
+    return client
+
+
+def test_reads_ignore_disk_snapshots(cache_dir):
+    client = make_client(cache_dir, [(200, project("2", "changed"))])
+    assert client.get_project("project") == project("2", "changed")
+    assert client.transport.calls == ["GET"]
+
+
+def test_existence_check_ignores_disk_snapshots(cache_dir):
+    # The project was deleted by another tool meanwhile
+    client = make_client(cache_dir, [(404, {}), (200, project("3"))])
+    result, diff = client.create_project("project", "description")
+    assert client.transport.calls == ["GET", "POST"]
+    assert diff is not None
+
+
+def test_update_starts_from_disk_snapshot(cache_dir):
+    client = make_client(cache_dir, [(200, project("2", "new"))])
+    result, diff = client.update_project("project", "new")
+    assert client.transport.calls == ["PUT"]
+    assert diff["before"] == project("1")
+
+
+def test_stale_snapshot_conflicts(cache_dir, monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    client = make_client(cache_dir, [(409, {"error": "conflict"}), (200, project("2")), (200, project("3", "new"))])
+    result, diff = client.update_project("project", "new")
+    assert client.transport.calls == ["PUT", "GET", "PUT"]
+    assert diff["before"] == project("2")
+
+
+def test_no_op_is_decided_on_live_project(cache_dir):
+    # The disk snapshot already holds the description, the live project
+    # does not
+    client = make_client(cache_dir, [(200, project("2", "old")), (200, project("3"))])
+    result, diff = client.update_project("project", "description")
+    assert client.transport.calls == ["GET", "PUT"]
+    assert diff["before"] == project("2", "old")
+
+    # Nothing to change on the live project either
+    client = make_client(cache_dir, [(200, project("3"))])
+    assert client.update_project("project", "description") == (project("3"), None)
+    assert client.transport.calls == ["GET"]
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import copy
+
+import pytest
+
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_diff import (
+    apply_merge_patch,
+    diff_objects,
+    is_subset,
+    make_diff,
+    merge_patch,
+)
+
+LIVE = {
+    "metadata": {"name": "app", "resourceVersion": "7"},
+    "spec": {
+        "project": "default",
+        "source": {"repoURL": "https://example.com/repo.git", "targetRevision": "v1",
+                   "helm": {"valueFiles": ["values.yaml", "values-prod.yaml"]}},
+        "syncPolicy": {"automated": {"selfHeal": True, "prune": True}, "syncOptions": ["CreateNamespace=true"]},
+    },
+}
+
+
+@pytest.mark.parametrize("empty", [None, False, "", [], {}])
+def test_empty_values_equal_missing(empty):
+    # ArgoCD omits empty fields from the documents it returns
+    assert diff_objects({"spec": {"value": empty}}, {"spec": {}}) == []
+    assert diff_objects({"spec": {}}, {"spec": {"value": empty}}) == []
+    assert is_subset({"spec": {"value": empty}}, {"spec": {}})
+    assert merge_patch({"spec": {"value": empty}}, {"spec": {}}) == {}
+
+
+def test_diff_paths():
+    desired = copy.deepcopy(LIVE)
+    desired["spec"]["source"]["targetRevision"] = "v2"
+    desired["spec"]["source"]["helm"]["valueFiles"] = ["values.yaml"]
+    del desired["spec"]["syncPolicy"]["automated"]["prune"]
+    assert sorted(diff_objects(desired, LIVE)) == ["spec.source.helm.valueFiles",
+                                                   "spec.source.targetRevision",
+                                                   "spec.syncPolicy.automated.prune"]
+    assert diff_objects(["a", "b"], ["a", "c"]) == ["[1]"]
+
+
+def test_subset_ignores_unmanaged_keys():
+    desired = {"spec": {"project": "default", "source": {"targetRevision": "v1", "path": None}}}
+    assert is_subset(desired, LIVE)
+    assert not is_subset({"spec": {"project": "other"}}, LIVE)
+    # Without subset the keys only present in the live document differ
+    assert diff_objects(desired, LIVE) != []
+
+
+def test_merge_patch_no_op():
+    desired = {"spec": {"project": "default", "source": {"targetRevision": "v1", "helm": {"valueFiles": None}}}}
+    assert merge_patch(desired, LIVE) == {}
+    assert merge_patch(copy.deepcopy(LIVE), LIVE) == {}
+
+
+def test_merge_patch_holds_changed_fields_only():
+    desired = {"spec": {"project": "default", "source": {"repoURL": "https://example.com/repo.git",
+                                                         "targetRevision": "v2"}}}
+    patch = merge_patch(desired, LIVE)
+    assert patch == {"spec": {"source": {"targetRevision": "v2"}}}
+    patched = apply_merge_patch(LIVE, patch)
+    assert patched["spec"]["source"]["targetRevision"] == "v2"
+    assert patched["spec"]["source"]["helm"] == LIVE["spec"]["source"]["helm"]
+    assert patched["spec"]["syncPolicy"] == LIVE["spec"]["syncPolicy"]
+
+
+def test_merge_patch_replaces_lists():
+    desired = {"spec": {"source": {"helm": {"valueFiles": ["values.yaml"]}}}}
+    patch = merge_patch(desired, LIVE)
+    assert patch == {"spec": {"source": {"helm": {"valueFiles": ["values.yaml"]}}}}
+    assert apply_merge_patch(LIVE, patch)["spec"]["source"]["helm"]["valueFiles"] == ["values.yaml"]
+    # The same items in another order are a change too
+    reordered = {"spec": {"source": {"helm": {"valueFiles": ["values-prod.yaml", "values.yaml"]}}}}
+    assert merge_patch(reordered, LIVE) == reordered
+
+
+def test_merge_patch_deletes_nested_object():
+    # An empty object clears the live one, null removes it from the document
+    desired = {"spec": {"syncPolicy": {"automated": {}, "syncOptions": ["CreateNamespace=true"]}}}
+    patch = merge_patch(desired, LIVE)
+    assert patch == {"spec": {"syncPolicy": {"automated": None}}}
+    patched = apply_merge_patch(LIVE, patch)
+    assert "automated" not in patched["spec"]["syncPolicy"]
+    assert patched["spec"]["syncPolicy"]["syncOptions"] == ["CreateNamespace=true"]
+    # Already cleared, nothing to send
+    assert merge_patch(desired, patched) == {}
+
+
+def test_apply_merge_patch_leaves_document_alone():
+    live = copy.deepcopy(LIVE)
+    apply_merge_patch(live, {"spec": {"project": "other", "syncPolicy": None}})
+    assert live == LIVE
+
+
+def test_make_diff():
+    assert make_diff(None, {"a": 1}) == {"before": {}, "after": {"a": 1}}
+    expected = {"before": {"a": 1}, "after": {"a": 2}, "before_header": "before", "after_header": "after"}
+    assert make_diff({"a": 1}, {"a": 2}, "before", "after") == expected
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import json
+import time
+
+import pytest
+
+from ansible_collections.bitertech.argocd.plugins.module_utils import argocd_json
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_json import iter_json_items
+
+ITEMS = [
+    {"name": "app-1", "replicas": 3, "weight": 0.25, "ratio": -1.5e-3, "limit": 12e10, "big": 1234567890123},
+    {"name": "ünïcode ✓", "flags": [True, False, None], "nested": {"scores": [1.0, -2, 3.25E+2]}},
+    12.5,
+    -7,
+    0,
+    1e-7,
+    "text",
+    [],
+    {},
+]
+
+
+def _body(items, **members):
+    return json.dumps(dict(members, items=items), ensure_ascii=False).encode("utf-8")
+
+
+def _split(body, *offsets):
+    bounds = [0] + list(offsets) + [len(body)]
+    return [body[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize("separators", [(",", ":"), (", ", ": ")])
+def test_every_split_offset(separators):
+    # A chunk boundary may fall anywhere, such as right after the . or e of
+    # a number or inside a multi-byte character
+    body = json.dumps({"metadata": {"resourceVersion": "12"}, "items": ITEMS},
+                      separators=separators, ensure_ascii=False).encode("utf-8")
+    for offset in range(len(body) + 1):
+        assert list(iter_json_items(_split(body, offset))) == ITEMS, offset
+
+
+def test_byte_chunks():
+    body = _body(ITEMS, metadata={"continue": ""})
+    assert list(iter_json_items([body[index:index + 1] for index in range(len(body))])) == ITEMS
+
+
+def test_number_items_split_at_every_offset():
+    items = [1.5, 2e3, -0.0625, 10, 3.0E-4, 7]
+    body = _body(items)
+    for first in range(len(body) + 1):
+        for second in range(first, len(body) + 1):
+            assert list(iter_json_items(_split(body, first, second))) == items, (first, second)
+
+
+def test_empty_and_missing_items():
+    assert list(iter_json_items([b'{"items":[]}'])) == []
+    assert list(iter_json_items([b'{"items":null}'])) == []
+    assert list(iter_json_items([b'{"metadata":{}}'])) == []
+    assert list(iter_json_items([b"{}"])) == []
+
+
+def test_truncated_body():
+    body = _body([1.5, 2.5])
+    with pytest.raises(ValueError):
+        list(iter_json_items([body[:-3]]))
+
+
+def test_large_item_is_decoded_in_bounded_time(monkeypatch):
+    # An application with its whole resource tree, several MB in one item,
+    # arriving in 64 KB chunks. An attempt decodes the item from its start,
+    # there must be a handful of them and not one per chunk.
+    attempts = []
+
+    class CountingDecoder(json.JSONDecoder):
+        def raw_decode(self, s, idx=0):
+            attempts.append(idx)
+            return super().raw_decode(s, idx)
+
+    monkeypatch.setattr(argocd_json.json, "JSONDecoder", CountingDecoder)
+    resources = [{"kind": "ConfigMap", "name": f"config-{index}", "health": {"status": "Healthy"}}
+                 for index in range(60000)]
+    items = [{"metadata": {"name": "big"}, "status": {"resources": resources}}, {"metadata": {"name": "small"}}]
+    body = _body(items)
+    assert len(body) > 4 * 1024 * 1024
+
+    started = time.perf_counter()
+    assert list(iter_json_items(_split(body, *range(65536, len(body), 65536)))) == items
+    assert time.perf_counter() - started < 5
+    assert len(attempts) < 20
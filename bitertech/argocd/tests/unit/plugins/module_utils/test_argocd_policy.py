@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import pytest
+
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_policy import (
+    MemberIndex,
+    format_policy,
+    group_key,
+    member_index,
+    normalize_policy,
+    parse_policy,
+)
+
+POLICY = "p, proj:project:dev, applications, get, project/*, allow"
+FIELDS = ("p", "proj:project:dev", "applications", "get", "project/*", "allow")
+
+
+@pytest.mark.parametrize("line", [
+    POLICY,
+    "p,proj:project:dev,applications,get,project/*,allow",
+    "  p ,proj:project:dev ,  applications,get , project/* ,allow  ",
+    "p,\tproj:project:dev,\tapplications,\tget,\tproject/*,\tallow\n",
+])
+def test_whitespace_is_not_significant(line):
+    assert parse_policy(line) == FIELDS
+    assert normalize_policy(line) == POLICY
+
+
+def test_quoted_fields():
+    # Quotes are CSV quoting, not part of the field
+    assert parse_policy('p, "proj:project:dev", applications, get, "project/*", allow') == FIELDS
+    # A quoted field may hold a comma
+    assert parse_policy('p, proj:project:dev, applications, get, "project/a, b", allow')[4] == "project/a, b"
+    assert parse_policy('p, proj:project:dev, applications, get, " project/* ", allow')[4] == "project/*"
+
+
+def test_policy_and_group_lines():
+    assert parse_policy("g, my-group, proj:project:dev") == ("g", "my-group", "proj:project:dev")
+    # The same fields under p, and g, are different lines
+    assert parse_policy("p, my-group, proj:project:dev") != parse_policy("g, my-group, proj:project:dev")
+    # Only whitespace differs between fields, not case
+    assert parse_policy(POLICY) != parse_policy(POLICY.replace("allow", "Allow"))
+
+
+def test_empty_line():
+    assert parse_policy("") == ()
+    assert parse_policy("   ") == ()
+
+
+def test_format_policy():
+    assert format_policy(FIELDS) == POLICY
+    assert format_policy(parse_policy(normalize_policy(POLICY))) == POLICY
+
+
+def test_member_index_keeps_order_and_spelling():
+    index = member_index("policies", ["p,proj:project:dev,applications,get,project/*,allow",
+                                      "p, proj:project:dev, applications, sync, project/*, allow"])
+    assert len(index) == 2
+    # The same policy spelled another way is already there
+    assert POLICY in index
+    assert not index.add(POLICY)
+    assert index.get(POLICY) == "p,proj:project:dev,applications,get,project/*,allow"
+    assert index.add("g, my-group, proj:project:dev")
+    assert index.values() == ["p,proj:project:dev,applications,get,project/*,allow",
+                              "p, proj:project:dev, applications, sync, project/*, allow",
+                              "g, my-group, proj:project:dev"]
+
+
+def test_member_index_discard():
+    index = member_index("policies", [POLICY])
+    assert not index.discard("p, proj:project:dev, applications, sync, project/*, allow")
+    assert index.discard(" p,proj:project:dev,applications,get,project/*,allow")
+    assert POLICY not in index
+    assert index.values() == []
+    assert index.get(POLICY, "missing") == "missing"
+
+
+def test_group_index():
+    assert group_key("  my-group ") == "my-group"
+    index = member_index("groups", ["my-group", " other-group"])
+    assert "other-group" in index
+    assert not index.add("my-group ")
+    # Groups are matched exactly otherwise, they are not policies
+    assert "My-Group" not in index
+    assert index.values() == ["my-group", " other-group"]
+
+
+def test_plain_member_index():
+    index = MemberIndex(["a", "b", "a"])
+    assert index.values() == ["a", "b"]
+    assert " a" not in index
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import json
+from email.utils import formatdate
+
+import pytest
+
+from ansible_collections.bitertech.argocd.plugins.module_utils import argocd_api, argocd_retry
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import ArgoCDClient
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_http import (
+    ArgoCDCircuitOpen,
+    ArgoCDConnectionError,
+    ArgoCDResponse,
+)
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_retry import (
+    CircuitBreaker,
+    RateLimiter,
+    RetryPolicy,
+    parse_retry_after,
+)
+
+
+class FakeClock:
+    # Stands for the time module, sleeping only moves the clock forward
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeTransport:
+    # Answers each request with the next outcome: a status, a (status,
+    # headers, body) tuple or an exception to raise
+    supports_streaming = False
+    supports_compression = False
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def request(self, method, url, query=None, data=None, headers=None):
+        self.calls.append(method)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        if isinstance(outcome, int):
+            outcome = (outcome, {}, {})
+        status, headers, body = outcome
+        return ArgoCDResponse(status, headers, json.dumps(body).encode("utf-8"), url)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(argocd_retry, "time", clock)
+    monkeypatch.setattr(argocd_api, "time", clock)
+    # No jitter, delays are exact
+    monkeypatch.setattr(argocd_retry.random, "uniform", lambda low, high: 1.0)
+    return clock
+
+
+def make_client(outcomes, retries=3, breaker=False):
+    client = ArgoCDClient("http://argocd.invalid/api/v1", "token", http_backend="urllib",
+                          retry=RetryPolicy(retries=retries, backoff=0.5, max_backoff=4.0), breaker=breaker)
+    client.transport = FakeTransport(outcomes)
+    return client
+
+
+def test_parse_retry_after(clock):
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("1.5") == 1.5
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after(formatdate(clock.now + 5, usegmt=True)) == 5.0
+    assert parse_retry_after(formatdate(clock.now - 5, usegmt=True)) == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_backoff_is_capped(clock):
+    policy = RetryPolicy(retries=10, backoff=0.5, max_backoff=4.0)
+    assert [policy.delay(attempt) for attempt in range(6)] == [0.5, 1.0, 2.0, 4.0, 4.0, 4.0]
+    # Retry-After is capped too
+    assert policy.delay(0, retry_after=2.5) == 2.5
+    assert policy.delay(0, retry_after=600) == 4.0
+
+
+def test_retry_after_is_honoured(clock):
+    client = make_client([(503, {"Retry-After": "2"}, {}), (200, {}, {"ok": True})])
+    response = client._request("GET", "/projects")
+    assert response.status_code == 200
+    assert client.transport.calls == ["GET", "GET"]
+    assert clock.sleeps == [2.0]
+
+
+def test_retries_are_exhausted(clock):
+    client = make_client([503] * 4, retries=3)
+    assert client._request("GET", "/projects").status_code == 503
+    assert client.transport.calls == ["GET"] * 4
+    assert clock.sleeps == [0.5, 1.0, 2.0]
+
+
+@pytest.mark.parametrize("status", [502, 504])
+def test_post_is_not_retried_on_gateway_errors(clock, status):
+    client = make_client([status, 200])
+    assert client._request("POST", "/projects", body={}).status_code == status
+    assert client.transport.calls == ["POST"]
+
+
+def test_post_is_not_retried_on_connection_errors(clock):
+    client = make_client([ArgoCDConnectionError("reset"), 200])
+    with pytest.raises(ArgoCDConnectionError):
+        client._request("POST", "/projects", body={})
+    assert client.transport.calls == ["POST"]
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_post_is_retried_when_not_processed(clock, status):
+    client = make_client([status, 200])
+    assert client._request("POST", "/projects", body={}).status_code == 200
+    assert client.transport.calls == ["POST", "POST"]
+
+
+@pytest.mark.parametrize("method", ["GET", "PUT", "PATCH", "DELETE"])
+def test_idempotent_methods_are_retried(clock, method):
+    client = make_client([502, ArgoCDConnectionError("reset"), 504, 200])
+    assert client._request(method, "/projects/{name}", path_params={"name": "project"}).status_code == 200
+    assert client.transport.calls == [method] * 4
+
+
+def test_lost_put_is_reported_as_changed(clock):
+    # The PUT went through but its response was lost, the retry conflicts
+    # with the version it created and the replay finds nothing to change
+    before = {"metadata": {"name": "project", "resourceVersion": "1", "description": "old"}}
+    after = {"metadata": {"name": "project", "resourceVersion": "2", "description": "new"}}
+    client = make_client([(200, {}, before), 502, (409, {}, {"error": "conflict"}), (200, {}, after)])
+
+    result, diff = client.update_project("project", "new")
+    assert client.transport.calls == ["GET", "PUT", "PUT", "GET"]
+    assert result == after
+    assert diff == {"before": before, "after": after}
+
+
+def test_conflict_without_write_is_not_changed(clock):
+    # Another writer already made the change before the first PUT was sent
+    project = {"metadata": {"name": "project", "resourceVersion": "2", "description": "new"}}
+    client = make_client([(200, {}, project)])
+    assert client.update_project("project", "new") == (project, None)
+
+
+def test_rate_limiter(clock):
+    limiter = RateLimiter(2, burst=2)
+    assert [limiter.acquire() for _ in range(2)] == [0.0, 0.0]
+    assert limiter.acquire() == 0.5
+    clock.now += 10
+    # The bucket refills up to the burst only
+    assert [limiter.acquire() for _ in range(3)] == [0.0, 0.0, 0.5]
+
+
+def test_breaker_half_open_probe(clock):
+    breaker = CircuitBreaker(threshold=2, reset_timeout=10)
+    breaker.failure()
+    assert breaker.allow()
+    breaker.failure()
+    assert not breaker.allow()
+    assert breaker.remaining() == 10
+
+    # A single probe once the timeout elapsed, a failed probe opens it again
+    clock.now += 10
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.failure()
+    assert not breaker.allow()
+
+    clock.now += 10
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.allow()
+    assert breaker.allow()
+
+
+def test_breaker_state_file_is_shared(clock, tmp_path):
+    state_file = str(tmp_path / "breaker.json")
+    first = CircuitBreaker(threshold=2, reset_timeout=10, state_file=state_file)
+    second = CircuitBreaker(threshold=2, reset_timeout=10, state_file=state_file)
+    first.failure()
+    second.failure()
+    assert not first.allow()
+    assert not second.allow()
+
+    clock.now += 10
+    assert second.allow()
+    second.success()
+    assert first.allow()
+
+
+def test_open_breaker_fails_requests_at_once(clock):
+    client = make_client([503, 503, 200], retries=0, breaker=CircuitBreaker(threshold=2, reset_timeout=10))
+    assert client._request("GET", "/projects").status_code == 503
+    assert client._request("GET", "/projects").status_code == 503
+    with pytest.raises(ArgoCDCircuitOpen):
+        client._request("GET", "/projects")
+    assert client.transport.calls == ["GET", "GET"]
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_api import APPLICATION_SYNC_ARGS
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_bulk import run_bulk, summarize
+from ansible_collections.bitertech.argocd.plugins.modules.applications import create_application
+
+
+class FakeClient:
+    def create_application(self, name, *args, **kwargs):
+        if name == "malformed":
+            # A live document without metadata
+            raise KeyError("metadata")
+        if name == "not-json":
+            raise ValueError("Expecting value: line 1 column 1 (char 0)")
+        return {"metadata": {"name": name}}, {"before": {}, "after": {"metadata": {"name": name}}}
+
+
+def _application(name):
+    application = {"name": name, "repository_url": "https://example.com/repo.git", "path": "chart",
+                   "target_revision": "main", "values_files": None, "destination_server": "https://kubernetes.default.svc",
+                   "namespace": "default", "project": "default", "upsert": True}
+    application.update((key, None) for key in APPLICATION_SYNC_ARGS)
+    return application
+
+
+def test_unexpected_errors_fail_their_item_only():
+    client = FakeClient()
+    results = run_bulk(lambda application: create_application(client, application),
+                       [_application(name) for name in ("app-1", "malformed", "not-json", "app-2")])
+    assert [result["name"] for result in results] == ["app-1", "malformed", "not-json", "app-2"]
+    assert [result["failed"] for result in results] == [False, True, True, False]
+    assert results[1]["msg"] == "KeyError: 'metadata'"
+    assert results[2]["msg"].startswith("ValueError: Expecting value")
+    summary = summarize(results)
+    assert (summary["changed"], summary["failed"]) == (2, 2)
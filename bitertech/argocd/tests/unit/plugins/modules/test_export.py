@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from ansible_collections.bitertech.argocd.plugins.module_utils.argocd_export import export_path, iter_export
+from ansible_collections.bitertech.argocd.plugins.modules.export import export_repositories
+
+
+class FakeClient:
+    def __init__(self, repositories):
+        self.repositories = repositories
+
+    def list_repositories(self):
+        return [dict(repository) for repository in self.repositories]
+
+
+def _repository(repo, attempted_at):
+    return {"repo": repo, "type": "git", "project": "default",
+            "connectionState": {"status": "Successful", "message": "", "attemptedAt": attempted_at}}
+
+
+def test_connection_state_is_not_exported(tmp_path):
+    path = export_path(str(tmp_path), "repositories")
+    client = FakeClient([_repository("https://example.com/a.git", "2024-01-01T00:00:00Z"),
+                         _repository("https://example.com/b.git", "2024-01-01T00:00:00Z")])
+    first, counts, _ = export_repositories(client, path, None, False)
+    assert counts["added"] == 2
+    assert all("connectionState" not in document for document in iter_export(path))
+
+    # ArgoCD checked the repositories again, nothing else changed
+    client = FakeClient([_repository("https://example.com/a.git", "2024-01-01T00:05:00Z"),
+                         _repository("https://example.com/b.git", "2024-01-01T00:05:00Z")])
+    second, counts, _ = export_repositories(client, path, first, False)
+    assert counts == {"added": 0, "updated": 0, "removed": 0, "unchanged": 2}
+    assert second == first
+
+
+def test_changed_repository_is_updated(tmp_path):
+    path = export_path(str(tmp_path), "repositories")
+    repository = _repository("https://example.com/a.git", "2024-01-01T00:00:00Z")
+    first, _, _ = export_repositories(FakeClient([repository]), path, None, False)
+
+    second, counts, _ = export_repositories(FakeClient([dict(repository, project="other")]), path, first, False)
+    assert counts["updated"] == 1
+    assert second != first
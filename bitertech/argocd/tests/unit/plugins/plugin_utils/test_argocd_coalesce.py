@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import multiprocessing
+import os
+import time
+
+import pytest
+from ansible.plugins.action import ActionBase
+
+from ansible_collections.bitertech.argocd.plugins.plugin_utils import argocd_action
+from ansible_collections.bitertech.argocd.plugins.plugin_utils.argocd_action import ArgoCDAction
+from ansible_collections.bitertech.argocd.plugins.plugin_utils.argocd_coalesce import Coordinator, request_key
+
+# Every host of a task runs the action in its own worker process, so do the
+# callers of these tests
+fork = multiprocessing.get_context("fork")
+
+HOSTS = ["host-1", "host-2"]
+POLICY_1 = "p, proj:project:dev, applications, get, project/*, allow"
+POLICY_2 = "p, proj:project:dev, applications, sync, project/*, allow"
+
+
+class Namespace:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def _sent(root):
+    # Module runs of every process, one line each
+    try:
+        with open(os.path.join(root, "sent"), "r") as sent_file:
+            return sent_file.read().splitlines()
+    except OSError:
+        return []
+
+
+def _send(root, line, result, started=None, delay=0.5):
+    # Stands for a module run: records the request, then answers slowly
+    with open(os.path.join(root, "sent"), "a") as sent_file:
+        sent_file.write(line + "\n")
+    if started is not None:
+        started.set()
+    time.sleep(delay)
+    return result
+
+
+def _leftovers(directory):
+    # Files of the calls once they are over, only the lock files stay
+    return sorted(name for name in os.listdir(directory) if not name.endswith("lock"))
+
+
+def _run_concurrently(callers):
+    # callers maps a name to a function run in its own process, returns the
+    # value of each function by name
+    queue = fork.Queue()
+    processes = [fork.Process(target=lambda name=name, caller=caller: queue.put((name, caller())))
+                 for name, caller in callers.items()]
+    for process in processes:
+        process.start()
+    results = dict(queue.get(timeout=30) for _ in processes)
+    for process in processes:
+        process.join(10)
+        assert process.exitcode == 0
+    return results
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    # The coordination files are kept in the local tmp of the controller
+    monkeypatch.setattr(argocd_action.C, "DEFAULT_LOCAL_TMP", str(tmp_path))
+    monkeypatch.setattr(ActionBase, "run", lambda self, tmp=None, task_vars=None: {})
+    return str(tmp_path)
+
+
+def make_action(root, args, merge_field=None, module_result=None, started=None):
+    # The action of one host, the module run is recorded in the sent file
+    action = ArgoCDAction.__new__(ArgoCDAction)
+    action.MERGE_FIELD = merge_field
+    action._attempt = 0
+    action._task = Namespace(args=args, async_val=0, _uuid="task", action="bitertech.argocd.policy")
+    action._connection = Namespace(transport="local")
+    action._play_context = Namespace(remote_addr="localhost", check_mode=False, diff=True)
+
+    def run_module(module_args, task_vars):
+        line = " | ".join(module_args[merge_field]) if merge_field else module_args["project_name"]
+        return _send(root, line, module_result or {"changed": False, "project": {"name": "project"}}, started)
+
+    action._run_module = run_module
+    return action
+
+
+def _wait_for_batch(root):
+    # Until the first host opened a batch
+    directory = os.path.join(root, "argocd_coalesce")
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if os.path.isdir(directory) and any(os.path.exists(os.path.join(directory, key, "open.json"))
+                                            for key in os.listdir(directory)):
+            return
+        time.sleep(0.01)
+
+
+def host_vars(host):
+    return {"inventory_hostname": host, "ansible_play_batch": HOSTS}
+
+
+def test_identical_requests_are_sent_once(root):
+    started = fork.Event()
+    args = {"project_name": "project"}
+
+    def leader():
+        return make_action(root, args, started=started).run(task_vars=host_vars("host-1"))
+
+    def follower():
+        # Asks while the request of host-1 is running
+        started.wait(10)
+        return make_action(root, args).run(task_vars=host_vars("host-2"))
+
+    results = _run_concurrently({"host-1": leader, "host-2": follower})
+    assert _sent(root) == ["project"]
+    assert results["host-1"] == {"changed": False, "project": {"name": "project"}}
+    assert results["host-2"] == {"changed": False, "project": {"name": "project"}, "coalesced": True}
+    assert _leftovers(os.path.join(root, "argocd_coalesce")) == []
+
+    # A later request is sent again, finished results are never shared
+    assert make_action(root, args).run(task_vars=host_vars("host-1")) == {"changed": False, "project": {"name": "project"}}
+    assert _sent(root) == ["project", "project"]
+
+
+def test_failures_are_not_shared(root):
+    started = fork.Event()
+    coordinator_root = os.path.join(root, "coalesce")
+    key = request_key("task", "project")
+
+    def leader():
+        return Coordinator(coordinator_root).run_once(
+            key, lambda: _send(root, "host-1", {"failed": True, "msg": "503"}, started))
+
+    def follower():
+        started.wait(10)
+        return Coordinator(coordinator_root).run_once(key, lambda: _send(root, "host-2", {"changed": True}, delay=0))
+
+    results = _run_concurrently({"host-1": leader, "host-2": follower})
+    # The waiting caller sent its own request once the first one failed
+    assert _sent(root) == ["host-1", "host-2"]
+    assert results["host-1"] == ({"failed": True, "msg": "503"}, False)
+    assert results["host-2"] == ({"changed": True}, False)
+    assert _leftovers(coordinator_root) == []
+
+
+def _project(policies):
+    return {"metadata": {"name": "project"}, "spec": {"roles": [{"name": "dev", "policies": policies}]}}
+
+
+def _run_batch(root, parts, module_result):
+    # Runs the policy action of every host of parts, host-1 opens the batch
+    # and host-2 joins it
+    def caller(host):
+        args = {"project_name": "project", "role_name": "dev", "policies": parts[host]}
+        action = make_action(root, args, merge_field="policies", module_result=module_result)
+
+        def run():
+            if host != "host-1":
+                _wait_for_batch(root)
+            return action.run(task_vars=dict(host_vars(host), argocd_batch_window=10))
+        return run
+
+    return _run_concurrently(dict((host, caller(host)) for host in parts))
+
+
+def test_policy_batch_splits_changed_per_host(root):
+    # host-1 asks for a policy the role already has, spelled another way,
+    # host-2 adds one
+    diff = {"before": _project([POLICY_1]), "after": _project([POLICY_1, POLICY_2])}
+    module_result = {"changed": True, "diff": diff}
+    parts = {"host-1": ["p,proj:project:dev,applications,get,project/*,allow"], "host-2": [POLICY_2]}
+    results = _run_batch(root, parts, module_result)
+
+    # A single write with the policies of both hosts
+    assert _sent(root) == [" | ".join(parts["host-1"] + parts["host-2"])]
+    assert results["host-1"] == {"changed": False, "diff": {}, "batch_size": 2}
+    assert results["host-2"] == {"changed": True, "diff": diff, "batch_size": 2}
+    for directory in os.listdir(os.path.join(root, "argocd_coalesce")):
+        assert _leftovers(os.path.join(root, "argocd_coalesce", directory)) == []
+
+
+def test_failed_batch_is_run_again_by_the_other_hosts(root):
+    module_result = {"failed": True, "msg": "503"}
+    parts = {"host-1": [POLICY_1], "host-2": [POLICY_2, POLICY_1]}
+    results = _run_batch(root, parts, module_result)
+
+    # Members requested by several hosts are sent once, then host-2 retries
+    # with its own members
+    assert _sent(root) == [POLICY_1 + " | " + POLICY_2, POLICY_2 + " | " + POLICY_1]
+    assert results["host-1"] == {"failed": True, "msg": "503", "batch_size": 2}
+    assert results["host-2"] == {"failed": True, "msg": "503"}